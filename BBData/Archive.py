@@ -0,0 +1,269 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from BBData import config
+from BBData.Codecs import detectCodec
+from BBData.utilities import getFilesByExtension, saveJsonLikeMany, sniffUUID
+
+
+class PackedArchive():
+    '''
+    Single file holding every element of a workspace.
+
+    Layout: magic, then appended frames. A write appends the element records, then an index
+    delta naming the records it added and the uuids it dropped, then a fixed size footer. Every
+    footer points at its delta and at the footer before it, back to a checkpoint: a delta holding
+    the whole index. A new checkpoint is written once the deltas since the last one outgrow it, so
+    saving a few elements costs a few entries and opening replays at most about twice the index.
+    Earlier content is never overwritten in place. compact() rewrites the file without superseded
+    records.
+
+    Footers carry a checksum of their delta. Opening uses the last valid footer, so a write that
+    was interrupted loses only itself. Reads go through a memory map, so loading an element is a
+    slice and a decode.
+    '''
+
+    magic = b'BBPK\x02'
+    # delta offset, delta length, previous footer position (0 for a checkpoint), crc32 of the delta, magic
+    footer = struct.Struct('<QQQI4s')
+    footermagic = b'BBPX'
+    # Deltas since the last checkpoint may take this many bytes before a checkpoint is due, at least
+    checkpointbytes = 4096
+    # Elements written per batch when unpacking
+    unpackchunk = 1024
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        # uuid -> (kind, relative path, offset, length)
+        self.__entries = {}
+        self.__map = None
+        # Position of the last footer, and bytes of the last checkpoint and of the deltas since
+        self.__last = 0
+        self.__checkpointsize = 0
+        self.__deltasize = 0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'wb') as outfile:
+                outfile.write(PackedArchive.magic)
+                self.__writeCheckpoint(outfile)
+        self.__open()
+
+    def __open(self):
+        with open(self.path, 'rb') as infile:
+            self.__map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.__map[:len(PackedArchive.magic)] != PackedArchive.magic:
+            version = bytes(self.__map[:len(PackedArchive.magic)])
+            self.close()
+            raise ValueError(f'{self.path} is not a packed archive of this version ({version!r})')
+        # Deltas from the last valid footer back to its checkpoint, newest first
+        position = self.__lastFooter()
+        if position == None:
+            self.close()
+            raise ValueError(f'{self.path} has no valid index')
+        self.__last = position
+        deltas = []
+        while True:
+            offset, length, previous = self.__footerAt(position)
+            deltas.append(self.__map[offset:offset + length])
+            if previous == 0:
+                break
+            position = previous
+        self.__checkpointsize = len(deltas[-1])
+        self.__deltasize = sum(len(delta) for delta in deltas[:-1])
+        self.__entries = {}
+        for delta in reversed(deltas):
+            self.__apply(json.loads(delta))
+
+    def __footerAt(self, position: int) -> tuple:
+        # (delta offset, delta length, previous footer) of a valid footer at position, or None
+        if position < len(PackedArchive.magic) or position + PackedArchive.footer.size > len(self.__map):
+            return None
+        offset, length, previous, checksum, footermagic = PackedArchive.footer.unpack_from(self.__map, position)
+        if footermagic != PackedArchive.footermagic or offset + length != position or previous >= position \
+                or zlib.crc32(self.__map[offset:position]) != checksum:
+            return None
+        return offset, length, previous
+
+    def __lastFooter(self) -> int:
+        # The footer closing the file, or the last one before a write that didn't finish
+        end = len(self.__map) - PackedArchive.footer.size
+        if self.__footerAt(end) != None:
+            return end
+        position = self.__map.rfind(PackedArchive.footermagic, 0, len(self.__map))
+        while position >= 0:
+            start = position - (PackedArchive.footer.size - len(PackedArchive.footermagic))
+            if self.__footerAt(start) != None:
+                return start
+            position = self.__map.rfind(PackedArchive.footermagic, 0, position)
+        return None
+
+    def __apply(self, delta: dict):
+        for uuid in delta.get('drop', ()):
+            self.__entries.pop(uuid, None)
+        for uuid, kind, path, offset, length in delta.get('put', ()):
+            self.__entries[uuid] = (kind, path, offset, length)
+
+    def __writeDelta(self, outfile, delta: dict, checkpoint: bool):
+        data = json.dumps(delta, separators=(',', ':')).encode('utf-8')
+        offset = outfile.tell()
+        outfile.write(data)
+        outfile.write(PackedArchive.footer.pack(offset, len(data), 0 if checkpoint else self.__last,
+                                                zlib.crc32(data), PackedArchive.footermagic))
+        outfile.flush()
+        if config.fsync:
+            os.fsync(outfile.fileno())
+        self.__last = offset + len(data)
+        if checkpoint:
+            self.__checkpointsize, self.__deltasize = len(data), 0
+        else:
+            self.__deltasize += len(data)
+
+    def __writeCheckpoint(self, outfile):
+        self.__writeDelta(outfile, {'put': [[uuid, *entry] for uuid, entry in self.__entries.items()]}, True)
+
+    def __append(self, delta: dict, outfile):
+        # Called with the file positioned at its end, after any records of the delta
+        if self.__deltasize > max(self.__checkpointsize, PackedArchive.checkpointbytes):
+            self.__writeCheckpoint(outfile)
+        else:
+            self.__writeDelta(outfile, delta, False)
+
+    def close(self):
+        if self.__map != None:
+            self.__map.close()
+            self.__map = None
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.__entries
+
+    def entries(self) -> dict:
+        '''
+        Get the archive index.
+
+        Returns:
+            dict: uuid -> (kind, relative path, offset, length), in the order elements were first added
+        '''
+        return dict(self.__entries)
+
+    def __remap(self, end: int):
+        # Records written since the file was mapped are mapped on first read
+        if end > len(self.__map):
+            self.close()
+            with open(self.path, 'rb') as infile:
+                self.__map = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def readRaw(self, uuid: str) -> bytes:
+        kind, path, offset, length = self.__entries[uuid]
+        if offset + length > len(self.__map):
+            with self.lock:
+                self.__remap(offset + length)
+        return self.__map[offset:offset + length]
+
+    def read(self, uuid: str):
+        '''
+        Decode one element.
+
+        Args:
+            uuid (str): Element uuid
+
+        Returns:
+            dict: Element content
+        '''
+        data = self.readRaw(uuid)
+        return detectCodec(data).decode(data)
+
+    def write(self, records: list):
+        '''
+        Append encoded elements and an index delta naming them.
+
+        Args:
+            records (list): (uuid, kind, relative path, encoded bytes) tuples
+        '''
+        if not records:
+            return
+        with self.lock:
+            with open(self.path, 'r+b') as outfile:
+                outfile.seek(0, os.SEEK_END)
+                put = []
+                for uuid, kind, path, data in records:
+                    entry = (kind, path, outfile.tell(), len(data))
+                    outfile.write(data)
+                    put.append([uuid, *entry])
+                # Entries change once the records are written, so a failed write leaves them as stored
+                for uuid, *entry in put:
+                    self.__entries[uuid] = tuple(entry)
+                self.__append({'put': put}, outfile)
+
+    def remove(self, uuids: list):
+        '''
+        Drop elements from the index. Their bytes stay in the file until compact().
+
+        Args:
+            uuids (list): Element uuids
+        '''
+        with self.lock:
+            dropped = [uuid for uuid in uuids if self.__entries.pop(uuid, None) != None]
+            if not dropped:
+                return
+            with open(self.path, 'r+b') as outfile:
+                outfile.seek(0, os.SEEK_END)
+                self.__append({'drop': dropped}, outfile)
+
+    def compact(self):
+        '''
+        Rewrite the archive with only the current version of each element.
+        '''
+        with self.lock:
+            temporary = f'{self.path}.tmp'
+            entries = {}
+            self.__remap(os.path.getsize(self.path))
+            with open(temporary, 'wb') as outfile:
+                outfile.write(PackedArchive.magic)
+                for uuid, (kind, path, offset, length) in self.__entries.items():
+                    entries[uuid] = (kind, path, outfile.tell(), length)
+                    outfile.write(self.__map[offset:offset + length])
+                self.__entries = entries
+                self.__writeCheckpoint(outfile)
+            self.close()
+            os.replace(temporary, self.path)
+            self.__open()
+
+    def packDirectory(directory: str, archivepath: str, extensions: list):
+        '''
+        Pack every element file of a directory layout into an archive.
+
+        Args:
+            directory (str): Workspace root
+            archivepath (str): Archive to create or extend
+            extensions (list): Element file extensions, in load order
+
+        Returns:
+            PackedArchive: The archive
+        '''
+        archive = PackedArchive(archivepath)
+        files = getFilesByExtension(directory, extensions)
+        records = []
+        for extension in extensions:
+            for path in files[extension]:
+                with open(path, 'rb') as infile:
+                    records.append((sniffUUID(path), extension, os.path.relpath(path, directory), infile.read()))
+        archive.write(records)
+        return archive
+
+    def unpackToDirectory(self, directory: str):
+        '''
+        Write every element back out as one file per element.
+
+        Args:
+            directory (str): Workspace root to write to
+        '''
+        # Written as they are stored, atomically, a chunk at a time so the copies stay bounded
+        entries = list(self.__entries.items())
+        for start in range(0, len(entries), PackedArchive.unpackchunk):
+            saveJsonLikeMany([(bytes(self.readRaw(uuid)), os.path.join(directory, path))
+                              for uuid, (kind, path, offset, length) in entries[start:start + PackedArchive.unpackchunk]])
@@ -1,23 +1,35 @@
 from abc import abstractmethod
-import copy
+from contextlib import contextmanager
 from datetime import datetime
 from enum import Enum
 import os
 import shutil
 from types import NoneType
+from BBData.Archive import PackedArchive
+from BBData.Cache import HydrationCache
+from BBData.Codecs import ShapeTable, getCodec
 from BBData.Delegate import Delegate
+from BBData.Diff import diffDicts, diffElements
 from BBData import config
-from BBData.Fields import Checks, Field, FieldType, LongText, Radio, ShortText, parseField
-from BBData.FileSystem import Tree, TreeNode
-from BBData.utilities import currentTime, first, getDuration, getFilesWithExtension, loadJsonLike
-from dictdiffer import diff
-import json
+from BBData.Fields import Checks, Enum as EnumField, Field, FieldType, LongText, Radio, ShortText, parseField
+from BBData.FileSystem import Tree, TreeNode, hashedAttribute
+from BBData.Graph import TraceGraph
+from BBData.Index import WorkspaceIndex
+from BBData.Links import LinkSet
+from BBData.Query import QueryIndex
+from BBData.Schema import SchemaChange, SchemaDelta, TemplateSchema
+from BBData.Search import SearchIndex, textsFromDict, textsOf
+from BBData.Transfer import fieldUpdate, splitList
+from BBData.utilities import currentTime, formatTime, getDuration, getFilesByExtension, getFilesWithExtension, iterJsonLikeMany, loadJsonLike, loadJsonLikeMany, parseTime, saveJsonLikeMany, sniffUUID
 from typing import Callable, Union
 import uuid
 import warnings
 
 
 class CollectionElement(TreeNode):
+    # Nanoseconds since the epoch
+    createDate = hashedAttribute('_createDate')
+    updateDate = hashedAttribute('_updateDate')
 
     def diff(elementA, elementB):
         '''
@@ -28,9 +40,9 @@ class CollectionElement(TreeNode):
             elementB (CollectionElement): New Element
 
         Returns:
-            list: List of changes
+            Patch: Changes, fields are matched by name
         '''
-        return list(diff(elementA.toDict(), elementB.toDict()))
+        return diffElements(elementA, elementB)
 
     def fromDict(inDict: dict):
         '''
@@ -52,11 +64,13 @@ class CollectionElement(TreeNode):
                     for serializedField in inDict['public']]
         e.private = [parseField(serializedField)
                      for serializedField in inDict['private']]
+        e.adoptFields()
 
         # Time tracking
-        e.createDate = inDict['createDate']
-        e.updateDate = inDict['updateDate']
+        e.createDate = parseTime(inDict['createDate'])
+        e.updateDate = parseTime(inDict['updateDate'])
 
+        e.dirty = False
         return e
 
     def copy(element):
@@ -69,14 +83,18 @@ class CollectionElement(TreeNode):
         Returns:
             CollectionElement: Copied Element
         '''
-        e = CollectionElement.fromDict(element.toDict())
+        e = type(element).fromDict(element.toDict())
         e.uuid = str(uuid.uuid4())
-        return copy.deepcopy(e)
+        e.dirty = True
+        return e
+
+    def getSerializationPath(self):
+        pass
 
     def serialize(self):
         pass
 
-    def __init__(self, tree, parent=None) -> None:
+    def __init__(self, tree=None, parent=None) -> None:
         id = str(uuid.uuid4())
         # Identifiers
         self.uuid = id
@@ -85,6 +103,9 @@ class CollectionElement(TreeNode):
         # Public fields are shown in views, private are only shown in panels and accessable by plugins.
         self.public: list[Field] = []
         self.private: list[Field] = []
+        # name -> field caches for the lookups by name, checked on every hit and rebuilt on a miss
+        self._publicnames = {}
+        self._privatenames = {}
 
         # Time tracking
         self.createDate = currentTime()
@@ -92,54 +113,86 @@ class CollectionElement(TreeNode):
 
         # Delegate
         self.attributeChanged = Delegate()
+        self.attributeChanged.connect(self.markDirty)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        TreeNode.name.fset(self, name)
+        self.attributeChanged.emit(self, ('name',))
+
+    def adoptFields(self):
+        '''
+        Route changes of every field in public and private to this element.
+        '''
+        for field in self.public + self.private:
+            field.attach(self)
+
+    def onFieldChanged(self, args: tuple):
+        # Called by fields attached to this element
+        self.attributeChanged.emit(self, args)
 
     def addPublicField(self, field: Field):
         self.public.append(field)
-        field.fieldChanged.connect(
-            lambda changedField: self.attributeChanged.emit(self, changedField))
+        field.attach(self)
         self.attributeChanged.emit(self, field)
 
     def addPublicFields(self, fields: list[Field]):
-        [self.addPublicField(field) for field in fields]
+        with self.attributeChanged.batch():
+            [self.addPublicField(field) for field in fields]
 
     def addPrivateField(self, field: Field):
         self.private.append(field)
-        field.fieldChanged.connect(
-            lambda changedField: self.attributeChanged.emit(self, changedField))
+        field.attach(self)
         self.attributeChanged.emit(self, field)
 
     def addPrivateFields(self, fields: list[Field]):
-        [self.addPrivateField(field) for field in fields]
+        with self.attributeChanged.batch():
+            [self.addPrivateField(field) for field in fields]
 
     def removePublicField(self, index: Union[str, int]):
-        if isinstance(index, int):
-            target = self.public[index]
-        else:
-            target = [field for field in self.public if field.name == index][0]
-        target.fieldChanged.disconnect(
-            lambda changedField: self.attributeChanged.emit(self, changedField))
-        self.public.remove(target)
+        target = self.getPublicField(index)
+        if target == None:
+            raise IndexError(index)
+        target.detach(self)
+        # By identity, fields compare by content
+        del self.public[next(i for i, field in enumerate(self.public) if field is target)]
+        self.attributeChanged.emit(self, target)
 
     def removePrivateField(self, index: Union[str, int]):
-        if isinstance(index, int):
-            target = self.private[index]
-        else:
-            target = [field for field in self.private if field.name == index][0]
-        target.fieldChanged.disconnect(
-            lambda changedField: self.attributeChanged.emit(self, changedField))
-        self.private.remove(target)
+        target = self.getPrivateField(index)
+        if target == None:
+            raise IndexError(index)
+        target.detach(self)
+        # By identity, fields compare by content
+        del self.private[next(i for i, field in enumerate(self.private) if field is target)]
+        self.attributeChanged.emit(self, target)
 
     def getPublicField(self, search: Union[str, int]):
         if isinstance(search, int):
             return self.public[search]
         else:
-            return first([field for field in self.public if field.name == search])
+            return self.__findField(self.public, self._publicnames, search)
 
     def getPrivateField(self, search: Union[str, int]):
         if isinstance(search, int):
             return self.private[search]
         else:
-            return first([field for field in self.private if field.name == search])
+            return self.__findField(self.private, self._privatenames, search)
+
+    def __findField(self, fields: list, names: dict, search: str):
+        # A hit is trusted only if the field still has that name and belongs to this element,
+        # which covers renames and removals. Anything else rebuilds the cache from the list.
+        field = names.get(search)
+        if field is not None and field.name == search and field.ownedBy(self):
+            return field
+        names.clear()
+        for field in fields:
+            names.setdefault(field.name, field)
+        return names.get(search)
 
     def toDict(self) -> dict:
         '''
@@ -152,8 +205,8 @@ class CollectionElement(TreeNode):
         d['uuid'] = str(self.uuid)
         d['public'] = [field.toDict() for field in self.public]
         d['private'] = [field.toDict() for field in self.private]
-        d['createDate'] = self.createDate
-        d['updateDate'] = self.updateDate
+        d['createDate'] = formatTime(self.createDate)
+        d['updateDate'] = formatTime(self.updateDate)
         return d
 
     def __repr__(self) -> str:
@@ -169,9 +222,25 @@ class CollectionElement(TreeNode):
 
         return strrep
 
+    def hashValues(self) -> tuple:
+        return super().hashValues() + (self.createDate, self.updateDate)
+
+    def computeHash(self):
+        # Fields cache their own hashes, so an element rehashes only its values and field digests
+        digest = super().computeHash()
+        for section in (self.public, self.private):
+            digest.update(b'\x00')
+            for field in section:
+                digest.update(field.contentHash())
+        return digest
+
     def __eq__(self, __o: object) -> bool:
         if isinstance(__o, CollectionElement):
-            return self.toDict() == __o.toDict()
+            # Values are compared as they are now rather than through the cached element hash, which
+            # lists written in place don't drop. Fields drop their own hashes on every change.
+            return self is __o or (type(self) == type(__o) and self.hashValues() == __o.hashValues()
+                                   and CollectionElement.__sameFields(self.public, __o.public)
+                                   and CollectionElement.__sameFields(self.private, __o.private))
         elif isinstance(__o, dict):
             warnings.warn(
                 "Warning: instance {} is dict, not Element.".format(__o))
@@ -183,8 +252,12 @@ class CollectionElement(TreeNode):
         else:
             return False
 
+    def __sameFields(fieldsA: list, fieldsB: list) -> bool:
+        return len(fieldsA) == len(fieldsB) and all(a is b or a.contentHash() == b.contentHash() for a, b in zip(fieldsA, fieldsB))
+
     def updateUpdateTime(self):
         self.updateDate = currentTime()
+        self.markDirty()
 
 
 class WorkItemDefinition(CollectionElement):
@@ -213,16 +286,18 @@ class WorkItemDefinition(CollectionElement):
                     for serializedField in inDict['public']]
         e.private = [parseField(serializedField)
                      for serializedField in inDict['private']]
+        e.adoptFields()
 
         e.downstream = inDict['downstream']
         e.upstream = inDict['upstream']
 
         # Time tracking
-        e.createDate = inDict['createDate']
-        e.updateDate = inDict['updateDate']
+        e.createDate = parseTime(inDict['createDate'])
+        e.updateDate = parseTime(inDict['updateDate'])
 
         e.name = inDict['name']
 
+        e.dirty = False
         return e
 
     def __init__(self, tree=None, parent=None, name: str = "Item Definition") -> None:
@@ -236,40 +311,68 @@ class WorkItemDefinition(CollectionElement):
         '''
         self.name = name
 
+        # Compiled on first use by items, dropped whenever the template changes
+        self._schema = None
+        # Deltas held back by batchChanges
+        self._pending = None
         self.templateChanged = Delegate()
+        self.templateChanged.connect(self.invalidateSchema)
+        self.attributeChanged.connect(self.invalidateSchema)
         # For definitions, streams define the stream rules
-        self.downstream: list[str] = []
-        self.upstream: list[str] = []
+        self.downstream: LinkSet = LinkSet()
+        self.upstream: LinkSet = LinkSet()
+
+    @property
+    def downstream(self) -> LinkSet:
+        return self._downstream
+
+    @downstream.setter
+    def downstream(self, links):
+        self._downstream = links if isinstance(links, LinkSet) else LinkSet(links)
+        self._downstream.owner = self
+        self._hash = None
+
+    @property
+    def upstream(self) -> LinkSet:
+        return self._upstream
+
+    @upstream.setter
+    def upstream(self, links):
+        self._upstream = links if isinstance(links, LinkSet) else LinkSet(links)
+        self._upstream.owner = self
+        self._hash = None
+
+    def getSerializationPath(self):
+        path = Scope.currentWorkspace.getFullPath(
+            Scope.currentWorkspace.getDefinitionPath(self))
+        return path if path.endswith(WorkItemDefinition.fileextension) else f'{path}{WorkItemDefinition.fileextension}'
 
     def serialize(self):
-        path = os.path.join(Scope.currentWorkspace.getFullPath(
-            Scope.currentWorkspace.getDefinitionPath(self)))
-        with open(f'{path}{WorkItemDefinition.fileextension}', "w") as outfile:
-            json.dump(self.toDict(), outfile)
+        Scope.currentWorkspace.saveElements([self])
 
     def addDownstreamRule(self, definition, allow=True):
         target = definition if isinstance(
             definition, WorkItemDefinition) else Scope.currentWorkspace.getDefinitionByUUID(definition)
-        if target.uuid in self.downstream:
+        if (target.uuid in self.downstream) == allow:
             return
         if allow:
-            self.downstream.append(target.uuid)
-            target.addUpstreamRule(self)
+            self.downstream.add(target.uuid)
         else:
             self.downstream.remove(target.uuid)
-            target.addUpstreamRule(self, False)
+        self.markDirty()
+        target.addUpstreamRule(self, allow)
 
     def addUpstreamRule(self, definition, allow=True):
         target = definition if isinstance(
             definition, WorkItemDefinition) else Scope.currentWorkspace.getDefinitionByUUID(definition)
-        if target.uuid in self.upstream:
+        if (target.uuid in self.upstream) == allow:
             return
         if allow:
-            self.upstream.append(target.uuid)
-            target.addDownstreamRule(self)
+            self.upstream.add(target.uuid)
         else:
             self.upstream.remove(target.uuid)
-            target.addDownstreamRule(self, False)
+        self.markDirty()
+        target.addDownstreamRule(self, allow)
 
     def getDownstream(self) -> list:
         return [Scope.currentWorkspace.getDefinitionByUUID(id) for id in self.downstream]
@@ -277,13 +380,111 @@ class WorkItemDefinition(CollectionElement):
     def getUpstream(self) -> list:
         return [Scope.currentWorkspace.getDefinitionByUUID(id) for id in self.upstream]
 
+    @property
+    def schema(self) -> TemplateSchema:
+        '''
+        Compiled fields of this definition, used to create and reconcile items.
+        '''
+        if self._schema == None:
+            self._schema = TemplateSchema(self.public, self.private)
+        return self._schema
+
+    def invalidateSchema(self, *args):
+        self._schema = None
+
+    @contextmanager
+    def batchChanges(self):
+        '''
+        Hold back template changes and send them to items as one templateChanged.
+
+        Yields:
+            WorkItemDefinition: This definition
+        '''
+        outer = self._pending == None
+        if outer:
+            self._pending = []
+        try:
+            yield self
+        finally:
+            if outer:
+                deltas = SchemaDelta.coalesce(self._pending)
+                self._pending = None
+                if deltas:
+                    self.templateChanged.emit(self, deltas)
+
+    def __changeTemplate(self, delta: SchemaDelta):
+        self._schema = None
+        if self._pending != None:
+            self._pending.append(delta)
+        else:
+            self.templateChanged.emit(self, [delta])
+
     def addPrivateField(self, field: Field):
         super().addPrivateField(field)
-        self.templateChanged.emit(self)
+        self.__changeTemplate(SchemaDelta(SchemaChange.ADDED, field.name, False, field.clone()))
 
     def addPublicField(self, field: Field):
         super().addPublicField(field)
-        self.templateChanged.emit(self)
+        self.__changeTemplate(SchemaDelta(SchemaChange.ADDED, field.name, True, field.clone()))
+
+    def addPrivateFields(self, fields: list[Field]):
+        with self.batchChanges():
+            super().addPrivateFields(fields)
+
+    def addPublicFields(self, fields: list[Field]):
+        with self.batchChanges():
+            super().addPublicFields(fields)
+
+    def removePrivateField(self, index: Union[str, int]):
+        name = index if isinstance(index, str) else self.private[index].name
+        super().removePrivateField(index)
+        self.__changeTemplate(SchemaDelta(SchemaChange.REMOVED, name, False))
+
+    def removePublicField(self, index: Union[str, int]):
+        name = index if isinstance(index, str) else self.public[index].name
+        super().removePublicField(index)
+        self.__changeTemplate(SchemaDelta(SchemaChange.REMOVED, name, True))
+
+    def renameField(self, name: str, newname: str, public: bool = True):
+        '''
+        Rename a field of the template. Items keep the value of the field.
+
+        Args:
+            name (str): Current name
+            newname (str): New name
+            public (bool, optional): Public or private field. Defaults to True.
+        '''
+        field = self.getPublicField(name) if public else self.getPrivateField(name)
+        if field == None:
+            raise KeyError(name)
+        field.name = newname
+        self.markDirty()
+        self.__changeTemplate(SchemaDelta(SchemaChange.RENAMED, name, public, newname=newname))
+
+    def setFieldOptions(self, name: str, options: Union[list, dict], default: str = None, public: bool = True):
+        '''
+        Replace the options of an Enum, Checks or Radio field of the template. Items keep the
+        state of options that still exist.
+
+        Args:
+            name (str): Field name
+            options (Union[list, dict]): Enum labels, or Checks and Radio labels with their default state
+            default (str, optional): New default of an Enum field. Defaults to None, which keeps the default if it is still an option.
+            public (bool, optional): Public or private field. Defaults to True.
+        '''
+        field = self.getPublicField(name) if public else self.getPrivateField(name)
+        if field == None:
+            raise KeyError(name)
+        values = {'options': options}
+        if isinstance(field, EnumField):
+            labels = list(options)
+            if default == None:
+                default = field.default if field.default in labels else labels[0]
+            values['default'] = default
+            values['currentItem'] = field.currentItem if field.currentItem in labels else default
+        field.update(values)
+        self.markDirty()
+        self.__changeTemplate(SchemaDelta(SchemaChange.OPTIONSCHANGED, name, public, field.clone()))
 
     def toDict(self) -> dict:
         '''
@@ -294,25 +495,25 @@ class WorkItemDefinition(CollectionElement):
         '''
         based = super().toDict()
         based['name'] = self.name
-        based['downstream'] = self.downstream
-        based['upstream'] = self.upstream
+        based['downstream'] = self.downstream.toList()
+        based['upstream'] = self.upstream.toList()
         return based
 
     def __str__(self) -> str:
         return f'{self.name}\n{super().__str__()}'
 
-    def __eq__(self, __o: object) -> bool:
-        if isinstance(__o, WorkItemDefinition):
-            return __o.toDict() == self.toDict()
-        return super().__eq__(__o)
+    def hashValues(self) -> tuple:
+        return super().hashValues() + (tuple(self.downstream), tuple(self.upstream))
 
 
 class WorkItem(WorkItemDefinition):
     fileextension = f'{config.fileprefix}item'
 
     def fromDict(inDict: dict):
-        e = WorkItem(template=Scope.currentWorkspace.getDefinitionByUUID(
-            inDict['template']))
+        # Fields come from the dict, so the template only needs to be connected
+        e = WorkItem()
+        e.setTemplate(Scope.currentWorkspace.getDefinitionByUUID(
+            inDict['template']), populate=False)
 
         # Identifiers
         e.uuid = inDict['uuid']
@@ -326,31 +527,82 @@ class WorkItem(WorkItemDefinition):
                     for serializedField in inDict['public']]
         e.private = [parseField(serializedField)
                      for serializedField in inDict['private']]
+        e.adoptFields()
 
         # Time tracking
-        e.createDate = inDict['createDate']
-        e.updateDate = inDict['updateDate']
+        e.createDate = parseTime(inDict['createDate'])
+        e.updateDate = parseTime(inDict['updateDate'])
 
         e.name = inDict['name']
 
+        e.dirty = False
         return e
 
     def __init__(self, tree=None, parent=None, name: str = "Item Definition", template: WorkItemDefinition = None) -> None:
         super().__init__(tree, parent, name)
         self.itemChanged = Delegate()
+        self.template = None
+        # Handle of the templateChanged connection, disconnects without scanning the subscribers
+        self._templateConnection = None
         if template == None:
             return
+        self.setTemplate(template)
+
+    def setTemplate(self, template: WorkItemDefinition, populate: bool = True):
+        '''
+        Follow a definition.
+
+        Args:
+            template (WorkItemDefinition): Definition to follow
+            populate (bool, optional): Reconcile the fields with the template. Defaults to True.
+        '''
+        if self._templateConnection != None:
+            self._templateConnection.disconnect()
         self.template = template
-        self.template.templateChanged.connect(self.populateFromTemplate)
+        self._templateConnection = self.template.templateChanged.connect(self.onTemplateChanged)
+        self.invalidateHash()
+        self.attributeChanged.emit(self, ('template',))
+        if populate:
+            self.populateFromTemplate(template)
+
+    def onTemplateChanged(self, args: tuple):
+        if len(args) > 1:
+            self.applyTemplateDeltas(args[1])
+        else:
+            self.populateFromTemplate(args[0])
 
-        self.populateFromTemplate(self.template)
+    def applyTemplateDeltas(self, deltas: list[SchemaDelta]):
+        '''
+        Apply changes of the template to the fields of this item.
 
-    def serialize(self):
-        path = os.path.join(Scope.currentWorkspace.getFullPath(
-            Scope.currentWorkspace.getWorkitemPath(self)))
-            
-        with open(os.path.normpath(f'{path}{WorkItem.fileextension}'), "w") as outfile:
-            json.dump(self.toDict(), outfile)
+        Args:
+            deltas (list[SchemaDelta]): Changes, in order
+        '''
+        # Items apply template changes without announcing them as template changes of their own
+        for delta in deltas:
+            field = self.getPublicField(delta.name) if delta.public else self.getPrivateField(delta.name)
+            match delta.change:
+                case SchemaChange.ADDED:
+                    if field == None:
+                        (CollectionElement.addPublicField if delta.public else CollectionElement.addPrivateField)(
+                            self, delta.field.clone())
+                case SchemaChange.REMOVED:
+                    if field != None:
+                        (CollectionElement.removePublicField if delta.public else CollectionElement.removePrivateField)(
+                            self, delta.name)
+                case SchemaChange.RENAMED:
+                    if field != None:
+                        field.name = delta.newname
+                case SchemaChange.OPTIONSCHANGED:
+                    if field != None:
+                        field.reconcile(delta.field, dropOptions=True)
+        self.markDirty()
+        self.attributeChanged.emit(self, deltas)
+
+    def getSerializationPath(self):
+        path = Scope.currentWorkspace.getFullPath(
+            Scope.currentWorkspace.getWorkitemPath(self))
+        return os.path.normpath(path if path.endswith(WorkItem.fileextension) else f'{path}{WorkItem.fileextension}')
 
     def addDownstreamRule(self, definition, allow=True):
         pass
@@ -366,7 +618,10 @@ class WorkItem(WorkItemDefinition):
 
     def addDownstream(self, item):
         def commit():
-            self.downstream.append(target.uuid)
+            self.downstream.add(target.uuid)
+            self.markDirty()
+            if Scope.currentWorkspace != None:
+                Scope.currentWorkspace.invalidateTraceGraph()
             target.addUpstream(self)
         target = item if isinstance(
             item, WorkItem) else Scope.currentWorkspace.getWorkItemByUUID(item)
@@ -384,7 +639,10 @@ class WorkItem(WorkItemDefinition):
 
     def addUpstream(self, item):
         def commit():
-            self.upstream.append(target.uuid)
+            self.upstream.add(target.uuid)
+            self.markDirty()
+            if Scope.currentWorkspace != None:
+                Scope.currentWorkspace.invalidateTraceGraph()
             target.addDownstream(self)
         target = item if isinstance(
             item, WorkItem) else Scope.currentWorkspace.getWorkItemByUUID(item)
@@ -401,30 +659,30 @@ class WorkItem(WorkItemDefinition):
         commit()
 
     def populateFromTemplate(self, template: WorkItemDefinition):
-        currentpublicidentifiers = {field.name: field for field in self.public}
-        currentpublickeys = list(currentpublicidentifiers.keys())
-        for currentkey in currentpublickeys:
-            if currentkey not in [field.name for field in template.public]:
-                self.removePublicField(currentkey)
-        for publictemplatefield in template.public:
-            if publictemplatefield.name in currentpublickeys:
-                currentpublicidentifiers[publictemplatefield.name].reconcile(
-                    publictemplatefield)
-            else:
-                self.addPublicField(copy.deepcopy(publictemplatefield))
-
-        currentprivateidentifiers = {
-            field.name: field for field in self.private}
-        currentprivatekeys = list(currentprivateidentifiers.keys())
-        for currentkey in currentprivatekeys:
-            if currentkey not in [field.name for field in template.private]:
-                self.removePrivateField(currentkey)
-        for privatetemplatefield in template.private:
-            if privatetemplatefield.name in list(currentprivateidentifiers.keys()):
-                currentprivateidentifiers[privatetemplatefield.name].reconcile(
-                    privatetemplatefield)
+        schema = template.schema
+        if not self.public and not self.private:
+            # New item, take the defaults without reconciling
+            self.public, self.private = schema.instantiate()
+            self.adoptFields()
+            self.markDirty()
+            return
+        self.__reconcile(self.public, schema.names(True), CollectionElement.removePublicField, CollectionElement.addPublicField)
+        self.__reconcile(self.private, schema.names(False), CollectionElement.removePrivateField, CollectionElement.addPrivateField)
+        self.attributeChanged.emit(self, template)
+
+    def __reconcile(self, fields: list, prototypes: dict, remove: Callable, add: Callable):
+        current = {field.name: field for field in fields}
+        for name in current:
+            if name not in prototypes:
+                remove(self, name)
+        for name, prototype in prototypes.items():
+            if name in current:
+                current[name].reconcile(prototype)
             else:
-                self.addPrivateField(copy.deepcopy(privatetemplatefield))
+                add(self, prototype.clone())
+
+    def hashValues(self) -> tuple:
+        return super().hashValues() + (self.template.uuid if self.template is not None else None,)
 
     def toDict(self) -> dict:
         d = super().toDict()
@@ -434,6 +692,8 @@ class WorkItem(WorkItemDefinition):
 
 class Document(TreeNode):
     fileextension = f'{config.fileprefix}doc'
+    createDate = hashedAttribute('_createDate')
+    updateDate = hashedAttribute('_updateDate')
     '''
     Collection of item types to be used inside systems and standards collections.
     '''
@@ -453,13 +713,14 @@ class Document(TreeNode):
         e.uuid = inDict['uuid']
 
         # Time tracking
-        e.createDate = inDict['createDate']
-        e.updateDate = inDict['updateDate']
+        e.createDate = parseTime(inDict['createDate'])
+        e.updateDate = parseTime(inDict['updateDate'])
 
         e.name = inDict['name']
 
         e.workItems = inDict['workItems']
 
+        e.dirty = False
         return e
 
     def __init__(self, name: str = "Item Collection", tree=None, parent=None) -> None:
@@ -474,22 +735,25 @@ class Document(TreeNode):
         self.name = name
 
         self.createDate = currentTime()
-        self.updateDate = currentTime()
+        self.updateDate = self.createDate
 
         self.workItems: list[str] = []
 
-    def serialize(self):
-        path = os.path.join(Scope.currentWorkspace.getFullPath(
-            Scope.currentWorkspace.getDocumentPath(self)))
-        if not os.path.exists(path):
-            os.makedirs(path)
+    def getSerializationPath(self):
+        # Documents are folders holding their own file
+        path = Scope.currentWorkspace.getFullPath(
+            Scope.currentWorkspace.getDocumentPath(self))
+        return path if path.endswith(Document.fileextension) else os.path.join(path, f'{self.name}{Document.fileextension}')
 
-        with open(os.path.join(path, f'{self.name}{Document.fileextension}'), "w") as outfile:
-            json.dump(self.toDict(), outfile)
+    def serialize(self):
+        Scope.currentWorkspace.saveElements([self])
 
     def getWorkItems(self):
         return [Scope.currentWorkspace.getWorkItemByUUID(workitem) for workitem in self.workItems]
 
+    def hashValues(self) -> tuple:
+        return super().hashValues() + (self.createDate, self.updateDate, tuple(self.workItems))
+
     def toDict(self) -> dict:
         '''
         Serializes ItemTypeCollection to dict
@@ -500,8 +764,8 @@ class Document(TreeNode):
         based = {}
         based['uuid'] = self.uuid
         based['name'] = self.name
-        based['createDate'] = self.createDate
-        based['updateDate'] = self.updateDate
+        based['createDate'] = formatTime(self.createDate)
+        based['updateDate'] = formatTime(self.updateDate)
         based['workItems'] = self.workItems
         return based
 
@@ -525,18 +789,30 @@ class Project(CollectionElement):
         self.documents: list[str] = []
 
     def save(self):
-        self.serialize()
-        [Scope.currentWorkspace.getDefinitionByUUID(id).serialize() for id in self.definitions]
-        [Scope.currentWorkspace.getWorkItemByUUID(id).serialize() for id in self.workitems]
-        [Scope.currentWorkspace.getDocumentByUUID(id).serialize() for id in self.documents]
+        '''
+        Write the project and every modified element it references.
 
-    def serialize(self):
+        Elements that were never loaded can't have changed, so they are skipped without being loaded.
+        Elements whose edits were undone since they were last saved are skipped too.
+        '''
+        elements = [self] + [Scope.currentWorkspace.getLoadedElement(id) for id in self.definitions + self.workitems + self.documents]
+        elements = [element for element in elements if not isinstance(element, NoneType) and element.dirty]
+        for element in elements:
+            if not element.hasChanges():
+                element.dirty = False
+        Scope.currentWorkspace.saveElements([element for element in elements if element.dirty])
+
+    def getSerializationPath(self):
+        # Projects are folders holding their own file
         path = Scope.currentWorkspace.getFullPath(
-            Scope.currentWorkspace.getDocumentPath(self))
-        if not os.path.exists(path):
-            os.makedirs(path)
-        with open(os.path.join(path, f'{self.name}{Project.fileextension}'), "w") as outfile:
-            json.dump(self.toDict(), outfile)
+            Scope.currentWorkspace.getProjectPath(self))
+        return path if path.endswith(Project.fileextension) else os.path.join(path, f'{self.name}{Project.fileextension}')
+
+    def serialize(self):
+        Scope.currentWorkspace.saveElements([self])
+
+    def hashValues(self) -> tuple:
+        return super().hashValues() + (tuple(self.definitions), tuple(self.workitems), tuple(self.documents))
 
     def toDict(self) -> dict:
         d = super().toDict()
@@ -558,15 +834,17 @@ class Project(CollectionElement):
                     for serializedField in inDict['public']]
         e.private = [parseField(serializedField)
                      for serializedField in inDict['private']]
+        e.adoptFields()
 
         e.definitions = inDict['definitions']
         e.workitems = inDict['workitems']
         e.documents = inDict['documents']
 
         # Time tracking
-        e.createDate = inDict['createDate']
-        e.updateDate = inDict['updateDate']
+        e.createDate = parseTime(inDict['createDate'])
+        e.updateDate = parseTime(inDict['updateDate'])
 
+        e.dirty = False
         return e
 
     def createWorkItemDefinition(self, name='Default Work Item Definition', parent=None):
@@ -576,6 +854,7 @@ class Project(CollectionElement):
         definition = Scope.currentWorkspace.createNewWorkItemDefinition(
             name, parent)
         self.definitions.append(definition.uuid)
+        self.markDirty()
         return definition
 
     def createWorkItem(self, name=None, template=None, parent=None):
@@ -584,6 +863,7 @@ class Project(CollectionElement):
         workitem = Scope.currentWorkspace.createNewWorkItem(
             name=name, template=template, parent=parent)
         self.workitems.append(workitem.uuid)
+        self.markDirty()
         return workitem
 
     def createNewDocument(self, name='Default Document', parent=None):
@@ -591,6 +871,7 @@ class Project(CollectionElement):
             parent = self
         doc = Scope.currentWorkspace.createNewDocument(name, parent)
         self.documents.append(doc.uuid)
+        self.markDirty()
         return doc
 
     def getDocuments(self):
@@ -604,7 +885,13 @@ class Project(CollectionElement):
 
 class Workspace(Tree):
 
-    def __init__(self, directory: str) -> None:
+    def __init__(self, directory: str, packed=False) -> None:
+        '''
+        Args:
+            directory (str): Workspace root
+            packed (bool, optional): Store elements in one archive file at the root instead of one file
+                per element. Defaults to False.
+        '''
         super().__init__()
         self.root = directory
 
@@ -615,40 +902,127 @@ class Workspace(Tree):
         self.__projects = {}
         self.__workitems = {}
         self.__documents = {}
+        self.archive = PackedArchive(os.path.join(directory, config.archivefilename)) if packed else None
+        # Shapes of the binary files, which only carry their id
+        self.shapes = ShapeTable(os.path.join(directory, config.shapesfilename))
+        # The archive carries its own index
+        self.index = WorkspaceIndex(directory) if config.useWorkspaceIndex and not packed else None
+        # Built on first use, dropped when items or their links change
+        self.__traceGraph = None
+        # Built on first use, then kept in sync with the items
+        self.__query = None
+        # Built on discovery or first use, then kept in sync with the items and their files
+        self.__search = None
+        # Loaded work items in use order, unloaded past the configured limits
+        self.cache = HydrationCache(config.hydrationCacheSize, config.hydrationCacheBytes)
         if directory == None:
             return
 
-    def discoveritems(self, directory):
-        self.discoverDocuments(directory)
-        self.discoverProjects(directory)
-        self.discoverDefinitions(directory)
-        self.discoverWorkItems(directory)
+    def discoveritems(self, directory, lazy=False):
+        '''
+        Discover every element under directory.
+
+        Args:
+            directory (str): Workspace root
+            lazy (bool, optional): Only index uuid, name and path for each file. Elements are loaded
+                on first access through the getters. Files that are unchanged since the last lazy
+                discovery are taken from the workspace index without being read. Defaults to False,
+                which reads every file and leaves the workspace index alone.
+        '''
+        self.invalidateTraceGraph()
+        self.__query = None
+        self.__search = None
+        self.cache = HydrationCache(config.hydrationCacheSize, config.hydrationCacheBytes)
+        self.shapes.load()
+        if self.archive != None:
+            self.__discoverArchive(lazy)
+            self.updateStructureFromFileStructure()
+            if config.useSearchIndex:
+                self.__buildSearch()
+            self.__cacheDiscovered()
+            return
+
+        # One walk for every extension, then parse each bucket on a pool.
+        # Buckets are registered in dependency order since work items resolve their template on load.
+        files = getFilesByExtension(directory, [cls.fileextension for cls in Workspace.elementtypes], stat=True)
+        # Loading every element reads every file anyway, so only lazy discoveries use the index.
+        # Entries are checked against file stats, so eager discoveries in between can't make it stale.
+        useindex = lazy and self.index != None
+        known = self.index.load() if useindex else {}
+        self.discoverDocuments(directory, files[Document.fileextension], lazy, known)
+        self.discoverProjects(directory, files[Project.fileextension], lazy, known)
+        self.discoverDefinitions(directory, files[WorkItemDefinition.fileextension], lazy, known)
+        self.discoverWorkItems(directory, files[WorkItem.fileextension], lazy, known)
 
         self.updateStructureFromFileStructure()
 
+        if useindex:
+            self.index.sync(self.__indexEntries(), known)
+        if config.useSearchIndex:
+            # Lazy discoveries only check the stored stats, changed files are read on first search
+            self.__buildSearch()
+        self.__cacheDiscovered()
+
+    def __cacheDiscovered(self):
+        for uuid, itemlookup in self.__workitems.items():
+            if not isinstance(itemlookup['item'], NoneType):
+                self.cache.add(uuid, itemlookup.get('size'))
+        self.__evict()
+
+    def __indexEntries(self):
+        registries = [(Document, self.__documents), (Project, self.__projects),
+                      (WorkItemDefinition, self.__definitions), (WorkItem, self.__workitems)]
+        return [{
+            'uuid': uuid,
+            'path': itemlookup['path'],
+            'kind': cls.fileextension,
+            'name': itemlookup.get('name'),
+            'parent': itemlookup.get('parent'),
+            'mtime': itemlookup.get('mtime'),
+            'size': itemlookup.get('size')
+        } for cls, registry in registries for uuid, itemlookup in registry.items()]
+
     def updateStructureFromFileStructure(self):
+        containers = self.__containers()
 
+        # Definitions and work items sit next to their container's file
         dicts = [self.__definitions, self.__workitems]
         for dict in dicts:
             for uuid, itemlookup in dict.items():
-                parent = first([lookup['item'] for uuid, lookup in self.__documents.items() if os.path.dirname(self.getFullPath(itemlookup['path'])) == os.path.dirname(self.getFullPath(
-                    lookup['path']))] + [lookup['item'] for uuid, lookup in self.__projects.items() if os.path.dirname(self.getFullPath(itemlookup['path'])) == os.path.dirname(self.getFullPath(lookup['path']))])
-                itemlookup['item'].tree = self
-                self.addNode(itemlookup['item'])
-                itemlookup['item'].parent = parent
-                item = itemlookup['item']
-                loc = itemlookup['path']
+                self.__place(itemlookup, containers, False)
 
+        # Containers sit one directory below their parent container's file
         dicts = [self.__projects, self.__documents]
         for dict in dicts:
             for uuid, itemlookup in dict.items():
-                parent = first([lookup['item'] for uuid, lookup in self.__documents.items() if os.path.dirname(os.path.dirname(self.getFullPath(itemlookup['path']))) == os.path.dirname(self.getFullPath(
-                    lookup['path']))] + [lookup['item'] for uuid, lookup in self.__projects.items() if os.path.dirname(os.path.dirname(self.getFullPath(itemlookup['path']))) == os.path.dirname(self.getFullPath(lookup['path']))])
-                itemlookup['item'].tree = self
-                self.addNode(itemlookup['item'])                
-                itemlookup['item'].parent = parent
-                item = itemlookup['item']
-                loc = itemlookup['path']
+                self.__place(itemlookup, containers, True)
+
+    def __containers(self) -> dict:
+        # Containers own the directory their file sits in, first registered wins
+        containers = {}
+        for dict in [self.__documents, self.__projects]:
+            for uuid, lookup in dict.items():
+                containers.setdefault(os.path.dirname(self.getFullPath(lookup['path'])), uuid)
+        return containers
+
+    def __place(self, itemlookup: dict, containers: dict, container: bool):
+        directory = os.path.dirname(self.getFullPath(itemlookup['path']))
+        itemlookup['parent'] = containers.get(os.path.dirname(directory) if container else directory)
+        if not isinstance(itemlookup['item'], NoneType):
+            self.__link(itemlookup)
+
+    def __link(self, itemlookup: dict):
+        # Attach a loaded element to the tree under its discovered parent
+        itemlookup['item'].tree = self
+        self.addNode(itemlookup['item'])
+        itemlookup['item'].parent = self.__getContainer(itemlookup.get('parent'))
+
+    def __getContainer(self, uuid: str):
+        if uuid in self.__documents:
+            return self.getDocumentByUUID(uuid)
+        if uuid in self.__projects:
+            return self.getProjectByUUID(uuid)
+        return None
 
     def getFullPath(self, relpath: str):
         return f'{self.root}{os.sep}{relpath}'
@@ -665,86 +1039,782 @@ class Workspace(Tree):
 
     # Discovery
 
-    def discoverDefinitions(self, dir: str):
+    def discoverDefinitions(self, dir: str, paths: list = None, lazy=False, known: dict = None):
         # Get all definitions
-        for definitionpath in getFilesWithExtension([dir], extension=WorkItemDefinition.fileextension, recursive=True):
-            item = WorkItemDefinition.fromDict(loadJsonLike(
-                os.path.relpath(definitionpath, os.path.dirname(dir))))
-            self.__definitions[item.uuid] = {
-                'path': os.path.relpath(definitionpath, dir),
-                'item':  item
-            }
+        self.__discover(dir, paths, WorkItemDefinition, self.__definitions, lazy, known)
 
-    def discoverDocuments(self, dir: str):
+    def discoverDocuments(self, dir: str, paths: list = None, lazy=False, known: dict = None):
         # Get All Documents
-        for documentpath in getFilesWithExtension([dir], extension=Document.fileextension, recursive=True):
-            doc = Document.fromDict(loadJsonLike(
-                os.path.relpath(documentpath, os.path.dirname(dir))))
-            self.__documents[doc.uuid] = {
-                'path': os.path.relpath(documentpath, dir),
-                'item': doc
-            }
+        self.__discover(dir, paths, Document, self.__documents, lazy, known)
 
-    def discoverWorkItems(self, dir: str):
+    def discoverWorkItems(self, dir: str, paths: list = None, lazy=False, known: dict = None):
         # Get All Work Items
-        for workitempath in getFilesWithExtension([dir], extension=WorkItem.fileextension, recursive=True):
-            wi = WorkItem.fromDict(loadJsonLike(
-                os.path.relpath(workitempath, os.path.dirname(dir))))
+        self.__discover(dir, paths, WorkItem, self.__workitems, lazy, known)
 
-            self.__workitems[wi.uuid] = {
-                'path': os.path.relpath(workitempath, dir),
-                'item': wi
-            }
-
-    def discoverProjects(self, dir: str):
+    def discoverProjects(self, dir: str, paths: list = None, lazy=False, known: dict = None):
         # Get all projects
-        for projectpath in getFilesWithExtension([dir], extension=Project.fileextension, recursive=True):
-            project = Project.fromDict(loadJsonLike(
-                os.path.relpath(projectpath, os.path.dirname(dir))))
-            self.__projects[project.uuid] = {
-                'path': os.path.relpath(projectpath, dir),
-                'item': project
+        self.__discover(dir, paths, Project, self.__projects, lazy, known)
+
+    def __discover(self, dir: str, paths: list, cls, registry: dict, lazy=False, known: dict = None):
+        '''
+        Register elements of one type.
+
+        Args:
+            dir (str): Workspace root
+            paths (list): File paths or (path, os.stat_result) pairs. Defaults to walking dir.
+            cls (type): Element type
+            registry (dict): Registry to fill
+            lazy (bool, optional): Register stubs instead of loaded elements. Defaults to False.
+            known (dict, optional): Index entries by relative path, reused for files whose stat is unchanged.
+        '''
+        if paths == None:
+            paths = getFilesWithExtension([dir], extension=cls.fileextension, recursive=True)
+        known = known if known != None else {}
+        files = []
+        for path in paths:
+            path, stat = path if isinstance(path, tuple) else (path, None)
+            files.append((path, os.path.relpath(path, dir), stat.st_mtime_ns if stat else None, stat.st_size if stat else None))
+        if lazy:
+            # Index only, elements are named after their file
+            for path, relpath, mtime, size in files:
+                entry = known.get(relpath)
+                if entry == None or entry['kind'] != cls.fileextension or (entry['mtime'], entry['size']) != (mtime, size):
+                    entry = {'uuid': sniffUUID(path), 'name': os.path.basename(path)[:-len(cls.fileextension)]}
+                registry[entry['uuid']] = {
+                    'path': relpath,
+                    'name': entry['name'],
+                    'mtime': mtime,
+                    'size': size,
+                    'item': None
+                }
+            return
+        # Elements are built here while the pool parses the files after them
+        for (path, relpath, mtime, size), loaded in zip(files, iterJsonLikeMany([file[0] for file in files])):
+            item = cls.fromDict(loaded)
+            registry[item.uuid] = {
+                'path': relpath,
+                'name': item.name,
+                'mtime': mtime,
+                'size': size,
+                'item': item
             }
 
     # Getters/Lazy loader
 
+    def __discoverArchive(self, lazy=False):
+        registries = {Document.fileextension: self.__documents, Project.fileextension: self.__projects,
+                      WorkItemDefinition.fileextension: self.__definitions, WorkItem.fileextension: self.__workitems}
+        entries = self.archive.entries()
+        for cls in Workspace.elementtypes:
+            for uuid, (kind, path, offset, length) in entries.items():
+                if kind != cls.fileextension:
+                    continue
+                item = None if lazy else cls.fromDict(self.archive.read(uuid))
+                registries[kind][uuid] = {
+                    'path': path,
+                    'name': os.path.basename(path)[:-len(kind)],
+                    'item': item
+                }
+
+    def __read(self, uuid: str, itemlookup: dict):
+        if self.archive != None and uuid in self.archive:
+            return self.archive.read(uuid)
+        return loadJsonLike(self.getFullPath(itemlookup['path']))
+
+    def __hydrate(self, registry: dict, cls, uuid: str):
+        itemlookup = registry[uuid]
+        if not isinstance(itemlookup['item'], NoneType):
+            if cls is WorkItem:
+                self.cache.hit(uuid)
+            return itemlookup['item']
+        if cls is not WorkItem:
+            itemlookup['item'] = cls.fromDict(self.__read(uuid, itemlookup))
+            self.__link(itemlookup)
+            return itemlookup['item']
+
+        item = self.__revive(uuid)
+        if item is None:
+            self.cache.misses += 1
+            item = WorkItem.fromDict(self.__read(uuid, itemlookup))
+        itemlookup['item'] = item
+        self.__link(itemlookup)
+        if self.__query != None:
+            self.__query.add(item)
+        if self.__search != None:
+            self.__search.follow(item, None if item.dirty else Workspace.__stat(itemlookup))
+        self.cache.add(uuid, itemlookup.get('size'))
+        self.__evict(uuid)
+        return item
+
+    def __revive(self, uuid: str):
+        # An evicted item that is still referenced is reused, unless its template changed since
+        revived = self.cache.revive(uuid)
+        if revived == None:
+            return None
+        item, schema = revived
+        template = item.template
+        if template == None or self.getLoadedElement(template.uuid) is not template or template.schema is not schema:
+            return None
+        item._templateConnection = template.templateChanged.connect(item.onTemplateChanged)
+        self.cache.revivals += 1
+        return item
+
+    def __evict(self, keep: str = None):
+        # Unload the least recently used clean items, except keep, until the cache is within its
+        # limits. The query index releases them and reads them again through the getter.
+        attempts = len(self.cache)
+        while self.cache.full() and attempts > 0:
+            attempts -= 1
+            uuid = self.cache.oldest()
+            itemlookup = self.__workitems.get(uuid)
+            item = itemlookup['item'] if itemlookup != None else None
+            if isinstance(item, NoneType):
+                self.cache.forget(uuid)
+                continue
+            if item.dirty or uuid == keep:
+                self.cache.pin(uuid)
+                continue
+            schema = item.template.schema if item.template != None else None
+            if self.unloadElement(uuid):
+                self.cache.evicted(item, schema)
+
     def getWorkItemByUUID(self, uuid: str):
-        if isinstance(self.__workitems[uuid]['item'], NoneType):
-            self.__workitems[uuid]['item'] = WorkItem.fromDict(
-                loadJsonLike(self.getFullPath(self.__workitems[uuid]['path'])))
-        return self.__workitems[uuid]['item']
+        return self.__hydrate(self.__workitems, WorkItem, uuid)
 
     def getWorkItems(self):
         return [self.getWorkItemByUUID(id) for id in self.__workitems]
 
     def getProjectByUUID(self, uuid: str):
-        if isinstance(self.__projects[uuid]['item'], NoneType):
-            self.__projects[uuid]['item'] = Project.fromDict(
-                loadJsonLike(self.getFullPath(self.__projects[uuid]['path'])))
-        return self.__projects[uuid]['item']
+        return self.__hydrate(self.__projects, Project, uuid)
 
     def getProjects(self):
         return [self.getProjectByUUID(id) for id in list(self.__projects.keys())]
 
     def getDefinitionByUUID(self, uuid: str):
-        if isinstance(self.__definitions[uuid]['item'], NoneType):
-            self.__definitions[uuid]['item'] = WorkItemDefinition.fromDict(
-                loadJsonLike(self.getFullPath(self.__definitions[uuid]['path'])))
-        return self.__definitions[uuid]['item']
+        return self.__hydrate(self.__definitions, WorkItemDefinition, uuid)
 
     def getDefinitions(self):
         return [self.getDefinitionByUUID(id) for id in self.__definitions]
 
     def getDocumentByUUID(self, uuid: str):
-        if isinstance(self.__documents[uuid]['item'], NoneType):
-            self.__documents[uuid]['item'] = Document.fromDict(
-                loadJsonLike(self.getFullPath(self.__documents[uuid]['path'])))
-
-        return self.__documents[uuid]['item']
+        return self.__hydrate(self.__documents, Document, uuid)
 
     def getDocuments(self):
         return [self.getDocumentByUUID(id) for id in self.__documents]
 
+    def traceGraph(self) -> TraceGraph:
+        '''
+        Get the index of upstream/downstream links between work items, for transitive queries
+        such as coverage and impact. Built on first use, which loads every work item, and reused
+        until an item is added or linked.
+
+        Returns:
+            TraceGraph: Links of every work item
+        '''
+        if self.__traceGraph is None:
+            items = self.getWorkItems()
+            nodes = {item.uuid: item.template.uuid if item.template != None else None for item in items}
+            links = [(item.uuid, target) for item in items for target in item.downstream]
+            links += [(source, item.uuid) for item in items for source in item.upstream]
+            self.__traceGraph = TraceGraph(nodes, links)
+        return self.__traceGraph
+
+    def linkMany(self, pairs) -> int:
+        '''
+        Link work items in bulk. Scope.rulespolicy is applied once per pair of templates instead
+        of once per link: with STRICT, links between templates without a rule are skipped, and with
+        WARN they are made after one warning per pair of templates.
+
+        Args:
+            pairs (Iterable[tuple]): (upstream, downstream) work items or uuids
+
+        Returns:
+            int: Links added, not counting links that already existed or were skipped
+        '''
+        # (id of upstream template, id of downstream template) -> link allowed
+        rules = {}
+        added = 0
+        for upstream, downstream in pairs:
+            source = upstream if isinstance(upstream, WorkItem) else self.getWorkItemByUUID(upstream)
+            target = downstream if isinstance(downstream, WorkItem) else self.getWorkItemByUUID(downstream)
+            key = (id(source.template), id(target.template))
+            allowed = rules.get(key)
+            if allowed is None:
+                allowed = rules[key] = Workspace.__allowsLink(source.template, target.template)
+            if not allowed or (target.uuid in source.downstream and source.uuid in target.upstream):
+                continue
+            source.downstream.add(target.uuid)
+            target.upstream.add(source.uuid)
+            source.markDirty()
+            target.markDirty()
+            added += 1
+        if added:
+            self.invalidateTraceGraph()
+        return added
+
+    def __allowsLink(sourcetemplate, targettemplate) -> bool:
+        # The rule has to be in both definitions, as addDownstream checks both ends
+        if sourcetemplate != None and targettemplate != None and targettemplate.uuid in sourcetemplate.downstream \
+                and sourcetemplate.uuid in targettemplate.upstream:
+            return True
+        if Scope.rulespolicy == Scope.RulesPolicy.WARN:
+            warnings.warn(
+                f'Warning: Rule broken while connecting items of {getattr(targettemplate, "uuid", None)} downstream of items of {getattr(sourcetemplate, "uuid", None)}.')
+        return Scope.rulespolicy != Scope.RulesPolicy.STRICT
+
+    def query(self) -> QueryIndex:
+        '''
+        Get the indexes of work items by template, name, Enum value and Checks option state, for
+        lookups such as every requirement assigned to an engineer. Built on first use, which reads
+        every work item, then updated as items change. Items the hydration cache evicts stay
+        indexed, and are read again when a result includes them.
+
+        Returns:
+            QueryIndex: Indexes of every work item
+        '''
+        if self.__query is None:
+            # Set first, so items the hydration cache evicts while it is built are released from it
+            self.__query = QueryIndex(resolve=self.getWorkItemByUUID)
+            for uuid in list(self.__workitems):
+                self.__query.add(self.getWorkItemByUUID(uuid))
+        return self.__query
+
+    def searchIndex(self) -> SearchIndex:
+        '''
+        Get the full-text index of the ShortText and LongText fields of work items, for keyword,
+        prefix and phrase search without loading items. Built on discovery from the postings stored
+        next to the workspace, which are queried where they are, reading only the files that
+        changed since they were stored, then updated as items are edited, saved, imported and
+        refreshed.
+
+        Returns:
+            SearchIndex: Index of every work item
+        '''
+        if self.__search is None:
+            self.__buildSearch()
+        self.__search.refresh()
+        return self.__search
+
+    def __buildSearch(self):
+        path = os.path.join(self.root, config.searchfilename) if self.archive == None and config.useSearchIndex else None
+        search = SearchIndex(path, self.__readTexts)
+        stored = search.load()
+        for uuid in stored:
+            if uuid not in self.__workitems:
+                search.remove(uuid)
+        for uuid, itemlookup in self.__workitems.items():
+            stat = Workspace.__stat(itemlookup)
+            item = itemlookup['item']
+            if not isinstance(item, NoneType):
+                search.follow(item, None if item.dirty else stat)
+            elif stat == None or stored.get(uuid) != stat:
+                search.markStale(uuid)
+        search.save()
+        self.__search = search
+
+    def __readTexts(self, uuids: list) -> dict:
+        # Reader of the search index, for items whose file changed since their texts were stored
+        lookups = [(uuid, self.__workitems[uuid]) for uuid in uuids if uuid in self.__workitems]
+        read = {uuid: None for uuid in uuids if uuid not in self.__workitems}
+        if self.archive != None:
+            dicts = [self.__read(uuid, itemlookup) for uuid, itemlookup in lookups]
+        else:
+            dicts = loadJsonLikeMany([self.getFullPath(itemlookup['path']) for uuid, itemlookup in lookups])
+        for (uuid, itemlookup), d in zip(lookups, dicts):
+            read[uuid] = (textsFromDict(d), Workspace.__stat(itemlookup))
+        return read
+
+    def __stat(itemlookup: dict) -> tuple:
+        # (mtime, size) of the file of a registry entry, None when it isn't known
+        return (itemlookup['mtime'], itemlookup['size']) if itemlookup.get('mtime') != None else None
+
+    def invalidateTraceGraph(self):
+        '''
+        Drop the cached trace graph. Called when work items are added or linked.
+        '''
+        self.__traceGraph = None
+
+    def getLoadedElement(self, uuid: str):
+        '''
+        Get an element only if it is already in memory.
+
+        Args:
+            uuid (str): Element uuid
+
+        Returns:
+            Union[CollectionElement, Document, None]: The element, or None if it is unknown or not loaded
+        '''
+        for registry in [self.__definitions, self.__workitems, self.__documents, self.__projects]:
+            if uuid in registry:
+                return registry[uuid]['item']
+        return None
+
+    def __registries(self):
+        return [(WorkItemDefinition, self.__definitions), (WorkItem, self.__workitems),
+                (Document, self.__documents), (Project, self.__projects)]
+
+    def getElementEntries(self) -> dict:
+        '''
+        Describe every known element without loading any.
+
+        Returns:
+            dict: uuid -> {'kind': file extension, 'path': relative path, 'mtime': ns or None, 'size': bytes or None}
+        '''
+        # Registries are copied in one step first, the polling watcher calls this from its thread
+        return {uuid: {'kind': cls.fileextension, 'path': itemlookup['path'],
+                       'mtime': itemlookup.get('mtime'), 'size': itemlookup.get('size')}
+                for cls, registry in self.__registries() for uuid, itemlookup in list(registry.items())}
+
+    def getElementByUUID(self, uuid: str):
+        '''
+        Get an element of any type, loading it if needed.
+
+        Args:
+            uuid (str): Element uuid
+
+        Returns:
+            Union[CollectionElement, Document, Project, None]: The element, or None if it is unknown
+        '''
+        for cls, registry in self.__registries():
+            if uuid in registry:
+                return self.__hydrate(registry, cls, uuid)
+        return None
+
+    def readRaw(self, uuid: str) -> bytes:
+        '''
+        Read the stored content of an element without decoding it.
+
+        Args:
+            uuid (str): Element uuid
+
+        Returns:
+            bytes: File or archive content
+        '''
+        if self.archive != None and uuid in self.archive:
+            return self.archive.readRaw(uuid)
+        itemlookup = self.__lookup(uuid)
+        if itemlookup == None:
+            raise KeyError(uuid)
+        path = self.getFullPath(itemlookup['path'])
+        if not os.path.isfile(path) and itemlookup['item'] != None:
+            # Created elements are registered under their tree path, not their file
+            path = itemlookup['item'].getSerializationPath()
+        with open(path, 'rb') as infile:
+            return infile.read()
+
+    def __lookup(self, uuid: str):
+        for cls, registry in self.__registries():
+            if uuid in registry:
+                return registry[uuid]
+        return None
+
+    def isLoaded(self, uuid: str) -> bool:
+        '''
+        Check whether an element has been loaded from disk, without loading it.
+
+        Args:
+            uuid (str): Element uuid
+
+        Returns:
+            bool: True if the element is in memory
+        '''
+        return not isinstance(self.getLoadedElement(uuid), NoneType)
+
+    def unloadElement(self, uuid: str) -> bool:
+        '''
+        Drop a loaded work item from memory, leaving the stub its registry entry was before it was
+        loaded. The next getter call reads it again. Items with unsaved changes are kept, and so
+        are definitions and containers, which the items loaded under them reference.
+
+        Args:
+            uuid (str): Work item uuid
+
+        Returns:
+            bool: True if the item was unloaded
+        '''
+        itemlookup = self.__workitems.get(uuid)
+        if itemlookup == None or isinstance(itemlookup['item'], NoneType) or itemlookup['item'].dirty:
+            return False
+        item = itemlookup['item']
+        if item._templateConnection != None:
+            item._templateConnection.disconnect()
+            item._templateConnection = None
+        if self.__query != None:
+            self.__query.release(item)
+        if self.__search != None:
+            self.__search.unfollow(uuid)
+        self.cache.forget(uuid)
+        self.removeNode(item)
+        itemlookup['item'] = None
+        return True
+
+    def refreshFiles(self, paths: list) -> dict:
+        '''
+        Pick up element files created, modified or deleted outside this workspace, touching only
+        those files. Loaded elements are patched in place so references to them stay valid, and
+        their tree parents, links and indexes follow. Elements that are not loaded only get their
+        registry entry updated. Files whose stat matches the one recorded when they were last read
+        or written are skipped without being read.
+
+        Loaded elements with unsaved changes are kept as they are, with a warning.
+
+        Args:
+            paths (list): Absolute or root relative paths. Paths that are not element files are ignored.
+
+        Returns:
+            dict: 'added', 'changed' and 'removed' -> uuids
+
+        Raises:
+            ValueError: The workspace is packed. Its elements live in the archive, not in element
+                files, so it is refreshed by opening it again.
+        '''
+        if self.archive != None:
+            raise ValueError('Packed workspaces have no element files to refresh, open them again instead')
+        # The files may have been written with shapes added to the table since it was loaded
+        self.shapes.load()
+        result = {'added': [], 'changed': [], 'removed': []}
+        kinds = {cls.fileextension: (cls, registry) for cls, registry in self.__registries()}
+        files = {}
+        for path in paths:
+            extension = os.path.splitext(path)[1]
+            if extension in kinds:
+                files[os.path.normpath(path if os.path.isabs(path) else self.getFullPath(path))] = extension
+        # Definitions first, work items resolve their template when they are patched
+        order = [cls.fileextension for cls in Workspace.elementtypes]
+        existing = sorted([path for path in files if os.path.isfile(path)], key=lambda path: order.index(files[path]))
+        deleted = [path for path in files if path not in existing]
+
+        placed = []
+        for path in existing:
+            extension = files[path]
+            cls, registry = kinds[extension]
+            stat = os.stat(path)
+            relpath = os.path.relpath(path, self.root)
+            uuid = sniffUUID(path)
+            itemlookup = registry.get(uuid)
+            if itemlookup == None:
+                itemlookup = registry[uuid] = {'path': relpath, 'name': os.path.basename(path)[:-len(extension)], 'item': None}
+                result['added'].append(uuid)
+            elif (itemlookup.get('mtime'), itemlookup.get('size')) == (stat.st_mtime_ns, stat.st_size) and \
+                    os.path.normpath(self.getFullPath(itemlookup['path'])) == path:
+                # Written by this workspace, or touched without changes
+                continue
+            else:
+                item = itemlookup['item']
+                if item != None:
+                    if item.hasChanges():
+                        warnings.warn(f'Warning: {uuid} changed on disk and in memory, keeping the changes in memory.')
+                        continue
+                    diffDicts(item.toDict(), loadJsonLike(path)).apply(item)
+                    item.markSaved()
+                    itemlookup['name'] = item.name
+                else:
+                    itemlookup['name'] = os.path.basename(path)[:-len(extension)]
+                itemlookup['path'] = relpath
+                result['changed'].append(uuid)
+            itemlookup['mtime'], itemlookup['size'] = stat.st_mtime_ns, stat.st_size
+            placed.append((cls, itemlookup))
+
+        if deleted:
+            bypath = {os.path.normpath(self.getFullPath(itemlookup['path'])): (uuid, registry)
+                      for cls, registry in self.__registries() for uuid, itemlookup in registry.items()}
+            for path in deleted:
+                if path not in bypath:
+                    continue
+                uuid, registry = bypath[path]
+                item = registry.pop(uuid)['item']
+                if item != None:
+                    self.removeNode(item)
+                    if self.__query != None and isinstance(item, WorkItem):
+                        self.__query.remove(item)
+                if self.__search != None:
+                    self.__search.remove(uuid)
+                self.cache.forget(uuid)
+                result['removed'].append(uuid)
+
+        if any(cls in (Document, Project) for cls, itemlookup in placed) or deleted:
+            # Containers moved, parents can change anywhere below them
+            self.updateStructureFromFileStructure()
+        else:
+            containers = self.__containers()
+            for cls, itemlookup in placed:
+                self.__place(itemlookup, containers, False)
+        if self.__query != None:
+            # Released items changed on disk are filed under stale values, reading them files them again
+            for uuid in result['added'] + result['changed']:
+                if uuid in self.__workitems and (uuid in result['added'] or not self.isLoaded(uuid)):
+                    self.__query.add(self.getWorkItemByUUID(uuid))
+        if self.__search != None:
+            for uuid in result['added'] + result['changed']:
+                itemlookup = self.__workitems.get(uuid)
+                if itemlookup == None:
+                    continue
+                if isinstance(itemlookup['item'], NoneType):
+                    self.__search.markStale(uuid)
+                else:
+                    self.__search.follow(itemlookup['item'], Workspace.__stat(itemlookup))
+            self.__search.save()
+        if placed or deleted:
+            self.invalidateTraceGraph()
+        return result
+
+    def watch(self, debounce: float = None, polling: bool = None, callback: Callable = None):
+        '''
+        Follow changes made to the files of this workspace by other programs, and refresh the
+        changed files once they have been quiet for debounce seconds.
+
+        The watcher collects changed paths on its own thread, and refreshFiles runs when poll() is
+        called on the watcher, on the thread that uses the workspace, since nothing here is locked.
+
+        Args:
+            debounce (float, optional): Seconds without changes before refreshing. Defaults to config.watchDebounce.
+            polling (bool, optional): Poll the recorded stat of every file instead of using inotify.
+                Defaults to None, which polls only where inotify is unavailable.
+            callback (Callable, optional): Called with the changed paths on the watching thread
+                instead of refreshFiles, for example to hand them to an event loop. Defaults to None.
+
+        Returns:
+            Watcher: Started watcher, stop it with stop()
+
+        Raises:
+            ValueError: The workspace is packed, see refreshFiles
+        '''
+        from BBData.Watcher import InotifyWatcher, PollingWatcher
+        if self.archive != None:
+            raise ValueError('Packed workspaces have no element files to watch, open them again instead')
+        if polling == None:
+            polling = not InotifyWatcher.available()
+        watcher = (PollingWatcher if polling else InotifyWatcher)(self, debounce=debounce, callback=callback)
+        watcher.start()
+        return watcher
+
+    def importWorkItems(self, records, template: WorkItemDefinition, parent=None, chunksize: int = None) -> list:
+        '''
+        Create work items in bulk from records, such as the rows of a CSV or JSON Lines export.
+        Records are consumed in chunks: each chunk is instantiated from the compiled template,
+        written in one batched write and unloaded again, so memory doesn't grow with the input.
+        Items are registered under parent without joining the tree, and are loaded and placed on
+        first access like discovered items.
+
+        Record keys naming a field of the template set its value, public fields first, see
+        Transfer.fieldUpdate. 'uuid' and 'name' are taken as they are. An item whose name is
+        already taken by a file in its folder is written to a file named after its name and uuid.
+        Other keys are ignored.
+
+        'upstream' and 'downstream' are linked without checking rules, on both sides: the items
+        they name get the reverse link, saved with them if they were not loaded, marked dirty if
+        they were. Uuids that are not work items of the workspace are kept on the imported side only.
+
+        The query index, if built, is dropped and rebuilt on next use, since filing the imported
+        items would read every one of them back.
+
+        Args:
+            records (Iterable[dict]): Records
+            template (WorkItemDefinition): Definition of the items
+            parent (Union[Document, Project], optional): Container of the items. Defaults to None.
+            chunksize (int, optional): Records per write. Defaults to config.importChunkSize.
+
+        Returns:
+            list: Uuids of the items, in record order
+        '''
+        chunksize = chunksize if chunksize != None else config.importChunkSize
+        schema = template.schema
+        # key -> (public, index) of the field it sets, resolved once for every record
+        columns = {}
+        for public, prototypes in ((False, schema.private), (True, schema.public)):
+            for index, prototype in enumerate(prototypes):
+                columns[prototype.name] = (public, index)
+        # Paths and parents are the same for every item, so they are worked out once
+        path = parent.getPath() if parent != None else os.sep
+        parentuuid = parent.uuid if parent != None else None
+        self.__query = None
+        # Files already used by work items, so imported items with the same name don't overwrite them
+        taken = {Workspace.__fileKey(self.getFullPath(itemlookup['path'])) for itemlookup in self.__workitems.values()}
+        # uuid -> (uuids to add upstream, uuids to add downstream) of the other side of imported links
+        reverse = {}
+
+        created = []
+        chunk = []
+        for record in records:
+            item = self.__instantiate(record, template, schema, columns)
+            for other in item.upstream:
+                reverse.setdefault(other, ([], []))[1].append(item.uuid)
+            for other in item.downstream:
+                reverse.setdefault(other, ([], []))[0].append(item.uuid)
+            chunk.append(item)
+            if len(chunk) >= chunksize:
+                created += self.__writeImported(chunk, path, parentuuid, taken, reverse)
+                chunk = []
+        if chunk:
+            created += self.__writeImported(chunk, path, parentuuid, taken, reverse)
+        self.__linkImported(reverse, chunksize)
+        if created:
+            self.invalidateTraceGraph()
+        return created
+
+    def __instantiate(self, record: dict, template: WorkItemDefinition, schema: TemplateSchema, columns: dict):
+        item = WorkItem()
+        if record.get('uuid'):
+            item.uuid = record['uuid']
+        item.name = record.get('name') or item.uuid
+        # Fields are filled before they have an owner, so setting them emits nothing
+        public, private = schema.instantiate()
+        for key, value in record.items():
+            column = columns.get(key)
+            if column != None and value != None and value != '':
+                field = (public if column[0] else private)[column[1]]
+                field.update(fieldUpdate(field, value))
+        item.public, item.private = public, private
+        item.adoptFields()
+        item.setTemplate(template, populate=False)
+        if record.get('upstream'):
+            item.upstream = splitList(record['upstream'])
+        if record.get('downstream'):
+            item.downstream = splitList(record['downstream'])
+        return item
+
+    def __fileKey(fullpath: str) -> str:
+        # Same key for the recorded paths of one file, with or without extension
+        if not fullpath.endswith(WorkItem.fileextension):
+            fullpath = f'{fullpath}{WorkItem.fileextension}'
+        return os.path.normcase(os.path.normpath(fullpath))
+
+    def __writeImported(self, chunk: list, path: str, parentuuid: str, taken: set, reverse: dict) -> list:
+        for item in chunk:
+            previous = self.__workitems.get(item.uuid)
+            if previous != None:
+                # Records of items already in the workspace are written over their file
+                itempath = previous['path']
+            else:
+                itempath = os.path.join(path, item.name)
+                key = Workspace.__fileKey(self.getFullPath(itempath))
+                if key in taken:
+                    itempath = os.path.join(path, f'{item.name} {item.uuid}')
+                    key = Workspace.__fileKey(self.getFullPath(itempath))
+                taken.add(key)
+            links = reverse.pop(item.uuid, None)
+            if links != None:
+                item.upstream.update(links[0])
+                item.downstream.update(links[1])
+            self.__workitems[item.uuid] = {
+                'path': itempath,
+                'name': item.name,
+                'parent': parentuuid,
+                'item': item
+            }
+            if self.__search != None:
+                self.__search.setTexts(item.uuid, textsOf(item))
+        self.saveElements(chunk)
+        uuids = [item.uuid for item in chunk]
+        for uuid in uuids:
+            self.unloadElement(uuid)
+        return uuids
+
+    def __linkImported(self, reverse: dict, chunksize: int):
+        # Reverse links to items that existed before the import or came in an earlier chunk
+        targets = [uuid for uuid in reverse if uuid in self.__workitems]
+        for start in range(0, len(targets), chunksize):
+            unloaded = []
+            for uuid in targets[start:start + chunksize]:
+                wasloaded = self.isLoaded(uuid)
+                item = self.getWorkItemByUUID(uuid)
+                item.upstream.update(reverse[uuid][0])
+                item.downstream.update(reverse[uuid][1])
+                if wasloaded:
+                    item.markDirty()
+                else:
+                    unloaded.append(item)
+            if unloaded:
+                self.saveElements(unloaded)
+                for item in unloaded:
+                    self.unloadElement(item.uuid)
+
+    def iterWorkItemDicts(self, template=None, chunksize: int = None):
+        '''
+        Iterate over the serialized work items without loading them. Loaded items are serialized
+        from memory, the others are read from their file in chunks and dropped once yielded.
+
+        Args:
+            template (Union[WorkItemDefinition, str], optional): Only items of this definition or
+                definition uuid. Defaults to None, which yields every item.
+            chunksize (int, optional): Files read at once. Defaults to config.importChunkSize.
+
+        Yields:
+            dict: Item, in the format of toDict
+        '''
+        templateuuid = getattr(template, 'uuid', template)
+        chunksize = chunksize if chunksize != None else config.importChunkSize
+        uuids = list(self.__workitems)
+        for start in range(0, len(uuids), chunksize):
+            lookups = [(uuid, self.__workitems[uuid]) for uuid in uuids[start:start + chunksize] if uuid in self.__workitems]
+            unloaded = [(uuid, itemlookup) for uuid, itemlookup in lookups if isinstance(itemlookup['item'], NoneType)]
+            if self.archive != None:
+                read = {uuid: self.__read(uuid, itemlookup) for uuid, itemlookup in unloaded}
+            else:
+                read = dict(zip([uuid for uuid, itemlookup in unloaded],
+                                loadJsonLikeMany([self.getFullPath(itemlookup['path']) for uuid, itemlookup in unloaded])))
+            for uuid, itemlookup in lookups:
+                d = read[uuid] if uuid in read else itemlookup['item'].toDict()
+                if templateuuid == None or d.get('template') == templateuuid:
+                    yield d
+
+    def saveElements(self, elements: list):
+        '''
+        Serialize elements through one batched atomic write, on a bounded writer pool.
+
+        Args:
+            elements (list): Elements to write
+        '''
+        if self.archive != None:
+            codec = getCodec()
+            records = [(element.uuid, type(element).fileextension, os.path.relpath(element.getSerializationPath(), self.root),
+                        codec.encode(element.toDict(), self.shapes)) for element in elements]
+            self.shapes.save()
+            self.archive.write(records)
+        else:
+            paths = [element.getSerializationPath() for element in elements]
+            saveJsonLikeMany([(element.toDict(), path) for element, path in zip(elements, paths)], table=self.shapes)
+            # Keep the recorded path and stat current, diffs, refreshes and the index trust them
+            for element, path in zip(elements, paths):
+                itemlookup = self.__lookup(element.uuid)
+                if itemlookup != None:
+                    stat = os.stat(path)
+                    itemlookup['path'] = os.path.relpath(path, self.root)
+                    itemlookup['mtime'], itemlookup['size'] = stat.st_mtime_ns, stat.st_size
+                    if isinstance(element, WorkItem):
+                        if self.__search != None:
+                            self.__search.markSaved(element.uuid, Workspace.__stat(itemlookup))
+                        if element.uuid in self.cache:
+                            self.cache.add(element.uuid, stat.st_size)
+            if self.__search != None:
+                self.__search.save()
+        for element in elements:
+            element.markSaved()
+
+    def packDirectory(directory: str):
+        '''
+        Pack a one file per element workspace into an archive at its root, for opening with packed=True.
+
+        Args:
+            directory (str): Workspace root
+
+        Returns:
+            PackedArchive: The archive
+        '''
+        return PackedArchive.packDirectory(directory, os.path.join(directory, config.archivefilename),
+                                           [cls.fileextension for cls in Workspace.elementtypes])
+
+    def unpackDirectory(directory: str):
+        '''
+        Write the archive at a workspace root back out as one file per element.
+
+        Args:
+            directory (str): Workspace root
+        '''
+        archive = PackedArchive(os.path.join(directory, config.archivefilename))
+        archive.unpackToDirectory(directory)
+        archive.close()
+
     def getDocumentPath(self, document: Document):
         return self.__documents[document.uuid]['path']
 
@@ -785,7 +1855,14 @@ class Workspace(Tree):
             'path': os.path.join(path, item.name),
             'item': item
         }
+        self.invalidateTraceGraph()
+        if self.__query != None:
+            self.__query.add(item)
+        if self.__search != None:
+            self.__search.follow(item)
         item.serialize()
+        self.cache.add(item.uuid, self.__workitems[item.uuid].get('size'))
+        self.__evict(item.uuid)
         return item
 
     def createNewDocument(self, name=None, parent: CollectionElement = None):
@@ -809,7 +1886,7 @@ class Workspace(Tree):
             path = os.sep
         else:
             path = parent.getPath()
-        self.__documents[doc.uuid] = {
+        self.__projects[doc.uuid] = {
             'path': os.path.join(path, doc.name),
             'item': doc
         }
@@ -817,6 +1894,10 @@ class Workspace(Tree):
         return doc
 
 
+# Element types in load order, work items resolve their template when loaded
+Workspace.elementtypes = [Document, Project, WorkItemDefinition, WorkItem]
+
+
 class Scope:
 
     class RulesPolicy(Enum):
@@ -827,7 +1908,18 @@ class Scope:
     currentWorkspace = None
     rulespolicy = RulesPolicy.STRICT
 
-    def setCurrentWorkspaceFromDirectory(directory):
-        Scope.currentWorkspace = Workspace(directory)
-        Scope.currentWorkspace.discoveritems(directory)
+    def setCurrentWorkspaceFromDirectory(directory, lazy=False, packed=False):
+        '''
+        Open a workspace and make it current.
+
+        Args:
+            directory (str): Workspace root
+            lazy (bool, optional): Index files only and load elements on first access. Defaults to False.
+            packed (bool, optional): Use the archive at the root instead of one file per element. Defaults to False.
+
+        Returns:
+            Workspace: The opened workspace
+        '''
+        Scope.currentWorkspace = Workspace(directory, packed)
+        Scope.currentWorkspace.discoveritems(directory, lazy)
         return Scope.currentWorkspace
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+import weakref
+
+
+class HydrationCache():
+    '''
+    Bookkeeping of the work items a workspace has loaded, in least recently used order, with
+    the limits they are evicted at and counters to tune them with.
+
+    Evicted items are remembered through weak references: an item still referenced elsewhere is
+    revived as the same object when it is asked for again, instead of being read a second time.
+    '''
+
+    def __init__(self, capacity: int = None, capacitybytes: int = None) -> None:
+        '''
+        Args:
+            capacity (int, optional): Loaded items to keep. Defaults to None, which doesn't limit them.
+            capacitybytes (int, optional): Total file size of the loaded items to keep, as an
+                estimate of their memory. Defaults to None, which doesn't limit it.
+        '''
+        self.capacity = capacity
+        self.capacitybytes = capacitybytes
+        # Requests for loaded items, requests that read a file, items evicted, and requests
+        # for evicted items that were still referenced elsewhere
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revivals = 0
+        # uuid -> file size, least recently used first
+        self.__order = OrderedDict()
+        self.__bytes = 0
+        # uuid -> evicted item, and the template schema it was evicted with
+        self.__evicted = weakref.WeakValueDictionary()
+        self.__schemas = {}
+
+    def __len__(self) -> int:
+        return len(self.__order)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.__order
+
+    @property
+    def bytes(self) -> int:
+        return self.__bytes
+
+    def hit(self, uuid: str):
+        '''
+        Count a request for a loaded item and mark it as the most recently used.
+        '''
+        self.hits += 1
+        if uuid in self.__order:
+            self.__order.move_to_end(uuid)
+
+    def add(self, uuid: str, size: int = None):
+        '''
+        Track an item that was just loaded, as the most recently used.
+
+        Args:
+            uuid (str): Item uuid
+            size (int, optional): File size of the item, replacing the one tracked. Defaults to None.
+        '''
+        self.__bytes += (size or 0) - self.__order.pop(uuid, 0)
+        self.__order[uuid] = size or 0
+
+    def forget(self, uuid: str):
+        '''
+        Stop tracking an item, loaded or evicted.
+        '''
+        self.__bytes -= self.__order.pop(uuid, 0)
+        self.__evicted.pop(uuid, None)
+        self.__schemas.pop(uuid, None)
+
+    def full(self) -> bool:
+        '''
+        Check whether a limit is exceeded.
+        '''
+        return (self.capacity != None and len(self.__order) > self.capacity) or \
+            (self.capacitybytes != None and self.__bytes > self.capacitybytes)
+
+    def oldest(self) -> str:
+        '''
+        Get the least recently used item, the next to evict.
+
+        Returns:
+            str: Item uuid, or None when nothing is tracked
+        '''
+        return next(iter(self.__order), None)
+
+    def pin(self, uuid: str):
+        '''
+        Skip an item that can't be evicted now, by marking it as the most recently used.
+        '''
+        self.__order.move_to_end(uuid)
+
+    def evicted(self, item, schema):
+        '''
+        Record an eviction, keeping a weak reference to the item.
+
+        Args:
+            item (WorkItem): Evicted item
+            schema (TemplateSchema): Schema of its template when it was evicted
+        '''
+        self.evictions += 1
+        self.__bytes -= self.__order.pop(item.uuid, 0)
+        self.__evicted[item.uuid] = item
+        self.__schemas[item.uuid] = schema
+        if len(self.__schemas) > 2 * max(len(self.__evicted), 1024):
+            # Schemas of items that were collected, dropped in bulk
+            self.__schemas = {uuid: self.__schemas[uuid] for uuid in self.__evicted.keys()}
+
+    def revive(self, uuid: str) -> tuple:
+        '''
+        Get an evicted item back if something else still references it.
+
+        Returns:
+            tuple: (item, schema it was evicted with), or None
+        '''
+        item = self.__evicted.pop(uuid, None)
+        schema = self.__schemas.pop(uuid, None)
+        if item is None:
+            return None
+        return item, schema
+
+    def counters(self) -> dict:
+        '''
+        Get the counters and current usage.
+
+        Returns:
+            dict: hits, misses, evictions, revivals, loaded items, loaded bytes and the ratio of
+                requests served without reading a file
+        '''
+        requests = self.hits + self.misses + self.revivals
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'revivals': self.revivals,
+                'loaded': len(self.__order), 'bytes': self.__bytes, 'hitratio': (self.hits + self.revivals) / requests if requests else 0.0}
+
+    def resetCounters(self):
+        self.hits = self.misses = self.evictions = self.revivals = 0
@@ -0,0 +1,531 @@
+import hashlib
+import json
+import os
+import struct
+import threading
+
+from BBData import config
+
+# Shapes are compact json, and keep non-ascii keys and options as they are
+_shapejson = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+class Codec():
+    '''
+    Turns the dicts produced by toDict into file content and back.
+    '''
+
+    name : str = ''
+
+    def encode(self, content, table = None) -> bytes:
+        '''
+        Args:
+            content: Value to encode
+            table (ShapeTable, optional): Table to share the shape of the value through, for codecs
+                that have one. Defaults to None.
+
+        Returns:
+            bytes: File content
+        '''
+        pass
+
+    def decode(self, data : bytes):
+        pass
+
+    def matches(self, data : bytes) -> bool:
+        '''
+        Check whether data was produced by this codec.
+
+        Args:
+            data (bytes): File content, or at least its first bytes
+
+        Returns:
+            bool: True if this codec can decode data
+        '''
+        return False
+
+
+class JsonCodec(Codec):
+
+    name = 'json'
+
+    def encode(self, content, table = None) -> bytes:
+        return json.dumps(content).encode('utf-8')
+
+    def decode(self, data : bytes):
+        return json.loads(data)
+
+    def matches(self, data : bytes) -> bool:
+        return data.lstrip()[:1] in (b'{', b'[')
+
+
+class BinaryCodec(Codec):
+    '''
+    Encoding split into the shape of a value, shared between files, and the values that vary
+    between them.
+
+    A shape holds the keys of every dict, the length of every list and the type of every leaf.
+    Inside fields, dicts with a 'type' key, it also holds the values that are the same for every
+    item of a definition: name, type, enum options, defaults. Only texts, check states and enum
+    choices vary, and a choice is written as the index of the option. Lists of strings, such as
+    links, are one leaf whatever their length, so the number of links doesn't make a new shape.
+
+    Layout: header (magic, shape id, flags, inline shape length, number bytes), the inline shape,
+    the numbers of the value packed with struct in leaf order, then its strings in leaf order,
+    utf-8 and separated by NUL, the strings of string lists last. Files encoded with a ShapeTable
+    only carry the 8 byte id of their shape and the table holds the shape, others carry their
+    shape. Decoders are built once per shape, as plain data: the constants of the shape, the
+    Struct of its numbers, and for every dict and list a template holding its constants, copied
+    and given the varying leaves by position.
+
+    Content with a NUL in a string is written as json, which every reader detects. Files of the
+    earlier binary layouts, BBB\\x01 and BBB\\x02, are not read.
+    '''
+
+    name = 'binary'
+    magic = b'BBB\x03'
+    version = b'BBB'
+    # magic, shape id, flags, inline shape length, number bytes
+    header = struct.Struct('<4s8sBII')
+    # Flag set when the first string is the uuid of the value
+    UUIDFIRST = 1
+
+    # Keys of fields whose values vary between items, and keys of choices among their 'options'
+    freekeys = frozenset(['text'])
+    choicekeys = frozenset(['currentItem'])
+    # Struct formats of the leaves stored as numbers, string lists store their length
+    formats = {'i': 'q', 'f': 'd', 'b': '?', 'y': 'H', 'S': 'I'}
+
+    cachesize = 4096
+
+    def __init__(self) -> None:
+        # shape id -> description, of every shape seen or loaded
+        self.__descriptions = {}
+        # shape id -> decoder, see __decoder
+        self.__decoders = {}
+        # description text -> (shape id, description, Struct of its numbers)
+        self.__encoders = {}
+
+    def register(self, description : bytes) -> bytes:
+        '''
+        Make a shape known, so files carrying only its id can be decoded.
+
+        Args:
+            description (bytes): Shape, as stored in a ShapeTable
+
+        Returns:
+            bytes: Shape id
+        '''
+        shapeid = hashlib.blake2b(description, digest_size=8).digest()
+        self.__descriptions.setdefault(shapeid, bytes(description))
+        return shapeid
+
+    def descriptions(self) -> list:
+        '''
+        Get every known shape, for registering them elsewhere.
+
+        Returns:
+            list[bytes]: Shapes, as stored in a ShapeTable
+        '''
+        return list(self.__descriptions.values())
+
+    def encode(self, content, table = None) -> bytes:
+        strings = []
+        lists = []
+        formats = []
+        numbers = []
+        append = strings.append
+
+        def walk(value, field : bool):
+            # Returns the shape of value as nested tuples, which are hashed to find its encoder
+            kind = type(value)
+            if kind is str:
+                append(value)
+                return 's'
+            if kind is bool:
+                formats.append('?')
+                numbers.append(value)
+                return 'b'
+            if kind is int:
+                if -2 ** 63 <= value < 2 ** 63:
+                    formats.append('q')
+                    numbers.append(value)
+                    return 'i'
+                append(str(value))
+                return 'n'
+            if kind is float:
+                formats.append('d')
+                numbers.append(value)
+                return 'f'
+            if value is None:
+                return ('c', (None, None))
+            if kind is dict:
+                field = field or 'type' in value
+                children = []
+                for key, item in value.items():
+                    if type(key) is not str and not isinstance(key, str):
+                        raise TypeError(f'Keys must be str, not {type(key).__name__}')
+                    if not field or key in BinaryCodec.freekeys:
+                        if type(item) is str:
+                            append(item)
+                            children.append('s')
+                        else:
+                            children.append(walk(item, field))
+                        continue
+                    choice = BinaryCodec.__choice(value.get('options'), item) if key in BinaryCodec.choicekeys else None
+                    frozen = BinaryCodec.__freeze(item) if key not in BinaryCodec.choicekeys else None
+                    if choice != None:
+                        formats.append('H')
+                        numbers.append(choice)
+                        children.append(('y', tuple(value['options'])))
+                    elif frozen != None:
+                        children.append(('c', frozen))
+                    else:
+                        children.append(walk(item, field))
+                return ('d', tuple([str(key) for key in value]), tuple(children))
+            if kind is list or kind is tuple:
+                if all([type(item) is str for item in value]):
+                    formats.append('I')
+                    numbers.append(len(value))
+                    lists.append(value)
+                    return 'S'
+                return ('l', tuple([walk(item, field) for item in value]))
+            # Subclasses, such as str enums, are written as their base type
+            for base, convert in ((str, str), (int, int), (float, float), (dict, dict), (list, list), (tuple, list)):
+                if isinstance(value, base):
+                    return walk(convert(value), field)
+            raise TypeError(f'Object of type {kind.__name__} is not serializable')
+
+        shape = walk(content, False)
+        encoder = self.__encoders.get(shape)
+        if encoder is None:
+            description = _shapejson(BinaryCodec.__description(shape)).encode('utf-8')
+            if len(self.__encoders) >= BinaryCodec.cachesize:
+                self.__encoders.clear()
+            encoder = self.__encoders[shape] = (self.register(description), description, struct.Struct('<' + ''.join(formats)))
+        shapeid, description, packer = encoder
+        for listed in lists:
+            strings.extend(listed)
+        joined = '\x00'.join(strings)
+        if strings and joined.count('\x00') != len(strings) - 1:
+            return codecs[JsonCodec.name].encode(content)
+        flags = BinaryCodec.UUIDFIRST if type(content) is dict and type(content.get('uuid')) is str and next(iter(content)) == 'uuid' else 0
+        inline = description
+        if table != None:
+            table.add(shapeid, description)
+            inline = b''
+        return b''.join((BinaryCodec.header.pack(BinaryCodec.magic, shapeid, flags, len(inline), packer.size),
+                         inline, packer.pack(*numbers), joined.encode('utf-8')))
+
+    def __freeze(value):
+        # Hashable form of a constant, tagged with its type so that 1, 1.0 and True differ. None for
+        # values holding a bool, which vary between items and are not constants.
+        kind = type(value)
+        if kind is str:
+            return (str, value)
+        if isinstance(value, dict):
+            items = [(str(key), BinaryCodec.__freeze(item)) for key, item in value.items()]
+            return (dict, tuple(items)) if all([item[1] != None for item in items]) else None
+        if isinstance(value, (list, tuple)):
+            items = [BinaryCodec.__freeze(item) for item in value]
+            return (list, tuple(items)) if all([item != None for item in items]) else None
+        if isinstance(value, bool):
+            return None
+        for base in (str, int, float):
+            if isinstance(value, base):
+                return (base, base(value))
+        if value is None:
+            return (None, None)
+        raise TypeError(f'Object of type {type(value).__name__} is not serializable')
+
+    def __thaw(frozen):
+        kind, value = frozen
+        if kind is dict:
+            return {key: BinaryCodec.__thaw(item) for key, item in value}
+        if kind is list:
+            return [BinaryCodec.__thaw(item) for item in value]
+        return value
+
+    def __description(shape):
+        # The shape as the json values stored in a ShapeTable
+        if type(shape) is str:
+            return shape
+        if shape[0] == 'c':
+            return ['c', BinaryCodec.__thaw(shape[1])]
+        if shape[0] == 'y':
+            return ['y', list(shape[1])]
+        if shape[0] == 'd':
+            return ['d', list(shape[1]), [BinaryCodec.__description(child) for child in shape[2]]]
+        return ['l', [BinaryCodec.__description(child) for child in shape[1]]]
+
+    def __choice(options, item) -> int:
+        # Index of item among the options of an enum, None when it isn't one of them
+        if type(item) is not str or type(options) is not list or len(options) > 0xffff:
+            return None
+        try:
+            index = options.index(item)
+        except ValueError:
+            return None
+        return index if all(type(option) is str for option in options) else None
+
+    def decode(self, data : bytes):
+        try:
+            magic, shapeid, flags, inline, size = BinaryCodec.header.unpack_from(data)
+        except struct.error:
+            raise ValueError('Truncated header') from None
+        if magic != BinaryCodec.magic:
+            raise ValueError(f'Unsupported binary format {magic!r}')
+        position = BinaryCodec.header.size
+        if inline:
+            if self.register(data[position:position + inline]) != shapeid:
+                raise ValueError('Corrupt shape')
+            position += inline
+        decoder = self.__decoders.get(shapeid)
+        if decoder is None:
+            decoder = self.__decoder(shapeid)
+        constants, unpacker, static, derived, steps, root = decoder
+        if size != unpacker.size or position + size > len(data):
+            raise ValueError('Truncated numbers')
+        numbers = unpacker.unpack_from(data, position)
+        strings = str(data[position + size:], 'utf-8').split('\x00')
+        if len(strings) < static:
+            raise ValueError(f'Expected {static} strings, found {len(strings)}')
+        # Every leaf and container is an entry of the pool, containers are built from entries before them
+        pool = [*constants, *numbers, *strings] if len(strings) == static else [*constants, *numbers, *strings[:static]]
+        append = pool.append
+        listed = static
+        for kind, index, choices in derived:
+            if kind == 'S':
+                append(strings[listed:listed + numbers[index]])
+                listed += numbers[index]
+            elif kind == 'y':
+                if numbers[index] >= len(choices):
+                    raise ValueError(f'Choice {numbers[index]} out of range')
+                append(choices[numbers[index]])
+            else:
+                append(int(strings[index]))
+        # Without strings the split still gives one empty string
+        if listed != len(strings) and (listed or strings != ['']):
+            raise ValueError(f'Expected {listed} strings, found {len(strings)}')
+        for template, pairs in steps:
+            if template is None:
+                append([pool[index] for index in pairs])
+                continue
+            container = template.copy()
+            for key, index in pairs:
+                container[key] = pool[index]
+            append(container)
+        return pool[root]
+
+    def __decoder(self, shapeid : bytes) -> tuple:
+        description = self.__descriptions.get(shapeid)
+        if description is None:
+            raise ValueError(f'Unknown shape {shapeid.hex()}, the ShapeTable of the workspace holding it is not loaded')
+        try:
+            tree = json.loads(description)
+        except ValueError:
+            raise ValueError('Corrupt shape') from None
+        # Entries of the pool by section, as (section, index) until every section is counted:
+        # constants, numbers, static strings, derived leaves and containers
+        constants = []
+        formats = []
+        static = 0
+        derived = []
+        steps = []
+
+        def constant(value) -> tuple:
+            if isinstance(value, dict):
+                return container({key: constant(item) for key, item in value.items()})
+            if isinstance(value, list):
+                return container([constant(item) for item in value])
+            constants.append(value)
+            return ('c', len(constants) - 1)
+
+        def container(children) -> tuple:
+            # Constant leaves are put in the template, copied for every value
+            steps.append(children)
+            return ('x', len(steps) - 1)
+
+        def plan(node) -> tuple:
+            nonlocal static
+            if type(node) is str and node in ('s', 'n'):
+                static += 1
+                if node == 's':
+                    return ('s', static - 1)
+                derived.append(('n', static - 1, None))
+                return ('d', len(derived) - 1)
+            if type(node) is str and node in ('i', 'f', 'b', 'S'):
+                formats.append(BinaryCodec.formats[node])
+                if node != 'S':
+                    return ('n', len(formats) - 1)
+                derived.append(('S', len(formats) - 1, None))
+                return ('d', len(derived) - 1)
+            if type(node) is not list or not node:
+                raise ValueError(f'Corrupt shape node {node!r}')
+            if node[0] == 'c' and len(node) == 2:
+                return constant(node[1])
+            if node[0] == 'y' and len(node) == 2 and type(node[1]) is list:
+                formats.append(BinaryCodec.formats['y'])
+                derived.append(('y', len(formats) - 1, tuple(node[1])))
+                return ('d', len(derived) - 1)
+            if node[0] == 'd' and len(node) == 3 and type(node[1]) is list and type(node[2]) is list and len(node[1]) == len(node[2]) \
+                    and all(type(key) is str for key in node[1]):
+                return container({key: plan(child) for key, child in zip(node[1], node[2])})
+            if node[0] == 'l' and len(node) == 2 and type(node[1]) is list:
+                return container([plan(child) for child in node[1]])
+            raise ValueError(f'Corrupt shape node {node!r}')
+
+        try:
+            root = plan(tree)
+        except RecursionError:
+            raise ValueError('Shape too deep') from None
+        bases = {'c': 0, 'n': len(constants), 's': len(constants) + len(formats)}
+        bases['d'] = bases['s'] + static
+        bases['x'] = bases['d'] + len(derived)
+
+        def resolve(entry : tuple) -> int:
+            return bases[entry[0]] + entry[1]
+
+        built = []
+        for children in steps:
+            items = list(children.items()) if isinstance(children, dict) else list(enumerate(children))
+            varying = [(key, entry) for key, entry in items if entry[0] != 'c']
+            if isinstance(children, list) and len(varying) == len(items):
+                # Built from the entries of its items
+                built.append((None, tuple(resolve(entry) for key, entry in items)))
+                continue
+            # Copied from a template holding the constants, then given the other items
+            template = {key: constants[entry[1]] if entry[0] == 'c' else None for key, entry in items}
+            if isinstance(children, list):
+                template = list(template.values())
+            built.append((template, tuple((key, resolve(entry)) for key, entry in varying)))
+        decoder = (tuple(constants), struct.Struct('<' + ''.join(formats)), static, tuple(derived), tuple(built), resolve(root))
+        if len(self.__decoders) >= BinaryCodec.cachesize:
+            self.__decoders.clear()
+        self.__decoders[shapeid] = decoder
+        return decoder
+
+    def peekUUID(self, infile) -> str:
+        '''
+        Read the uuid of a serialized element without decoding it, or knowing its shape. Elements
+        serialize their uuid first, so it is the first string.
+
+        Args:
+            infile (BinaryIO): File open for reading, positioned anywhere
+
+        Returns:
+            str: uuid, or None if the file doesn't start with one
+        '''
+        infile.seek(0)
+        header = infile.read(BinaryCodec.header.size)
+        if len(header) < BinaryCodec.header.size:
+            return None
+        magic, shapeid, flags, inline, size = BinaryCodec.header.unpack(header)
+        if magic != BinaryCodec.magic or not flags & BinaryCodec.UUIDFIRST:
+            return None
+        infile.seek(BinaryCodec.header.size + inline + size)
+        chunk = infile.read(256)
+        first = chunk.split(b'\x00', 1)
+        if len(first) < 2 and len(chunk) == 256:
+            return None
+        return first[0].decode('utf-8')
+
+    def matches(self, data : bytes) -> bool:
+        return data[:len(BinaryCodec.version)] == BinaryCodec.version
+
+
+class ShapeTable():
+    '''
+    Shapes of the binary files of a workspace, kept in one file at its root, so the files only
+    carry the id of their shape.
+
+    The file holds one shape per line and is only appended to. Shapes are identified by a hash
+    of their line, so the tables of two copies of a workspace merge by concatenating them. Loading
+    registers the shapes with the binary codec. Shapes of new files are appended by save, which
+    writers call before moving the files into place.
+    '''
+
+    def __init__(self, path : str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        # Ids of the shapes in the file, and shape id -> description of those to append
+        self.__saved = set()
+        self.__pending = {}
+
+    def load(self):
+        '''
+        Register every shape in the file with the binary codec. A line cut short by an interrupted save is skipped.
+        '''
+        if not os.path.exists(self.path):
+            return
+        codec = codecs[BinaryCodec.name]
+        with open(self.path, 'rb') as infile:
+            lines = infile.read().split(b'\n')
+        with self.lock:
+            # The last line is empty, or was cut short
+            self.__saved.update(codec.register(line) for line in lines[:-1] if line)
+
+    def add(self, shapeid : bytes, description : bytes):
+        '''
+        Queue a shape for the next save, if the file doesn't hold it yet.
+
+        Args:
+            shapeid (bytes): Shape id
+            description (bytes): Shape
+        '''
+        with self.lock:
+            if shapeid not in self.__saved:
+                self.__pending[shapeid] = description
+
+    def save(self, fsync : bool = None):
+        '''
+        Append the shapes added since the last save.
+
+        Args:
+            fsync (bool, optional): Flush the file to disk. Defaults to config.fsync.
+        '''
+        fsync = fsync if fsync != None else config.fsync
+        with self.lock:
+            if not self.__pending:
+                return
+            with open(self.path, 'a+b') as outfile:
+                # Start on a new line after a line cut short
+                separator = b''
+                if outfile.seek(0, os.SEEK_END) > 0:
+                    outfile.seek(-1, os.SEEK_END)
+                    separator = b'' if outfile.read(1) == b'\n' else b'\n'
+                outfile.write(separator + b''.join(description + b'\n' for description in self.__pending.values()))
+                if fsync:
+                    outfile.flush()
+                    os.fsync(outfile.fileno())
+            self.__saved.update(self.__pending)
+            self.__pending.clear()
+
+
+codecs = {codec.name: codec for codec in [JsonCodec(), BinaryCodec()]}
+
+def getCodec(name : str = None) -> Codec:
+    '''
+    Get a codec by name.
+
+    Args:
+        name (str, optional): Codec name. Defaults to config.codec.
+
+    Returns:
+        Codec: The codec
+    '''
+    return codecs[name if name != None else config.codec]
+
+def detectCodec(data : bytes) -> Codec:
+    '''
+    Find the codec that wrote data. Anything that isn't recognized is treated as json.
+
+    Args:
+        data (bytes): File content, or at least its first bytes
+
+    Returns:
+        Codec: The codec
+    '''
+    for codec in codecs.values():
+        if codec.matches(data):
+            return codec
+    return codecs[JsonCodec.name]
@@ -1,30 +1,194 @@
+from contextlib import contextmanager
 from typing import Callable
+import weakref
+
+
+class Connection():
+    '''
+    Handle returned by Delegate.connect. Disconnecting through the handle takes constant time.
+    '''
+    __slots__ = ('delegate', 'key')
+
+    def __init__(self, delegate, key : int) -> None:
+        self.delegate = weakref.ref(delegate)
+        self.key = key
+
+    @property
+    def connected(self) -> bool:
+        delegate = self.delegate()
+        return delegate != None and delegate.isConnected(self)
+
+    def disconnect(self):
+        '''
+        Disconnect the function this handle was returned for. Does nothing if it is already disconnected.
+        '''
+        delegate = self.delegate()
+        if delegate != None:
+            delegate.disconnect(self)
 
 
 class Delegate():
+    '''
+    Calls every connected function with the tuple of arguments passed to emit.
+
+    Bound methods are held through weak references, so connecting an object's method does not keep
+    the object alive. Connections of collected objects are dropped on the next emit. Other
+    callables, such as lambdas and plain functions, are held strongly.
+    '''
+    __slots__ = ('__connections', '__nextkey', '__snapshot', '__blocked', '__batched', '__dispatcher', '__weakref__')
 
     def __init__(self) -> None:
-        self.subscribers = []
-    
-    def connect(self, function : Callable):
+        # key -> (owner, function). owner is a weak reference to the object of a bound method, or None.
+        self.__connections = {}
+        self.__nextkey = 0
+        # Tuple of the connections, rebuilt on the first emit after a change
+        self.__snapshot = ()
+        self.__blocked = 0
+        # sender -> args, held back by batch()
+        self.__batched = None
+        # Emits are delivered inline unless a dispatcher is set
+        self.__dispatcher = None
+
+    @property
+    def subscribers(self) -> list:
+        '''
+        Connected functions that are still alive, in the order they were connected.
+        '''
+        return [function if owner == None else function.__get__(owner()) for owner, function in self.__connections.values()
+                if owner == None or owner() != None]
+
+    def connect(self, function : Callable) -> Connection:
         '''
         Connect function handle to delegate.
 
         Args:
             function (Callable): The handle for the method to be executed. Must handle *args.
+
+        Returns:
+            Connection: Handle to disconnect the function with
         '''
-        self.subscribers.append(function)
+        key = self.__nextkey
+        self.__nextkey += 1
+        try:
+            # Weak references without a callback are shared per object, so this costs one tuple
+            self.__connections[key] = (weakref.ref(function.__self__), function.__func__)
+        except (AttributeError, TypeError):
+            # Not a bound method, or its object can't be weakly referenced
+            self.__connections[key] = (None, function)
+        self.__snapshot = None
+        return Connection(self, key)
 
     def disconnect(self, function : Callable):
         '''
         Disconnects function handle from delegate.
 
         Args:
-            function (Callable): The handle to be disconnected from the delegate.
+            function (Callable): The handle to be disconnected from the delegate, or the Connection returned by connect.
         '''
-        if function in self.subscribers:
-            self.subscribers.remove(function)
+        if isinstance(function, Connection):
+            if self.__connections.pop(function.key, None) != None:
+                self.__snapshot = None
+            return
+        # Bound methods are created on every attribute access, so they are compared by equality
+        for key, (owner, target) in self.__connections.items():
+            if (target == function if owner == None else
+                    target is getattr(function, '__func__', None) and owner() is getattr(function, '__self__', None)):
+                del self.__connections[key]
+                self.__snapshot = None
+                return
+
+    def isConnected(self, connection : Connection) -> bool:
+        return connection.key in self.__connections
+
+    @property
+    def dispatcher(self):
+        return self.__dispatcher
+
+    def setDispatcher(self, dispatcher = None):
+        '''
+        Deliver emits through a dispatcher instead of on the caller's stack.
+
+        Args:
+            dispatcher (Dispatcher, optional): A dispatcher from BBData.Dispatch. Defaults to None, which delivers inline.
+        '''
+        self.__dispatcher = dispatcher
+
+    @contextmanager
+    def blocked(self):
+        '''
+        Drop every emit while the context is active.
+
+        Yields:
+            Delegate: This delegate
+        '''
+        self.__blocked += 1
+        try:
+            yield self
+        finally:
+            self.__blocked -= 1
+
+    @contextmanager
+    def batch(self):
+        '''
+        Hold emits back while the context is active. On exit, emit once per sender with the last
+        arguments it emitted, in the order senders first emitted. The sender is the first argument.
+
+        Yields:
+            Delegate: This delegate
+        '''
+        outer = self.__batched == None
+        if outer:
+            self.__batched = {}
+        try:
+            yield self
+        finally:
+            if outer:
+                batched, self.__batched = self.__batched, None
+                for args in batched.values():
+                    self.emit(*args)
+
+    def __deepcopy__(self, memo):
+        # Subscribers listen to the original object, a copy starts without any
+        return Delegate()
 
     def emit(self, *args):
-        for function in self.subscribers:
-            function(args)
\ No newline at end of file
+        if self.__blocked:
+            return
+        if self.__batched is not None:
+            # Arguments keep the sender alive, so its id stays unique until the batch ends
+            self.__batched[id(args[0]) if args else None] = args
+            return
+        if self.__dispatcher is not None:
+            self.__dispatcher.post(self, args)
+            return
+        self.deliver(args)
+
+    def deliver(self, args : tuple):
+        '''
+        Call every connected function with args now, on the caller's stack. Used by emit and by dispatchers.
+
+        Args:
+            args (tuple): Arguments passed to emit
+        '''
+        snapshot = self.__snapshot
+        if snapshot is None:
+            snapshot = self.__snapshot = tuple(self.__connections.values())
+        dead = False
+        for owner, function in snapshot:
+            if owner is None:
+                function(args)
+                continue
+            target = owner()
+            if target is not None:
+                function(target, args)
+            else:
+                dead = True
+        if dead:
+            self.__prune()
+
+    def __prune(self):
+        # Dispatcher threads may prune while connections change, so work on a copy of the items
+        for key, (owner, function) in list(self.__connections.items()):
+            if owner != None and owner() == None:
+                self.__connections.pop(key, None)
+        self.__snapshot = None
@@ -0,0 +1,306 @@
+from enum import Enum
+import os
+
+from BBData.Codecs import detectCodec
+from BBData.Fields import parseField
+from BBData.Links import LinkSet
+from BBData.utilities import formatTime, parseTime
+
+
+class ChangeKind(Enum):
+    '''
+    Kind of a Change
+    '''
+    ADDED = 0
+    REMOVED = 1
+    CHANGED = 2
+    REORDERED = 3
+
+class Change():
+    '''
+    One difference between two elements.
+
+    Paths are tuples:
+        (key,) for an element value such as ('name',) or ('upstream',)
+        (section, field name) for a field added, removed or replaced by a field of another type
+        (section, field name, key) for one value of a field, such as ('public', 'Requirement', 'text')
+        (section,) for fields that kept their names but changed order
+    where section is 'public' or 'private'. Values are in the format of toDict.
+    '''
+    __slots__ = ('kind', 'path', 'old', 'new')
+
+    def __init__(self, kind: ChangeKind, path: tuple, old=None, new=None) -> None:
+        self.kind = kind
+        self.path = path
+        self.old = old
+        self.new = new
+
+    def reversed(self):
+        kind = {ChangeKind.ADDED: ChangeKind.REMOVED, ChangeKind.REMOVED: ChangeKind.ADDED}.get(self.kind, self.kind)
+        return Change(kind, self.path, self.new, self.old)
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, Change):
+            return (self.kind, self.path, self.old, self.new) == (__o.kind, __o.path, __o.old, __o.new)
+        return False
+
+    def __repr__(self) -> str:
+        return f'Change({self.kind.name}, {self.path!r}, {self.old!r}, {self.new!r})'
+
+class Patch():
+    '''
+    Differences between two versions of an element, in a form that can be applied.
+    '''
+    __slots__ = ('changes',)
+
+    def __init__(self, changes: list = None) -> None:
+        self.changes = changes if changes != None else []
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, Patch):
+            return self.changes == __o.changes
+        return False
+
+    def __repr__(self) -> str:
+        return f'Patch({self.changes!r})'
+
+    def reversed(self):
+        '''
+        Get the patch that undoes this one.
+
+        Returns:
+            Patch: Reverse patch
+        '''
+        return Patch([change.reversed() for change in reversed(self.changes)])
+
+    def apply(self, element):
+        '''
+        Change element in place so it matches the element the patch was made against.
+        Fields are updated in place, so references to them stay valid.
+
+        Args:
+            element (Union[CollectionElement, Document, Project]): Element in the state the patch was made from
+
+        Returns:
+            Union[CollectionElement, Document, Project]: element
+        '''
+        # Removals first so added fields don't collide with the names they replace
+        order = {ChangeKind.REMOVED: 0, ChangeKind.ADDED: 1, ChangeKind.CHANGED: 2, ChangeKind.REORDERED: 3}
+        for change in sorted(self.changes, key=lambda change: order[change.kind]):
+            path = change.path
+            if len(path) == 1 and change.kind == ChangeKind.REORDERED:
+                Patch.__reorder(element, path[0], change.new)
+            elif len(path) == 1:
+                Patch.__setValue(element, path[0], change.new)
+            elif len(path) == 2:
+                fields = getattr(element, path[0])
+                field = Patch.__find(fields, path[1])
+                if field != None and change.kind != ChangeKind.ADDED:
+                    (element.removePublicField if path[0] == 'public' else element.removePrivateField)(path[1])
+                if change.kind != ChangeKind.REMOVED:
+                    (element.addPublicField if path[0] == 'public' else element.addPrivateField)(parseField(change.new))
+            else:
+                field = Patch.__find(getattr(element, path[0]), path[1])
+                if field == None:
+                    raise KeyError(f'{element.uuid} has no {path[0]} field {path[1]!r}')
+                field.update({path[2]: change.new})
+        element.markDirty()
+        return element
+
+    def __find(fields: list, name: str):
+        for field in fields:
+            if field.name == name:
+                return field
+        return None
+
+    def __reorder(element, section: str, names: tuple):
+        fields = getattr(element, section)
+        position = {name: index for index, name in enumerate(names)}
+        fields.sort(key=lambda field: position.get(field.name, len(position)))
+
+    def __setValue(element, key: str, value):
+        if key == 'template':
+            from BBData.BBData import Scope
+            element.setTemplate(Scope.currentWorkspace.getDefinitionByUUID(value), populate=False)
+        elif key in datekeys:
+            setattr(element, key, parseTime(value))
+        else:
+            setattr(element, key, list(value) if isinstance(value, list) else value)
+            if key in ('upstream', 'downstream'):
+                from BBData.BBData import Scope
+                if Scope.currentWorkspace != None:
+                    Scope.currentWorkspace.invalidateTraceGraph()
+
+class WorkspaceDiff():
+    '''
+    Differences between two workspaces, by element uuid.
+    '''
+    __slots__ = ('added', 'removed', 'moved', 'changed', 'skipped')
+
+    def __init__(self) -> None:
+        # Uuids only in the second workspace
+        self.added = []
+        # Uuids only in the first workspace
+        self.removed = []
+        # uuid -> (path in the first workspace, path in the second)
+        self.moved = {}
+        # uuid -> Patch
+        self.changed = {}
+        # Number of elements found unchanged without decoding them
+        self.skipped = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.moved or self.changed)
+
+    def __repr__(self) -> str:
+        return f'WorkspaceDiff(added={len(self.added)}, removed={len(self.removed)}, moved={len(self.moved)}, changed={len(self.changed)})'
+
+
+# Element values other than fields, by serialized key
+elementkeys = ('uuid', 'name', 'createDate', 'updateDate', 'template', 'upstream', 'downstream',
+               'definitions', 'workitems', 'documents', 'workItems')
+datekeys = ('createDate', 'updateDate')
+sections = ('public', 'private')
+_missing = object()
+
+def _elementValue(element, key: str):
+    if key == 'template':
+        template = getattr(element, 'template', None)
+        return template.uuid if template != None else _missing
+    if key in datekeys:
+        date = getattr(element, key, _missing)
+        return formatTime(date) if date is not _missing else _missing
+    return getattr(element, key, _missing)
+
+def _dictValue(d: dict, key: str):
+    # Dates of older files are rewritten in the current format, so only different times differ
+    if key in datekeys and key in d:
+        return formatTime(parseTime(d[key]))
+    return d.get(key, _missing)
+
+def _diffValues(changes: list, old, new):
+    # old and new are (key, value) getters over the same keys
+    for key in elementkeys:
+        a, b = old(key), new(key)
+        if a != b and a is not _missing and b is not _missing:
+            changes.append(Change(ChangeKind.CHANGED, (key,), list(a) if isinstance(a, (list, LinkSet)) else a,
+                                  list(b) if isinstance(b, (list, LinkSet)) else b))
+
+def _diffSection(changes: list, section: str, old: dict, new: dict, same):
+    # old and new map field names to fields or field dicts, same(a, b) compares two of them
+    for name in old:
+        if name not in new:
+            changes.append(Change(ChangeKind.REMOVED, (section, name), _serialize(old[name]), None))
+    for name, b in new.items():
+        a = old.get(name)
+        if a == None:
+            changes.append(Change(ChangeKind.ADDED, (section, name), None, _serialize(b)))
+        elif not same(a, b):
+            a, b = _serialize(a), _serialize(b)
+            if a['type'] != b['type']:
+                changes.append(Change(ChangeKind.CHANGED, (section, name), a, b))
+                continue
+            for key, value in b.items():
+                if key not in ('name', 'type') and a.get(key) != value:
+                    changes.append(Change(ChangeKind.CHANGED, (section, name, key), a.get(key), value))
+    common = [name for name in old if name in new]
+    if common != [name for name in new if name in old]:
+        changes.append(Change(ChangeKind.REORDERED, (section,), tuple(old), tuple(new)))
+
+def _serialize(field):
+    return field if isinstance(field, dict) else field.toDict()
+
+def _sameField(a, b) -> bool:
+    return a is b or (a.type == b.type and a.values() == b.values())
+
+def diffElements(elementA, elementB) -> Patch:
+    '''
+    Diff two elements. Fields are matched by name and compared by value, without serializing
+    fields that are equal.
+
+    Args:
+        elementA (Union[CollectionElement, Document, Project]): Original element
+        elementB (Union[CollectionElement, Document, Project]): New element
+
+    Returns:
+        Patch: Changes that turn elementA into elementB
+    '''
+    changes = []
+    if elementA is elementB:
+        return Patch(changes)
+    _diffValues(changes, lambda key: _elementValue(elementA, key), lambda key: _elementValue(elementB, key))
+    for section in sections:
+        fieldsA, fieldsB = getattr(elementA, section, None), getattr(elementB, section, None)
+        if fieldsA != None and fieldsB != None:
+            _diffSection(changes, section, {field.name: field for field in fieldsA},
+                         {field.name: field for field in fieldsB}, _sameField)
+    return Patch(changes)
+
+def diffDicts(dictA: dict, dictB: dict) -> Patch:
+    '''
+    Diff two serialized elements, as produced by toDict.
+
+    Args:
+        dictA (dict): Original element
+        dictB (dict): New element
+
+    Returns:
+        Patch: Changes that turn the first element into the second, the same as diffElements would give
+    '''
+    changes = []
+    _diffValues(changes, lambda key: _dictValue(dictA, key), lambda key: _dictValue(dictB, key))
+    for section in sections:
+        if section in dictA and section in dictB:
+            _diffSection(changes, section, {field['name']: field for field in dictA[section]},
+                         {field['name']: field for field in dictB[section]}, lambda a, b: a == b)
+    return Patch(changes)
+
+def diffWorkspaces(workspaceA, workspaceB) -> WorkspaceDiff:
+    '''
+    Diff every element of two workspaces.
+
+    Elements loaded with unsaved changes are diffed in memory. Others are compared on disk:
+    files with the same size and modification time are skipped without being read, files with the
+    same content are skipped without being decoded, and only the rest are decoded and diffed.
+
+    Args:
+        workspaceA (Workspace): Original workspace
+        workspaceB (Workspace): New workspace
+
+    Returns:
+        WorkspaceDiff: Differences
+    '''
+    result = WorkspaceDiff()
+    entriesA, entriesB = workspaceA.getElementEntries(), workspaceB.getElementEntries()
+    result.removed = [uuid for uuid in entriesA if uuid not in entriesB]
+    result.added = [uuid for uuid in entriesB if uuid not in entriesA]
+    for uuid, entryA in entriesA.items():
+        entryB = entriesB.get(uuid)
+        if entryB == None:
+            continue
+        if os.path.normpath(entryA['path']) != os.path.normpath(entryB['path']):
+            result.moved[uuid] = (entryA['path'], entryB['path'])
+        itemA, itemB = workspaceA.getLoadedElement(uuid), workspaceB.getLoadedElement(uuid)
+        if (itemA != None and itemA.dirty) or (itemB != None and itemB.dirty):
+            patch = diffElements(workspaceA.getElementByUUID(uuid), workspaceB.getElementByUUID(uuid))
+        elif entryA['size'] != None and (entryA['size'], entryA['mtime']) == (entryB['size'], entryB['mtime']):
+            result.skipped += 1
+            continue
+        else:
+            dataA, dataB = workspaceA.readRaw(uuid), workspaceB.readRaw(uuid)
+            if dataA == dataB:
+                result.skipped += 1
+                continue
+            patch = diffDicts(detectCodec(dataA).decode(dataA), detectCodec(dataB).decode(dataB))
+        if patch:
+            result.changed[uuid] = patch
+    return result
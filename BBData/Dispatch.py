@@ -0,0 +1,259 @@
+import asyncio
+import itertools
+import threading
+import warnings
+
+from BBData import config
+
+
+class Dispatcher():
+    '''
+    Delivers emits of the delegates it is set on away from the emitting call.
+
+    Pending emits are kept in order. With coalescing, an emit for a (delegate, sender) pair that
+    is already pending replaces its arguments instead of queueing again, so a burst of edits to
+    one element is delivered once with the latest arguments. The sender is the first argument.
+    When maxsize emits are pending, emitting waits for room. Emits from the dispatch thread itself
+    are delivered inline instead, since waiting there could never end.
+    '''
+
+    def __init__(self, maxsize: int = None, coalesce: bool = True) -> None:
+        '''
+        Args:
+            maxsize (int, optional): Pending emits before emitting waits. Defaults to config.dispatchQueueSize.
+            coalesce (bool, optional): Merge pending emits per (delegate, sender). Defaults to True.
+        '''
+        self.maxsize = maxsize if maxsize != None else config.dispatchQueueSize
+        self.coalesce = coalesce
+        self.condition = threading.Condition()
+        # key -> (delegate, args), in the order keys were first posted
+        self.pending = {}
+        # Emits taken from pending but not delivered yet
+        self.active = 0
+        self.closed = False
+        self.__sequence = itertools.count()
+        # Counters
+        self.posted = 0
+        self.coalesced = 0
+        self.delivered = 0
+
+    def isDispatchThread(self) -> bool:
+        '''
+        Check whether the caller is delivering emits for this dispatcher.
+        '''
+        return False
+
+    def schedule(self):
+        '''
+        Called with the condition held after an emit was added to pending.
+        '''
+        pass
+
+    def post(self, delegate, args: tuple):
+        '''
+        Queue an emit. Called by Delegate.emit.
+
+        Args:
+            delegate (Delegate): Delegate that emitted
+            args (tuple): Arguments of the emit
+        '''
+        # Arguments keep the sender alive while pending, so its id stays unique
+        key = (id(delegate), id(args[0]) if args else None) if self.coalesce else next(self.__sequence)
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('Dispatcher is closed')
+            self.posted += 1
+            if key in self.pending:
+                self.pending[key] = (delegate, args)
+                self.coalesced += 1
+                return
+            inline = False
+            while len(self.pending) >= self.maxsize:
+                if self.isDispatchThread():
+                    inline = True
+                    break
+                self.condition.wait()
+            if not inline:
+                self.pending[key] = (delegate, args)
+                self.schedule()
+                return
+        self.deliver(delegate, args)
+
+    def take(self):
+        '''
+        Remove the oldest pending emit. Called with the condition held.
+
+        Returns:
+            tuple: (delegate, args)
+        '''
+        emit = self.pending.pop(next(iter(self.pending)))
+        self.active += 1
+        self.condition.notify_all()
+        return emit
+
+    def deliver(self, delegate, args: tuple):
+        try:
+            delegate.deliver(args)
+        except Exception as error:
+            self.onError(error, delegate, args)
+        finally:
+            with self.condition:
+                self.delivered += 1
+
+    def done(self):
+        # Called after delivering an emit returned by take
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def onError(self, error: Exception, delegate, args: tuple):
+        '''
+        Called when a subscriber raises. Subscribers run away from the emitting call, so the error can't propagate to it.
+
+        Args:
+            error (Exception): Raised exception
+            delegate (Delegate): Delegate being delivered
+            args (tuple): Arguments of the emit
+        '''
+        warnings.warn(f'Warning: Subscriber raised {error!r} while delivering {args!r}.')
+
+    def close(self):
+        '''
+        Stop accepting emits. Pending emits are still delivered.
+        '''
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class QueueDispatcher(Dispatcher):
+    '''
+    Delivers emits on worker threads. With more than one worker, emits of different senders may
+    be delivered out of order.
+    '''
+
+    def __init__(self, workers: int = 1, maxsize: int = None, coalesce: bool = True) -> None:
+        '''
+        Args:
+            workers (int, optional): Delivering threads. Defaults to 1.
+            maxsize (int, optional): Pending emits before emitting waits. Defaults to config.dispatchQueueSize.
+            coalesce (bool, optional): Merge pending emits per (delegate, sender). Defaults to True.
+        '''
+        super().__init__(maxsize, coalesce)
+        self.threads = [threading.Thread(target=self.__work, name=f'BBData dispatch {i}', daemon=True)
+                        for i in range(workers)]
+        self.__idents = set()
+        for thread in self.threads:
+            thread.start()
+            self.__idents.add(thread.ident)
+
+    def isDispatchThread(self) -> bool:
+        return threading.get_ident() in self.__idents
+
+    def schedule(self):
+        self.condition.notify_all()
+
+    def __work(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                delegate, args = self.take()
+            self.deliver(delegate, args)
+            self.done()
+
+    def join(self, timeout: float = None) -> bool:
+        '''
+        Wait until every pending emit is delivered.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to None, which waits until done.
+
+        Returns:
+            bool: True if nothing is pending
+        '''
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.active, timeout)
+
+    def close(self):
+        '''
+        Stop accepting emits, deliver the pending ones, then stop the workers.
+        '''
+        super().close()
+        if not self.isDispatchThread():
+            for thread in self.threads:
+                thread.join()
+
+
+class AsyncioDispatcher(Dispatcher):
+    '''
+    Delivers emits as callbacks of an asyncio event loop. Emitting is safe from any thread.
+    Each callback delivers the emits pending when it starts, then yields to the loop.
+    '''
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None, maxsize: int = None, coalesce: bool = True) -> None:
+        '''
+        Args:
+            loop (asyncio.AbstractEventLoop, optional): Loop to deliver on. Defaults to the running loop.
+            maxsize (int, optional): Pending emits before emitting waits. Defaults to config.dispatchQueueSize.
+            coalesce (bool, optional): Merge pending emits per (delegate, sender). Defaults to True.
+        '''
+        super().__init__(maxsize, coalesce)
+        self.loop = loop if loop != None else asyncio.get_running_loop()
+        self.__scheduled = False
+        # Futures of join calls, resolved on the loop once nothing is pending
+        self.__waiters = []
+
+    def isDispatchThread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def schedule(self):
+        if not self.__scheduled:
+            self.__scheduled = True
+            self.loop.call_soon_threadsafe(self.__drain)
+
+    def __drain(self):
+        with self.condition:
+            self.__scheduled = False
+            count = len(self.pending)
+        for i in range(count):
+            with self.condition:
+                if not self.pending:
+                    break
+                delegate, args = self.take()
+            self.deliver(delegate, args)
+            self.done()
+        with self.condition:
+            if self.pending:
+                self.schedule()
+            elif not self.active:
+                waiters, self.__waiters = self.__waiters, []
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(True)
+
+    async def join(self, timeout: float = None) -> bool:
+        '''
+        Wait until every pending emit is delivered. Must be awaited on the dispatcher's loop.
+
+        Args:
+            timeout (float, optional): Seconds to wait. Defaults to None, which waits until done.
+
+        Returns:
+            bool: True if nothing is pending
+        '''
+        with self.condition:
+            if not self.pending and not self.active:
+                return True
+            # A drain is scheduled while emits are pending, and resolves the future when it empties them
+            waiter = self.loop.create_future()
+            self.__waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return False
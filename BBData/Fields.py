@@ -1,5 +1,7 @@
-import copy
+from collections.abc import MutableMapping
 from enum import Enum
+import hashlib
+import sys
 from typing import Union
 
 from BBData.Delegate import Delegate
@@ -16,36 +18,200 @@ class FieldType(Enum):
     RADIO = 4
     ENUM = 5
 
+# Option tables are immutable and shared by every field with the same options
+_optiontables = {}
+
+def internOptions(options) -> tuple:
+    '''
+    Get the shared table for a sequence of option labels.
+
+    Args:
+        options (Iterable[str]): Option labels, in order
+
+    Returns:
+        tuple: Interned labels. Equal inputs return the same tuple object.
+    '''
+    table = tuple(sys.intern(option) if isinstance(option, str) else option for option in options)
+    return _optiontables.setdefault(table, table)
+
 class Field():
+    # Fields exist once per work item, so they carry no __dict__. Delegates are created on first
+    # access, and owning elements are notified directly instead of through a delegate.
+    # The content hash is cached until the next mutation.
+    __slots__ = ('_name', '_owners', '_fieldChanged', '_hash')
+    # Set per class, assigning it on an instance raises AttributeError
+    type = FieldType.NONE
 
     def fromDict(indict : dict):
         return Field(fieldname = indict['name'])
 
     def __init__(self, fieldname : str = 'Default Field Name') -> None:
+        self._hash = None
+        self._owners = None
+        self._fieldChanged = None
         self.name = fieldname
-        self.type = FieldType.NONE
-        self.fieldChanged = Delegate()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name : str):
+        self._name = name
+        self.invalidate()
+
+    @property
+    def fieldChanged(self) -> Delegate:
+        if self._fieldChanged is None:
+            self._fieldChanged = Delegate()
+        return self._fieldChanged
+
+    @fieldChanged.setter
+    def fieldChanged(self, delegate : Delegate):
+        self._fieldChanged = delegate
+
+    def attach(self, element):
+        '''
+        Notify element through onFieldChanged whenever this field changes, and through
+        invalidateHash whenever its value changes without emitting.
+
+        Args:
+            element (CollectionElement): Element holding the field
+        '''
+        if self._owners is None:
+            self._owners = element
+        elif isinstance(self._owners, list):
+            self._owners.append(element)
+        elif self._owners is not element:
+            self._owners = [self._owners, element]
+
+    def detach(self, element):
+        '''
+        Stop notifying element.
+
+        Args:
+            element (CollectionElement): Element that held the field
+        '''
+        if self._owners is element:
+            self._owners = None
+        elif isinstance(self._owners, list) and any(owner is element for owner in self._owners):
+            # Elements compare by content, so match by identity
+            self._owners = [owner for owner in self._owners if owner is not element]
+            if len(self._owners) == 1:
+                self._owners = self._owners[0]
+
+    def ownedBy(self, element) -> bool:
+        '''
+        Check whether the field is attached to element.
+        '''
+        if isinstance(self._owners, list):
+            return any(owner is element for owner in self._owners)
+        return self._owners is element
+
+    def invalidate(self):
+        '''
+        Drop the cached content hash of the field and of the elements holding it. Called on every
+        mutation, including those that don't emit.
+        '''
+        self._hash = None
+        if self._owners is not None:
+            for owner in self._owners if isinstance(self._owners, list) else (self._owners,):
+                owner.invalidateHash()
+
+    def contentHash(self) -> bytes:
+        '''
+        Get a digest of the type, name and value of the field. It is computed once and cached
+        until the field changes.
+
+        Returns:
+            bytes: 16 byte blake2b digest
+        '''
+        if self._hash is None:
+            self._hash = hashlib.blake2b(repr((self.type.value, self._name) + self.values()).encode(), digest_size=16).digest()
+        return self._hash
+
+    def changed(self, *args):
+        '''
+        Emit fieldChanged and notify the owning elements.
+        '''
+        self.invalidate()
+        if self._fieldChanged is not None:
+            self._fieldChanged.emit(*args)
+        if self._owners is not None:
+            for owner in self._owners if isinstance(self._owners, list) else (self._owners,):
+                owner.onFieldChanged(args)
+
+    def values(self) -> tuple:
+        '''
+        Get the value of the field as a tuple of immutable values, excluding the name. Fields of
+        the same type hold the same value exactly when their tuples are equal.
+
+        Returns:
+            tuple: Value of the field
+        '''
+        return ()
+
+    def update(self, indict: dict):
+        '''
+        Set the value of the field from a dict in the format of toDict, then emit once.
+        Keys that are missing keep their value. The name is not changed.
+
+        Args:
+            indict (dict): Serialized values
+        '''
+        self.changed(self)
 
     def toDict(self):
         d = {}
         d['name'] = self.name
         d['type'] = self.type.value
-        return copy.deepcopy(d)
+        return d
 
     def __eq__(self, __o: object) -> bool:
         if isinstance(__o, Field):
-            return self.toDict() == __o.toDict()
+            return self is __o or self.contentHash() == __o.contentHash()
         return False
 
     def __str__(self) -> str:
         return str(self.name)
 
-    def reconcile(self, templatefield):
+    def clone(self):
+        '''
+        Copy the value of the field. The copy has no owners and no listeners.
+
+        Returns:
+            Field: New field of the same type
+        '''
+        # Values are immutable and option tables are shared, so copying a field is a few references
+        copied = object.__new__(type(self))
+        copied._name = self._name
+        copied._owners = None
+        copied._fieldChanged = None
+        copied._hash = self._hash
+        return copied
+
+    def __copy__(self):
+        return self.clone()
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def reconcile(self, templatefield, dropOptions : bool = False):
+        '''
+        Bring the field in line with the field of its template, keeping its value where it can.
+
+        Args:
+            templatefield (Field): Field of the template
+            dropOptions (bool, optional): Remove Checks and Radio options the template no longer has,
+                as options replaced through setFieldOptions are. Defaults to False, which keeps them.
+        '''
         self.name = templatefield.name
         if not isinstance(templatefield, type(self)):
             raise TypeError
 
 class Enum(Field):
+    __slots__ = ('_options', 'default', 'currentItem', '_stateChanged')
+    type = FieldType.ENUM
 
     def fromDict(indict: dict):
         c = Enum(indict['options'], default= indict['default'], fieldname = indict['name'])
@@ -54,43 +220,123 @@ class Enum(Field):
 
     def __init__(self, options : list[str], default : str, fieldname : str = 'Default Enum Field') -> None:
         super().__init__(fieldname)
-        self.type = FieldType.ENUM
-
-        self.stateChanged = Delegate()
+        self._stateChanged = None
         self.options = options
-        self.default = default
+        self.default = sys.intern(default) if isinstance(default, str) else default
         self.currentItem = self.default
 
+    @property
+    def stateChanged(self) -> Delegate:
+        if self._stateChanged is None:
+            self._stateChanged = Delegate()
+        return self._stateChanged
+
+    @property
+    def options(self) -> tuple:
+        # Interned and shared by every field with the same options, so it is a tuple. Assign a new
+        # sequence to change the options.
+        return self._options
+
+    @options.setter
+    def options(self, options):
+        self._options = internOptions(options)
+        self.invalidate()
+
+    def clone(self):
+        copied = super().clone()
+        copied._options = self._options
+        copied.default = self.default
+        copied.currentItem = self.currentItem
+        copied._stateChanged = None
+        return copied
+
     def getCurrent(self):
         return self.currentItem
 
     def __str__(self) -> str:
-        return f'{super().__str__()}\n\t{self.currentItem} / {str(self.options)}'
+        return f'{super().__str__()}\n\t{self.currentItem} / {str(list(self.options))}'
 
     def getIndexFromStr(self, option : str):
         return self.options.index(option)
 
     def setCurrent(self, index : Union[int, str]):
+        '''
+        Select an option. Emits stateChanged with the new current item and fieldChanged, so the
+        owning item is marked dirty and indexes follow. Earlier versions emitted neither.
+
+        Args:
+            index (Union[int, str]): Index or label of the option
+        '''
         if isinstance(index, int):
             self.currentItem = self.options[index]
         else:
-            self.currentItem = index
+            self.currentItem = sys.intern(index) if isinstance(index, str) else index
+        if self._stateChanged is not None:
+            self._stateChanged.emit(self, self.currentItem)
+        self.changed(self)
+
+    def values(self) -> tuple:
+        return (self._options, self.default, self.currentItem)
+
+    def update(self, indict: dict):
+        if 'options' in indict:
+            self.options = indict['options']
+        if 'default' in indict:
+            self.default = sys.intern(indict['default']) if isinstance(indict['default'], str) else indict['default']
+        if 'currentItem' in indict:
+            self.currentItem = sys.intern(indict['currentItem']) if isinstance(indict['currentItem'], str) else indict['currentItem']
+        super().update(indict)
 
     def toDict(self):
         d = super().toDict()
-        d['options'] = self.options
+        d['options'] = list(self.options)
         d['default'] = self.default
         d['currentItem'] = self.currentItem
         return d
 
-    def reconcile(self, templatefield):
-        super().reconcile(templatefield)
-        self.options = templatefield.options
+    def reconcile(self, templatefield, dropOptions : bool = False):
+        super().reconcile(templatefield, dropOptions)
+        self._options = templatefield.options
         self.default = templatefield.default
         if self.currentItem not in self.options:
             self.currentItem = self.default
+        self.invalidate()
+
+class CheckOptions(MutableMapping):
+    '''
+    Dict-like view of the options of a Checks field. Reads and writes go to the field.
+    '''
+    __slots__ = ('field',)
+
+    def __init__(self, field) -> None:
+        self.field = field
+
+    def __getitem__(self, key):
+        if key not in self.field._labels:
+            raise KeyError(key)
+        return self.field.getOption(key)
+
+    def __setitem__(self, key, value):
+        self.field._setState(key, value)
+
+    def __delitem__(self, key):
+        if key not in self.field._labels:
+            raise KeyError(key)
+        self.field._removeOption(key)
+
+    def __iter__(self):
+        return iter(self.field._labels)
+
+    def __len__(self):
+        return len(self.field._labels)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
 
 class Checks(Field):
+    # Labels are a shared option table, states are the bits of an int
+    __slots__ = ('_labels', '_mask', '_stateChanged')
+    type = FieldType.CHECKS
 
     def fromDict(indict: dict):
         c = Checks(indict['options'], fieldname = indict['name'])
@@ -98,17 +344,57 @@ class Checks(Field):
 
     def __init__(self, options : dict[str : bool], fieldname : str = 'Default Checkbox Field') -> None:
         super().__init__(fieldname)
-        self.type = FieldType.CHECKS
-
-        self.stateChanged = Delegate()
+        self._stateChanged = None
         self.options = options
 
+    @property
+    def stateChanged(self) -> Delegate:
+        if self._stateChanged is None:
+            self._stateChanged = Delegate()
+        return self._stateChanged
+
+    @property
+    def options(self) -> CheckOptions:
+        return CheckOptions(self)
+
+    @options.setter
+    def options(self, options : dict[str : bool]):
+        self._labels = internOptions(options.keys())
+        self._mask = 0
+        for index, state in enumerate(options.values()):
+            if state:
+                self._mask |= 1 << index
+        self.invalidate()
+
+    def clone(self):
+        copied = super().clone()
+        copied._labels = self._labels
+        copied._mask = self._mask
+        copied._stateChanged = None
+        return copied
+
     def __str__(self) -> str:
         reppr = f'{super().__str__()}\n'
         for key, value in self.options.items():
             valuerep = 'x' if value else ' '
             reppr += f'\t[{valuerep}] {key}'
-        return 
+        return reppr
+
+    def __key(self, name : Union[str, int]) -> str:
+        return name if isinstance(name, str) else self._labels[name]
+
+    def _setState(self, key : str, state : bool):
+        if key not in self._labels:
+            self._labels = internOptions(self._labels + (key,))
+        bit = 1 << self._labels.index(key)
+        self._mask = self._mask | bit if state else self._mask & ~bit
+        self.invalidate()
+
+    def _removeOption(self, key : str):
+        index = self._labels.index(key)
+        self._labels = internOptions(self._labels[:index] + self._labels[index + 1:])
+        self._mask = (self._mask & ((1 << index) - 1)) | ((self._mask >> (index + 1)) << index)
+        self.invalidate()
 
     def setOption(self, name : Union[str, int], state : bool):
         '''
@@ -118,15 +404,11 @@ class Checks(Field):
             name (Union[str, int]): Either the name of the field or the index.
             state (bool): New state
         '''
-        if isinstance(name, str):
-            self.options[name] = state
-            self.stateChanged.emit(self, name, state)
-            self.fieldChanged.emit(self, name)
-        else:
-            key = list(self.options.keys())[name]
-            self.options[key] = state
-            self.stateChanged.emit(self, key, state)
-            self.fieldChanged.emit(self, key)
+        key = self.__key(name)
+        self._setState(key, state)
+        if self._stateChanged is not None:
+            self._stateChanged.emit(self, key, state)
+        self.changed(self, key)
 
     def getOption(self, name : Union[str, int]):
         '''
@@ -139,31 +421,42 @@ class Checks(Field):
             bool: The state of the field
         '''
         if isinstance(name, str):
-            return self.options[name]
+            if name not in self._labels:
+                raise KeyError(name)
+            index = self._labels.index(name)
         else:
-            return self.options[list(self.options.keys())[name]]
+            # Indexes behave as they do on a list, negative ones included
+            index = range(len(self._labels))[name]
+        return bool(self._mask >> index & 1)
+
+    def values(self) -> tuple:
+        return (self._labels, self._mask)
+
+    def update(self, indict: dict):
+        if 'options' in indict:
+            self.options = indict['options']
+        super().update(indict)
 
     def toDict(self):
         d = super().toDict()
-        d['options'] = self.options
+        d['options'] = {label: bool(self._mask >> index & 1) for index, label in enumerate(self._labels)}
         return d
 
-    def __eq__(self, __o: object) -> bool:
-        if isinstance(__o, Checks):
-            return self.toDict() == __o.toDict()
-        return False
+    def _dropOptions(self, templatefield):
+        for key in [key for key in self._labels if key not in templatefield._labels]:
+            self._removeOption(key)
 
-    def reconcile(self, templatefield):
-        super().reconcile(templatefield)
-        newkeys = templatefield.options.items()
-        currentkeys = list(self.options.keys())
-        for newkey, newvalue in newkeys:
-            if newkey not in currentkeys:
-                self.options[newkey] = newvalue
-            elif newvalue == True:
-                self.options[newkey] = newvalue
+    def reconcile(self, templatefield, dropOptions : bool = False):
+        super().reconcile(templatefield, dropOptions)
+        if dropOptions:
+            self._dropOptions(templatefield)
+        for newkey, newvalue in templatefield.options.items():
+            if newkey not in self._labels or newvalue == True:
+                self._setState(newkey, newvalue)
 
 class Radio(Checks):
+    __slots__ = ('maxAllowed',)
+    type = FieldType.RADIO
 
     def fromDict(indict: dict):
         c = Radio(indict['options'], maximumAllowedChecks=indict['maxallowed'], fieldname = indict['name'])
@@ -171,69 +464,100 @@ class Radio(Checks):
 
     def __init__(self, options: dict[str : bool], maximumAllowedChecks : int = 1 , fieldname: str = 'Default Checkbox Field') -> None:
         super().__init__(options, fieldname)
-        self.type = FieldType.RADIO
         if maximumAllowedChecks == -1:
             # Auto calculate allowed numbers
-            self.maxAllowed = len([item for item in options if item[2]])
+            self.maxAllowed = bin(self._mask).count('1')
         else:
             self.maxAllowed = maximumAllowedChecks
-        self.stateChanged.connect(self.disableOtherOptions)
-        
+
+    def clone(self):
+        copied = super().clone()
+        copied.maxAllowed = self.maxAllowed
+        return copied
+
+    def setOption(self, name : Union[str, int], state : bool):
+        key = name if isinstance(name, str) else self._labels[name]
+        self._mask = 0
+        super().setOption(key, state)
+
     def disableOtherOptions(self, args):
         # args[1] # index
         for key, value in self.options.items():
             if key != args[1]:
                 self.options[key] = False
-        self.fieldChanged.emit(self)
+        self.changed(self)
+
+    def values(self) -> tuple:
+        return super().values() + (self.maxAllowed,)
+
+    def update(self, indict: dict):
+        if 'maxallowed' in indict:
+            self.maxAllowed = indict['maxallowed']
+        super().update(indict)
 
     def toDict(self):
         d = super().toDict()
         d['maxallowed'] = self.maxAllowed
         return d
 
-    def reconcile(self, templatefield):
-        newkeys = templatefield.options.items()
-        currentkeys = list(self.options.keys())
-        for newkey, newvalue in newkeys:
-            if newkey not in currentkeys:
-                self.options[newkey] = newvalue
+    def reconcile(self, templatefield, dropOptions : bool = False):
+        if dropOptions:
+            self._dropOptions(templatefield)
+        for newkey, newvalue in templatefield.options.items():
+            if newkey not in self._labels:
+                self._setState(newkey, newvalue)
 
 
 class ShortText(Field):
+    __slots__ = ('__text',)
+    type = FieldType.LINETEXT
 
     def fromDict(indict: dict):
         return ShortText(fieldname=indict['name'], defaultText=indict['text'])
 
     def __init__(self, fieldname: str = 'Default ShortText Name', defaultText = '') -> None:
         super().__init__(fieldname)
-        self.type = FieldType.LINETEXT
         self.__text = defaultText
 
     def __str__(self) -> str:
         return f'{super().__str__()}\n\t{self.text()}'
 
+    def clone(self):
+        copied = super().clone()
+        copied.__text = self.__text
+        return copied
+
     def setText(self, text):
         self.__text = text
-        self.fieldChanged.emit(self)
+        self.changed(self)
 
     def text(self):
         return self.__text
 
+    def values(self) -> tuple:
+        return (self.__text,)
+
+    def update(self, indict: dict):
+        if 'text' in indict:
+            self.__text = indict['text']
+        super().update(indict)
+
     def toDict(self):
         d = super().toDict()
         d['text'] = self.__text
         return d
 
 class LongText(ShortText):
+    __slots__ = ()
+    type = FieldType.LONGTEXT
 
     def fromDict(indict: dict):
         return LongText(fieldname=indict['name'], defaultText=indict['text'])
 
     def __init__(self, fieldname: str = 'Default LongText Name', defaultText='') -> None:
         super().__init__(fieldname)
-        self.type = FieldType.LONGTEXT
         self.setText(defaultText)
-    
+
     def toDict(self):
         d = super().toDict()
         d['type'] = self.type.value
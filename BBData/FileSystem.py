@@ -1,43 +1,268 @@
+import hashlib
 import os
 from types import NoneType
 
-from BBData.utilities import first, getFilesWithExtension
-
 class Tree():
     def __init__(self) -> None:
-        self.nodes = []
+        # uuid -> node, and parent uuid -> {child uuid: child}. Roots are kept under None.
+        self.nodes = {}
+        self.children = {None: {}}
 
     def print(self):
-        for node in self.nodes:
-            print(node.printable())
+        for root in self.getRoots():
+            for node in self.walk(root):
+                print(node.printable())
 
     def addNode(self, node):
-        nodeids = [existingnode.uuid for existingnode in self.nodes]
-        if node.uuid not in nodeids:
-            self.nodes.append(node)
+        if node.uuid not in self.nodes:
+            self.nodes[node.uuid] = node
+            self.children.setdefault(Tree.__key(node.parent), {})[node.uuid] = node
 
     def getNode(self, id):
-        print(f'Getting {id}')
-        return first([node.uuid for node in self.nodes if node.uuid == id])
+        return self.nodes.get(id)
+
+    def getNodes(self) -> list:
+        '''
+        Get every node, in the order they were added. nodes used to be this list.
+
+        Returns:
+            list: Nodes
+        '''
+        return list(self.nodes.values())
+
+    @property
+    def nodeids(self):
+        # Set-like view of the uuids, which used to be kept as a set next to the list
+        return self.nodes.keys()
+
+    def removeNode(self, node) -> list:
+        '''
+        Remove a node and its subtree from the tree.
+
+        Args:
+            node (TreeNode): Node to remove
+
+        Returns:
+            list: Removed nodes, parents before children
+        '''
+        if self.nodes.get(node.uuid) is not node:
+            return []
+        removed = list(self.walk(node))
+        self.children.get(Tree.__key(node.parent), {}).pop(node.uuid, None)
+        for descendant in removed:
+            del self.nodes[descendant.uuid]
+            self.children.pop(descendant.uuid, None)
+        return removed
+
+    def getChildren(self, node=None) -> list:
+        '''
+        Get the direct children of a node.
+
+        Args:
+            node (TreeNode, optional): Parent node. Defaults to None, which returns nodes without a parent.
+
+        Returns:
+            list: Child nodes
+        '''
+        return list(self.children.get(Tree.__key(node), {}).values())
+
+    def getRoots(self) -> list:
+        '''
+        Get the nodes whose parent is not in the tree.
+
+        Returns:
+            list: Root nodes
+        '''
+        return [node for node in self.nodes.values() if node.parent is None or node.parent.uuid not in self.nodes]
+
+    def walk(self, node):
+        '''
+        Iterate over a subtree, parents before children.
+
+        Args:
+            node (TreeNode): Subtree root
+
+        Yields:
+            TreeNode: Nodes of the subtree, node first
+        '''
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(self.children.get(current.uuid, {}).values()))
+
+    def reparent(self, node, oldparent, newparent):
+        # Called by TreeNode when its parent changes
+        if self.nodes.get(node.uuid) is not node:
+            return
+        self.children.get(Tree.__key(oldparent), {}).pop(node.uuid, None)
+        self.children.setdefault(Tree.__key(newparent), {})[node.uuid] = node
+
+    def rekey(self, node, oldid):
+        # Called by TreeNode when its uuid changes
+        if self.nodes.get(oldid) is not node:
+            return
+        del self.nodes[oldid]
+        self.nodes[node.uuid] = node
+        siblings = self.children.get(Tree.__key(node.parent), {})
+        siblings.pop(oldid, None)
+        siblings[node.uuid] = node
+        if oldid in self.children:
+            self.children[node.uuid] = self.children.pop(oldid)
+
+    def __key(node):
+        return None if node is None else node.uuid
+
+def hashedAttribute(name: str) -> property:
+    '''
+    Property for a value the content hash is computed from, stored under name. Assigning it drops
+    the cached hash, so the value can be written directly.
+
+    Args:
+        name (str): Attribute holding the value
+
+    Returns:
+        property: Property to assign in a class body
+    '''
+    def get(self):
+        return getattr(self, name)
+
+    def set(self, value):
+        setattr(self, name, value)
+        self._hash = None
+
+    return property(get, set)
 
 class TreeNode():
     def __init__(self,id : str, tree = None, parent = None) -> None:
+        self._path = None
+        # Content hash, cached until the node changes, and the hash it had when last written
+        self._hash = None
+        self._savedHash = None
+        # Set while the node has changes that are not written to disk
+        self.dirty = True
+        self.tree = tree
         self.uuid = id
         self.parent = parent
-        self.tree = tree
         if tree != None:
             self.tree.addNode(self)
 
-        
+    @property
+    def uuid(self) -> str:
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, id : str):
+        oldid = getattr(self, '_uuid', None)
+        self._uuid = id
+        self._hash = None
+        if getattr(self, 'tree', None) != None and oldid != id:
+            self.tree.rekey(self, oldid)
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        oldparent = getattr(self, '_parent', None)
+        self._parent = parent
+        if oldparent is not parent:
+            if getattr(self, 'tree', None) != None:
+                self.tree.reparent(self, oldparent, parent)
+            self.invalidatePath()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, name : str):
+        self._name = name
+        self.invalidatePath()
+        self.markDirty()
+
+    def markDirty(self, *args):
+        '''
+        Flag the node as changed since it was last written. Accepts and ignores delegate arguments.
+        '''
+        self.dirty = True
+        self._hash = None
+
+    def invalidateHash(self):
+        '''
+        Drop the cached content hash without flagging the node as changed.
+        '''
+        self._hash = None
+
+    def hashValues(self) -> tuple:
+        '''
+        Get the values the content hash is computed from. Subclasses extend it with their own.
+
+        Returns:
+            tuple: Immutable values with a stable repr
+        '''
+        return (type(self).__name__, self.uuid, getattr(self, '_name', None))
+
+    def computeHash(self):
+        return hashlib.blake2b(repr(self.hashValues()).encode(), digest_size=16)
+
+    def contentHash(self) -> bytes:
+        '''
+        Get a digest of the content of the node. It is computed once and cached until the node
+        is marked dirty.
+
+        Returns:
+            bytes: 16 byte blake2b digest
+        '''
+        if self._hash is None:
+            self._hash = self.computeHash().digest()
+        return self._hash
+
+    def markSaved(self):
+        '''
+        Flag the node as written, remembering its content hash.
+        '''
+        self.dirty = False
+        self._savedHash = self.contentHash()
+
+    def hasChanges(self) -> bool:
+        '''
+        Check whether the node differs from what was last written. Unlike dirty, edits that were
+        undone before saving don't count.
+
+        Returns:
+            bool: True if the node needs to be written
+        '''
+        return self.dirty and (self._savedHash is None or self.contentHash() != self._savedHash)
+
+    def invalidatePath(self):
+        '''
+        Drop the cached path of this node and its descendants.
+        '''
+        # A descendant is only ever cached after its parent, so stop at uncached nodes
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if getattr(node, '_path', None) == None:
+                continue
+            node._path = None
+            if node.tree != None:
+                stack.extend(node.tree.children.get(node.uuid, {}).values())
+
     def getPath(self):
         return self.printable()
-        if isinstance(self.parent, NoneType):
-            return f'{os.sep}{self.uuid}'
-        else:
-            return f'{self.parent.getPath()}{os.sep}{self.uuid}'
 
     def printable(self) -> str:
+        if self._path != None:
+            return self._path
         if isinstance(self.parent, NoneType):
-            return f'{os.sep}{self.name}'
+            path = f'{os.sep}{self.name}'
         else:
-            return f'{self.parent.printable()}{os.sep}{self.name}'
+            path = f'{self.parent.printable()}{os.sep}{self.name}'
+        # Cache only where invalidation can reach: in the tree, and below a parent cached in the same tree
+        if self.tree != None and self.tree.nodes.get(self.uuid) is self and (
+                self.parent is None or (self.parent.tree is self.tree and self.parent._path != None)):
+            self._path = path
+        return path
+
@@ -0,0 +1,297 @@
+from array import array
+
+
+class Coverage():
+    '''
+    Result of TraceGraph.coverage: which items of one template trace to an item of another.
+    '''
+    __slots__ = ('covered', 'uncovered')
+
+    def __init__(self, covered: list, uncovered: list) -> None:
+        # Uuids, in graph order
+        self.covered = covered
+        self.uncovered = uncovered
+
+    @property
+    def ratio(self) -> float:
+        '''
+        Covered fraction, 1.0 when there is nothing to cover.
+        '''
+        total = len(self.covered) + len(self.uncovered)
+        return len(self.covered) / total if total else 1.0
+
+    def __repr__(self) -> str:
+        return f'Coverage(covered={len(self.covered)}, uncovered={len(self.uncovered)})'
+
+
+class TraceGraph():
+    '''
+    Index of the upstream/downstream links between work items.
+
+    Items get integer ids in the order they are given, and links are kept in compressed sparse
+    row arrays in both directions: the downstream ids of item i are
+    targets[offsets[i]:offsets[i + 1]], and likewise for sources/reverseoffsets upstream.
+    Queries take and return uuids. The graph is a snapshot, it doesn't follow later edits.
+    '''
+
+    def __init__(self, nodes: dict, links) -> None:
+        '''
+        Args:
+            nodes (dict): uuid -> template uuid, or None for items without a template
+            links (Iterable[tuple[str, str]]): (upstream uuid, downstream uuid) pairs. Duplicates
+                are merged and links to unknown uuids are dropped.
+        '''
+        self.uuids = list(nodes)
+        self.ids = {uuid: id for id, uuid in enumerate(self.uuids)}
+        self.templates = list(dict.fromkeys(nodes.values()))
+        templateids = {template: id for id, template in enumerate(self.templates)}
+        self.kinds = array('l', [templateids[template] for template in nodes.values()])
+        # Links dropped because an end is unknown
+        self.dangling = 0
+
+        count = len(self.uuids)
+        downstream = [None] * count
+        for source, target in links:
+            a, b = self.ids.get(source), self.ids.get(target)
+            if a is None or b is None:
+                self.dangling += 1
+                continue
+            if downstream[a] is None:
+                downstream[a] = set()
+            downstream[a].add(b)
+
+        self.offsets = array('l', [0]) * (count + 1)
+        self.targets = array('l')
+        for id, ends in enumerate(downstream):
+            if ends:
+                self.targets.extend(sorted(ends))
+            self.offsets[id + 1] = len(self.targets)
+
+        # Reverse arrays by counting sort over the targets
+        self.reverseoffsets = array('l', [0]) * (count + 1)
+        for target in self.targets:
+            self.reverseoffsets[target + 1] += 1
+        for id in range(count):
+            self.reverseoffsets[id + 1] += self.reverseoffsets[id]
+        self.sources = array('l', [0]) * len(self.targets)
+        fill = self.reverseoffsets[:-1]
+        for source in range(count):
+            for index in range(self.offsets[source], self.offsets[source + 1]):
+                target = self.targets[index]
+                self.sources[fill[target]] = source
+                fill[target] += 1
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.ids
+
+    @property
+    def linkCount(self) -> int:
+        return len(self.targets)
+
+    def __toIds(self, uuids) -> list:
+        if isinstance(uuids, str):
+            uuids = (uuids,)
+        return [self.ids[uuid] for uuid in uuids]
+
+    def __walk(self, start: list, offsets: array, ends: array, depth: int = None) -> tuple:
+        # Mark everything reachable from start in at least one step, within depth steps.
+        # Returns the marks and the marked ids, so small walks don't scan the marks.
+        seen = bytearray(len(self.uuids))
+        reached = []
+        frontier = start
+        level = 0
+        while frontier and (depth is None or level < depth):
+            following = []
+            for node in frontier:
+                for index in range(offsets[node], offsets[node + 1]):
+                    end = ends[index]
+                    if not seen[end]:
+                        seen[end] = 1
+                        following.append(end)
+            reached += following
+            frontier = following
+            level += 1
+        return seen, reached
+
+    def __select(self, walked: tuple) -> set:
+        uuids = self.uuids
+        return {uuids[id] for id in walked[1]}
+
+    def downstreamOf(self, uuids, depth: int = None) -> set:
+        '''
+        Get the items reachable downstream of any of the given items.
+
+        Args:
+            uuids (Union[str, Iterable[str]]): Starting items
+            depth (int, optional): Links to follow. Defaults to None, which follows every link.
+
+        Returns:
+            set: Uuids reached. A starting item is only included when a cycle leads back to it.
+        '''
+        return self.__select(self.__walk(self.__toIds(uuids), self.offsets, self.targets, depth))
+
+    def upstreamOf(self, uuids, depth: int = None) -> set:
+        '''
+        Get the items reachable upstream of any of the given items.
+
+        Args:
+            uuids (Union[str, Iterable[str]]): Starting items
+            depth (int, optional): Links to follow. Defaults to None, which follows every link.
+
+        Returns:
+            set: Uuids reached. A starting item is only included when a cycle leads back to it.
+        '''
+        return self.__select(self.__walk(self.__toIds(uuids), self.reverseoffsets, self.sources, depth))
+
+    def reaches(self, source: str, target: str) -> bool:
+        '''
+        Check whether target is downstream of source.
+
+        Args:
+            source (str): Upstream item
+            target (str): Downstream item
+
+        Returns:
+            bool: True if a chain of downstream links leads from source to target
+        '''
+        goal = self.ids[target]
+        seen = bytearray(len(self.uuids))
+        stack = [self.ids[source]]
+        offsets, targets = self.offsets, self.targets
+        while stack:
+            node = stack.pop()
+            for index in range(offsets[node], offsets[node + 1]):
+                end = targets[index]
+                if end == goal:
+                    return True
+                if not seen[end]:
+                    seen[end] = 1
+                    stack.append(end)
+        return False
+
+    def impact(self, uuids) -> dict:
+        '''
+        Get the downstream closure of each of the given items, for example the work affected by
+        changing each of a set of requirements.
+
+        Args:
+            uuids (Iterable[str]): Changed items
+
+        Returns:
+            dict: uuid -> set of downstream uuids
+        '''
+        return {uuid: self.downstreamOf(uuid) for uuid in ([uuids] if isinstance(uuids, str) else uuids)}
+
+    def ofTemplate(self, template: str) -> list:
+        '''
+        Get the items following a template.
+
+        Args:
+            template (str): Template uuid
+
+        Returns:
+            list: Uuids, in graph order
+        '''
+        if template not in self.templates:
+            return []
+        kind = self.templates.index(template)
+        return [self.uuids[id] for id, value in enumerate(self.kinds) if value == kind]
+
+    def orphans(self, template: str = None) -> list:
+        '''
+        Get the items with nothing upstream.
+
+        Args:
+            template (str, optional): Only items of this template. Defaults to None, which checks every item.
+
+        Returns:
+            list: Uuids, in graph order
+        '''
+        kind = self.templates.index(template) if template in self.templates else None
+        if template != None and kind == None:
+            return []
+        offsets = self.reverseoffsets
+        return [self.uuids[id] for id in range(len(self.uuids))
+                if offsets[id] == offsets[id + 1] and (kind == None or self.kinds[id] == kind)]
+
+    def coverage(self, source: str, target: str) -> Coverage:
+        '''
+        Check which items of one template have a downstream item of another, at any depth. For
+        example, which requirements are traced to a test case. Runs one walk over the whole graph,
+        whatever the number of items.
+
+        Args:
+            source (str): Template uuid of the items to cover
+            target (str): Template uuid of the items that cover them
+
+        Returns:
+            Coverage: Covered and uncovered items of the source template
+        '''
+        sourcekind = self.templates.index(source) if source in self.templates else None
+        targetkind = self.templates.index(target) if target in self.templates else None
+        kinds = self.kinds
+        # Walking upstream from every target item marks the items that reach one
+        seen = self.__walk([id for id, kind in enumerate(kinds) if kind == targetkind],
+                           self.reverseoffsets, self.sources)[0] if targetkind != None else bytearray(len(self.uuids))
+        covered, uncovered = [], []
+        for id, kind in enumerate(kinds):
+            if kind == sourcekind:
+                (covered if seen[id] else uncovered).append(self.uuids[id])
+        return Coverage(covered, uncovered)
+
+    def cycles(self) -> list:
+        '''
+        Find the groups of items that are downstream of themselves.
+
+        Returns:
+            list: One list of uuids per strongly connected group of more than one item, or per
+                item linked to itself
+        '''
+        # Iterative Tarjan
+        count = len(self.uuids)
+        offsets, targets = self.offsets, self.targets
+        order = array('l', [-1]) * count
+        low = array('l', [0]) * count
+        onstack = bytearray(count)
+        stack = []
+        found = []
+        counter = 0
+        for root in range(count):
+            if order[root] != -1:
+                continue
+            work = [(root, offsets[root])]
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            onstack[root] = 1
+            while work:
+                node, index = work[-1]
+                if index < offsets[node + 1]:
+                    work[-1] = (node, index + 1)
+                    end = targets[index]
+                    if order[end] == -1:
+                        order[end] = low[end] = counter
+                        counter += 1
+                        stack.append(end)
+                        onstack[end] = 1
+                        work.append((end, offsets[end]))
+                    elif onstack[end] and order[end] < low[node]:
+                        low[node] = order[end]
+                    continue
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == order[node]:
+                    group = []
+                    while True:
+                        member = stack.pop()
+                        onstack[member] = 0
+                        group.append(member)
+                        if member == node:
+                            break
+                    if len(group) > 1 or any(targets[index] == node for index in range(offsets[node], offsets[node + 1])):
+                        found.append([self.uuids[member] for member in reversed(group)])
+        return found
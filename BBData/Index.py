@@ -0,0 +1,77 @@
+import os
+import sqlite3
+
+from BBData import config
+
+
+class WorkspaceIndex():
+    '''
+    Persistent index of the elements in a workspace, stored at the workspace root.
+
+    Maps each uuid to its relative path, type (file extension), name, parent uuid and the
+    mtime/size of its file when it was last read, so unchanged files don't have to be read again.
+    '''
+
+    columns = ('uuid', 'path', 'kind', 'name', 'parent', 'mtime', 'size')
+
+    def __init__(self, root: str) -> None:
+        self.path = os.path.join(root, config.indexfilename)
+
+    def __connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('''CREATE TABLE IF NOT EXISTS entries (
+            uuid TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            name TEXT,
+            parent TEXT,
+            mtime INTEGER,
+            size INTEGER)''')
+        return connection
+
+    def load(self) -> dict:
+        '''
+        Load every entry.
+
+        Returns:
+            dict: relative path -> entry dict
+        '''
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            connection = self.__connect()
+            try:
+                return {row[1]: dict(zip(WorkspaceIndex.columns, row)) for row in
+                        connection.execute(f'SELECT {", ".join(WorkspaceIndex.columns)} FROM entries')}
+            finally:
+                connection.close()
+        except sqlite3.DatabaseError:
+            # A damaged index is only a cache, drop it so the next sync rebuilds it
+            os.remove(self.path)
+            return {}
+
+    def sync(self, entries: list, previous: dict = None):
+        '''
+        Write entries, touching only rows that changed since previous.
+
+        Args:
+            entries (list): Entry dicts with the keys in WorkspaceIndex.columns
+            previous (dict, optional): Result of load() to diff against. Defaults to None, which rewrites every row.
+        '''
+        previous = previous if previous != None else {}
+        current = {entry['uuid'] for entry in entries}
+        stale = [(entry['uuid'],) for entry in previous.values() if entry['uuid'] not in current]
+        changed = [tuple(entry[column] for column in WorkspaceIndex.columns) for entry in entries
+                   if previous.get(entry['path']) != {column: entry[column] for column in WorkspaceIndex.columns}]
+        if not stale and not changed:
+            return
+        connection = self.__connect()
+        try:
+            with connection:
+                if not previous:
+                    connection.execute('DELETE FROM entries')
+                connection.executemany('DELETE FROM entries WHERE uuid = ?', stale)
+                connection.executemany(
+                    f'INSERT OR REPLACE INTO entries ({", ".join(WorkspaceIndex.columns)}) VALUES ({", ".join("?" * len(WorkspaceIndex.columns))})', changed)
+        finally:
+            connection.close()
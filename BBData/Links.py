@@ -0,0 +1,79 @@
+from collections.abc import MutableSet
+
+
+class LinkSet(MutableSet):
+    '''
+    Uuids of the elements linked upstream or downstream of an element, in the order they were
+    linked. Membership, adding and removing are O(1). Compares equal to a list or tuple of the
+    same uuids in the same order, and serializes as a list.
+
+    The element holding the set is its owner, and its content hash is dropped on every change.
+    '''
+    __slots__ = ('__links', 'owner')
+
+    def __init__(self, links=(), owner=None) -> None:
+        # Dict keys keep insertion order
+        self.__links = dict.fromkeys(links)
+        self.owner = owner
+
+    def __changed(self):
+        if self.owner is not None:
+            self.owner.invalidateHash()
+
+    def __contains__(self, uuid) -> bool:
+        return uuid in self.__links
+
+    def __iter__(self):
+        return iter(self.__links)
+
+    def __reversed__(self):
+        return reversed(self.__links)
+
+    def __len__(self) -> int:
+        return len(self.__links)
+
+    def add(self, uuid: str):
+        self.__links[uuid] = None
+        self.__changed()
+
+    def discard(self, uuid: str):
+        self.__links.pop(uuid, None)
+        self.__changed()
+
+    def append(self, uuid: str):
+        '''
+        Same as add, for code written against lists.
+        '''
+        self.add(uuid)
+
+    def remove(self, uuid: str):
+        '''
+        Remove a uuid.
+
+        Raises:
+            ValueError: uuid is not linked, as list.remove would
+        '''
+        try:
+            del self.__links[uuid]
+        except KeyError:
+            raise ValueError(uuid) from None
+        self.__changed()
+
+    def update(self, uuids):
+        self.__links.update(dict.fromkeys(uuids))
+        self.__changed()
+
+    def toList(self) -> list:
+        return list(self.__links)
+
+    def __eq__(self, __o: object) -> bool:
+        if isinstance(__o, LinkSet):
+            return list(self.__links) == list(__o.__links)
+        if isinstance(__o, (list, tuple)):
+            return list(self.__links) == list(__o)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'LinkSet({list(self.__links)!r})'
@@ -0,0 +1,257 @@
+from typing import Callable
+from BBData.Fields import Checks, Enum
+from BBData.utilities import parseTime
+
+
+class QueryIndex():
+    '''
+    Secondary indexes over work items: by template uuid, by name, by the current item of Enum
+    fields and by the state of Checks and Radio options.
+
+    Items are indexed when added and re-indexed whenever their attributeChanged delegate emits,
+    which covers field edits, renames, template changes and fields added or removed by their
+    template. Changes made while the delegate is blocked are not seen.
+    Released items stay indexed by uuid under the values they had, without being held, and are
+    read again through resolve when a result includes them.
+    Results are lists of items in the order they were indexed.
+    '''
+
+    def __init__(self, items: list = None, resolve: Callable = None) -> None:
+        '''
+        Args:
+            items (list[WorkItem], optional): Items to index. Defaults to None.
+            resolve (Callable, optional): uuid -> item, for released items. Defaults to None.
+        '''
+        # uuid -> item, or None once released
+        self.items = {}
+        self.resolve = resolve
+        # uuid -> updateDate of released items
+        self.__dates = {}
+        # Tables map a key to a dict used as an ordered set of uuids
+        self.templates = {}
+        self.names = {}
+        # (field name, current item) -> uuids
+        self.enums = {}
+        # (field name, option, state) -> uuids
+        self.checks = {}
+        # uuid -> [(table, key)] the item is filed under
+        self.__filed = {}
+        for item in items if items != None else []:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item):
+        '''
+        Index an item and follow its changes.
+
+        Args:
+            item (WorkItem): Item to index
+        '''
+        uuid = item.uuid
+        if uuid in self.items:
+            if self.items[uuid] is not None:
+                return
+            # Read again after it was released
+            self.items[uuid] = item
+            del self.__dates[uuid]
+            self.reindex(item)
+        else:
+            self.items[uuid] = item
+            self.__file(item)
+        item.attributeChanged.connect(self.onItemChanged)
+
+    def remove(self, item):
+        '''
+        Stop indexing an item.
+
+        Args:
+            item (WorkItem): Indexed item
+        '''
+        if item.uuid not in self.items:
+            return
+        held = self.items.pop(item.uuid)
+        self.__dates.pop(item.uuid, None)
+        self.__unfile(item.uuid)
+        if held is not None:
+            held.attributeChanged.disconnect(self.onItemChanged)
+
+    def release(self, item):
+        '''
+        Stop holding an indexed item, keeping it filed under its current values, which are the
+        ones it is read back with. Adding the item again holds it again.
+
+        Args:
+            item (WorkItem): Indexed item without unsaved changes
+        '''
+        if self.resolve == None or self.items.get(item.uuid) is not item:
+            return
+        self.items[item.uuid] = None
+        self.__dates[item.uuid] = item.updateDate
+        item.attributeChanged.disconnect(self.onItemChanged)
+
+    def reindex(self, item):
+        '''
+        File an indexed item again under its current values.
+
+        Args:
+            item (WorkItem): Indexed item
+        '''
+        keys = self.__keys(item)
+        filed = self.__filed.get(item.uuid)
+        if filed == None or len(filed) != len(keys):
+            self.__unfile(item.uuid)
+            self.__file(item, keys)
+            return
+        # Most edits change one key, move only the keys that differ
+        uuid = item.uuid
+        for index, (old, new) in enumerate(zip(filed, keys)):
+            if old[1] != new[1] or old[0] is not new[0]:
+                self.__drop(old[0], old[1], uuid)
+                new[0].setdefault(new[1], {})[uuid] = None
+                filed[index] = new
+
+    def onItemChanged(self, args: tuple):
+        # Subscribed to attributeChanged of every indexed item, args[0] is the item
+        item = args[0]
+        if self.items.get(item.uuid) is item:
+            self.reindex(item)
+
+    def __keys(self, item) -> list:
+        # (table, key) pairs the item belongs under
+        template = getattr(item, 'template', None)
+        keys = [(self.templates, template.uuid if template != None else None), (self.names, item.name)]
+        for field in item.public + item.private:
+            if isinstance(field, Enum):
+                keys.append((self.enums, (field.name, field.currentItem)))
+            elif isinstance(field, Checks):
+                labels, mask = field.values()[:2]
+                keys += [(self.checks, (field.name, label, bool(mask >> index & 1))) for index, label in enumerate(labels)]
+        return keys
+
+    def __file(self, item, keys: list = None):
+        uuid = item.uuid
+        keys = keys if keys != None else self.__keys(item)
+        for table, key in keys:
+            table.setdefault(key, {})[uuid] = None
+        self.__filed[uuid] = keys
+
+    def __unfile(self, uuid: str):
+        for table, key in self.__filed.pop(uuid, ()):
+            self.__drop(table, key, uuid)
+
+    def __drop(self, table: dict, key, uuid: str):
+        uuids = table.get(key)
+        if uuids != None:
+            uuids.pop(uuid, None)
+            if not uuids:
+                del table[key]
+
+    def __item(self, uuid: str):
+        item = self.items[uuid]
+        return item if item is not None else self.resolve(uuid)
+
+    def __updated(self, uuid: str) -> int:
+        item = self.items[uuid]
+        return item.updateDate if item is not None else self.__dates[uuid]
+
+    def __items(self, uuids) -> list:
+        # Resolving can re-file items, so the uuids are copied first
+        return [self.__item(uuid) for uuid in list(uuids)]
+
+    def withTemplate(self, template) -> list:
+        '''
+        Get the items following a template.
+
+        Args:
+            template (Union[WorkItemDefinition, str]): Definition or its uuid
+
+        Returns:
+            list: Items
+        '''
+        return self.__items(self.templates.get(getattr(template, 'uuid', template), ()))
+
+    def named(self, name: str) -> list:
+        '''
+        Get the items with a name.
+
+        Returns:
+            list: Items
+        '''
+        return self.__items(self.names.get(name, ()))
+
+    def withEnum(self, fieldname: str, value: str) -> list:
+        '''
+        Get the items whose Enum field is set to value.
+
+        Args:
+            fieldname (str): Field name, public or private
+            value (str): Current item of the field
+
+        Returns:
+            list: Items
+        '''
+        return self.__items(self.enums.get((fieldname, value), ()))
+
+    def withCheck(self, fieldname: str, option: str, state: bool = True) -> list:
+        '''
+        Get the items whose Checks or Radio field has an option in a state.
+
+        Args:
+            fieldname (str): Field name, public or private
+            option (str): Option label
+            state (bool, optional): State of the option. Defaults to True.
+
+        Returns:
+            list: Items
+        '''
+        return self.__items(self.checks.get((fieldname, option, state), ()))
+
+    def updatedSince(self, since) -> list:
+        '''
+        Get the items updated at or after a time. Timestamps are integers, so this is a scan
+        without parsing; sort the result with key=lambda item: item.updateDate for recency.
+
+        Args:
+            since (Union[int, str, datetime]): Time, in any format parseTime reads
+
+        Returns:
+            list: Items
+        '''
+        since = parseTime(since)
+        return self.__items([uuid for uuid in self.items if self.__updated(uuid) >= since])
+
+    def where(self, template=None, name: str = None, enums: dict = None, checks: dict = None, since=None) -> list:
+        '''
+        Get the items matching every given condition, by intersecting index entries from the smallest.
+
+        Args:
+            template (Union[WorkItemDefinition, str], optional): Definition or its uuid. Defaults to None.
+            name (str, optional): Item name. Defaults to None.
+            enums (dict, optional): field name -> current item. Defaults to None.
+            checks (dict, optional): (field name, option) -> state. Defaults to None.
+            since (Union[int, str, datetime], optional): Only items updated at or after this time. Defaults to None.
+
+        Returns:
+            list: Items. Every indexed item when no condition is given.
+        '''
+        sets = []
+        if template != None:
+            sets.append(self.templates.get(getattr(template, 'uuid', template), {}))
+        if name != None:
+            sets.append(self.names.get(name, {}))
+        for fieldname, value in (enums or {}).items():
+            sets.append(self.enums.get((fieldname, value), {}))
+        for (fieldname, option), state in (checks or {}).items():
+            sets.append(self.checks.get((fieldname, option, state), {}))
+        if not sets:
+            return self.updatedSince(since) if since != None else self.__items(self.items)
+        sets.sort(key=len)
+        uuids = sets[0]
+        for other in sets[1:]:
+            uuids = [uuid for uuid in uuids if uuid in other]
+        if since != None:
+            since = parseTime(since)
+            uuids = [uuid for uuid in uuids if self.__updated(uuid) >= since]
+        return self.__items(uuids)
@@ -0,0 +1,114 @@
+from enum import Enum
+
+from BBData.Fields import Field
+
+
+class TemplateSchema():
+    '''
+    Compiled, read-only description of the fields of a WorkItemDefinition.
+
+    Holds a private copy of every template field as a prototype, so items are instantiated by
+    cloning values instead of deep copying the definition's live fields. Definitions compile it
+    on first use and drop it whenever their template changes.
+    '''
+    __slots__ = ('public', 'private', 'publicnames', 'privatenames')
+
+    def __init__(self, public: list[Field], private: list[Field]) -> None:
+        self.public = tuple(field.clone() for field in public)
+        self.private = tuple(field.clone() for field in private)
+        # name -> prototype
+        self.publicnames = {field.name: field for field in self.public}
+        self.privatenames = {field.name: field for field in self.private}
+
+    def instantiate(self) -> tuple[list[Field], list[Field]]:
+        '''
+        Create the fields of a new item.
+
+        Returns:
+            tuple[list[Field], list[Field]]: Public and private fields, holding the template defaults
+        '''
+        return [field.clone() for field in self.public], [field.clone() for field in self.private]
+
+    def names(self, public: bool = True) -> dict:
+        '''
+        Get the prototypes by field name.
+
+        Args:
+            public (bool, optional): Public or private fields. Defaults to True.
+
+        Returns:
+            dict: name -> prototype field
+        '''
+        return self.publicnames if public else self.privatenames
+
+
+
+class SchemaChange(Enum):
+    '''
+    Kind of change carried by a SchemaDelta
+    '''
+    ADDED = 0
+    REMOVED = 1
+    RENAMED = 2
+    OPTIONSCHANGED = 3
+
+class SchemaDelta():
+    '''
+    One change to the fields of a WorkItemDefinition, sent to items through templateChanged.
+    '''
+    __slots__ = ('change', 'name', 'public', 'field', 'newname')
+
+    def __init__(self, change: SchemaChange, name: str, public: bool = True, field: Field = None, newname: str = None) -> None:
+        '''
+        Args:
+            change (SchemaChange): Kind of change
+            name (str): Name of the field before the change
+            public (bool, optional): Public or private field. Defaults to True.
+            field (Field, optional): Prototype of the field after an ADDED or OPTIONSCHANGED change. Defaults to None.
+            newname (str, optional): Name of the field after a RENAMED change. Defaults to None.
+        '''
+        self.change = change
+        self.name = name
+        self.public = public
+        self.field = field
+        self.newname = newname
+
+    def __repr__(self) -> str:
+        return f'SchemaDelta({self.change.name}, {self.name!r}, public={self.public})'
+
+    def coalesce(deltas: list) -> list:
+        '''
+        Merge the changes of a batch.
+
+        A field added and removed in the same batch disappears, and only the last options change
+        of a field is kept. Nothing is merged across a rename of the same field.
+
+        Args:
+            deltas (list[SchemaDelta]): Changes, in order
+
+        Returns:
+            list[SchemaDelta]: Equivalent changes, in order
+        '''
+        merged = []
+        # (public, name) -> index in merged of the ADDED or OPTIONSCHANGED delta for the field
+        latest = {}
+        for delta in deltas:
+            key = (delta.public, delta.name)
+            index = latest.get(key)
+            if delta.change == SchemaChange.RENAMED:
+                latest.pop(key, None)
+                latest.pop((delta.public, delta.newname), None)
+            elif delta.change == SchemaChange.OPTIONSCHANGED and index != None:
+                previous = merged[index]
+                merged[index] = SchemaDelta(previous.change, delta.name, delta.public, delta.field)
+                continue
+            elif delta.change == SchemaChange.REMOVED and index != None:
+                previous = merged[index]
+                merged[index] = None
+                del latest[key]
+                if previous.change == SchemaChange.ADDED:
+                    continue
+            elif delta.change != SchemaChange.REMOVED:
+                latest[key] = len(merged)
+            merged.append(delta)
+        return [delta for delta in merged if delta != None]
@@ -0,0 +1,483 @@
+from array import array
+from bisect import bisect_left
+import os
+import re
+import sqlite3
+
+from BBData.Fields import FieldType, ShortText
+
+
+_tokenpattern = re.compile(r'\w+')
+_textfieldtypes = (FieldType.LINETEXT.value, FieldType.LONGTEXT.value)
+# Stored in PRAGMA user_version, stores written with another layout are dropped and rebuilt
+_storeversion = 2
+
+
+def tokenize(text: str) -> list:
+    '''
+    Split text into lowercase word tokens, in order.
+
+    Args:
+        text (str): Text
+
+    Returns:
+        list[str]: Tokens
+    '''
+    return _tokenpattern.findall(text.casefold())
+
+
+def textsOf(item) -> dict:
+    '''
+    Get the contents of the ShortText and LongText fields of an item.
+
+    Args:
+        item (CollectionElement): Item
+
+    Returns:
+        dict: field name -> text, public fields winning over private fields of the same name
+    '''
+    return {field.name: field.text() for field in item.private + item.public if isinstance(field, ShortText)}
+
+
+def textsFromDict(itemdict: dict) -> dict:
+    '''
+    Get the contents of the text fields of a serialized item, as textsOf does.
+
+    Args:
+        itemdict (dict): Item, in the format of toDict
+
+    Returns:
+        dict: field name -> text
+    '''
+    return {field['name']: field['text'] for field in itemdict.get('private', []) + itemdict.get('public', [])
+            if field.get('type') in _textfieldtypes}
+
+
+def positionsOf(text: str) -> dict:
+    '''
+    Get the positions of the tokens of text.
+
+    Args:
+        text (str): Text
+
+    Returns:
+        dict: token -> list of the indexes it is found at in tokenize(text)
+    '''
+    positions = {}
+    for index, token in enumerate(tokenize(text)):
+        found = positions.get(token)
+        if found is None:
+            positions[token] = [index]
+        else:
+            found.append(index)
+    return positions
+
+
+def _inSequence(positions: list) -> bool:
+    # Whether the tokens with these positions follow each other somewhere, positions of missing tokens are None
+    if any(found is None for found in positions):
+        return False
+    following = [set(found) for found in positions[1:]]
+    return any(all(start + offset in later for offset, later in enumerate(following, 1)) for start in positions[0])
+
+
+def _upperBound(term: str) -> str:
+    # Smallest string above every string starting with term
+    return term[:-1] + chr(ord(term[-1]) + 1)
+
+
+class SearchIndex():
+    '''
+    Inverted index of the words in the text fields of work items, for keyword, prefix and
+    phrase search without loading items.
+
+    Tokens map to the items holding them, with the positions of the token in each of their
+    fields, so queries intersect sets of uuids and phrases are checked on positions without
+    tokenizing texts again. Loaded items are followed through their attributeChanged delegate,
+    and reindexed by field when their texts change.
+
+    With a path, the postings are stored in a SQLite file along with the mtime/size of the file
+    each item was read from. Loading only reads the stats, and queries on stored items run
+    against the stored postings, so nothing is tokenized or read after reopening but the
+    items whose file changed since. Items indexed in this session are kept in memory, and win
+    over what is stored for them. Texts of unsaved edits are stored without a stat and are read
+    again on next use.
+    '''
+
+    def __init__(self, path: str = None, reader=None) -> None:
+        '''
+        Args:
+            path (str, optional): SQLite file to persist to. Defaults to None, which keeps the index in memory.
+            reader (Callable, optional): Called with a list of stale uuids before a search, returns
+                uuid -> (texts, stat), or None for items that are gone. Defaults to None.
+        '''
+        self.path = path
+        self.reader = reader
+        # uuid -> {field name: text} of the items indexed in memory, and uuid -> (mtime, size) of
+        # the file the texts came from, for these and for the stored items
+        self.texts = {}
+        self.stats = {}
+        # token -> {uuid: {field name: [positions]}}, of the items indexed in memory
+        self.postings = {}
+        # Uuids whose texts have to be read again before searching
+        self.stale = set()
+        # Sorted tokens for prefix queries, rebuilt on first use after tokens were added or dropped
+        self.__sorted = None
+        # Uuids to write to or delete from the store on save
+        self.__changed = set()
+        self.__removed = set()
+        # uuid -> Connection to the attributeChanged delegate of a followed item
+        self.__connections = {}
+        # Open connection to the store, see __open
+        self.__store = None
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self.stats
+
+    # Persistence
+    def __open(self):
+        if self.__store != None:
+            return self.__store
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        # The store is a cache that stats are checked against, it doesn't need to survive a crash
+        connection.execute('PRAGMA synchronous = OFF')
+        if connection.execute('PRAGMA user_version').fetchone()[0] != _storeversion:
+            # Empty, or written with another layout
+            connection.executescript(f'''
+                DROP TABLE IF EXISTS texts;
+                DROP TABLE IF EXISTS items;
+                DROP TABLE IF EXISTS postings;
+                CREATE TABLE items (
+                    id INTEGER PRIMARY KEY,
+                    uuid TEXT NOT NULL UNIQUE,
+                    mtime INTEGER,
+                    size INTEGER,
+                    tokens TEXT NOT NULL);
+                CREATE TABLE postings (
+                    token TEXT NOT NULL,
+                    item INTEGER NOT NULL,
+                    field TEXT NOT NULL,
+                    positions BLOB NOT NULL,
+                    PRIMARY KEY (token, item, field)) WITHOUT ROWID;
+                PRAGMA user_version = {_storeversion};''')
+        self.__store = connection
+        return connection
+
+    def close(self):
+        '''
+        Close the connection to the store. It is opened again when needed.
+        '''
+        if self.__store != None:
+            self.__store.close()
+            self.__store = None
+
+    def __select(self, query: str, parameters: tuple = ()) -> list:
+        if self.path == None or not os.path.exists(self.path):
+            return []
+        try:
+            return self.__open().execute(query, parameters).fetchall()
+        except sqlite3.DatabaseError:
+            # Only a cache, drop it so the next save rebuilds it, and read the items it answered for
+            self.close()
+            os.remove(self.path)
+            self.stale.update(uuid for uuid in self.stats if uuid not in self.texts)
+            return []
+
+    def load(self) -> dict:
+        '''
+        Read the stats of every stored item. Their postings are queried where they are stored.
+
+        Returns:
+            dict: uuid -> (mtime, size) stored for it, None for texts that were not saved
+        '''
+        rows = self.__select('SELECT uuid, mtime, size FROM items')
+        stored = {uuid: (mtime, size) if mtime != None else None for uuid, mtime, size in rows}
+        self.stats.update(stored)
+        return stored
+
+    def __isStored(self, uuid: str) -> bool:
+        # Answered by the store, items indexed in memory or removed since loading are newer
+        return uuid in self.stats and uuid not in self.texts
+
+    def save(self):
+        '''
+        Write the items indexed or removed since the last save.
+        '''
+        if self.path == None or (not self.__changed and not self.__removed):
+            return
+        # Items only saved to a new file since they were stored keep their postings
+        indexed = {uuid: {name: positionsOf(text) for name, text in self.texts[uuid].items()}
+                   for uuid in self.__changed if uuid in self.texts}
+        connection = self.__open()
+        with connection:
+            # Postings are keyed by token, the tokens of each item are listed with it to find them
+            for uuid in self.__removed.union(indexed):
+                row = connection.execute('SELECT id, tokens FROM items WHERE uuid = ?', (uuid,)).fetchone()
+                if row != None:
+                    connection.executemany('DELETE FROM postings WHERE token = ? AND item = ?', [(token, row[0]) for token in row[1].split()])
+            connection.executemany('DELETE FROM items WHERE uuid = ?', [(uuid,) for uuid in self.__removed])
+            connection.executemany('UPDATE items SET mtime = ?, size = ? WHERE uuid = ?',
+                                   [(self.stats[uuid] or (None, None)) + (uuid,) for uuid in self.__changed if uuid not in indexed and uuid in self.stats])
+            postings = []
+            for uuid, fields in indexed.items():
+                tokens = ' '.join(set().union(*fields.values()))
+                item = connection.execute('''INSERT INTO items (uuid, mtime, size, tokens) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (uuid) DO UPDATE SET mtime = excluded.mtime, size = excluded.size, tokens = excluded.tokens
+                    RETURNING id''', (uuid,) + (self.stats[uuid] or (None, None)) + (tokens,)).fetchone()[0]
+                postings += [(token, item, name, array('I', found).tobytes()) for name, positions in fields.items() for token, found in positions.items()]
+            # In key order, so the rows are appended to the tree rather than spread over it
+            postings.sort()
+            connection.executemany('INSERT INTO postings (token, item, field, positions) VALUES (?, ?, ?, ?)', postings)
+        self.__changed.clear()
+        self.__removed.clear()
+
+    # Indexing
+    def setTexts(self, uuid: str, texts: dict, stat: tuple = None):
+        '''
+        Index the texts of an item, replacing what was indexed for it. Only fields whose text
+        changed are tokenized again, and nothing is for a stored item whose file didn't change.
+
+        Args:
+            uuid (str): Item uuid
+            texts (dict): field name -> text
+            stat (tuple, optional): (mtime, size) of the file the texts were read from, None for
+                texts that are not saved. Defaults to None.
+        '''
+        self.stale.discard(uuid)
+        if stat != None and self.stats.get(uuid) == stat and self.__isStored(uuid):
+            return
+        if self.texts.get(uuid) == texts and self.stats.get(uuid) == stat:
+            return
+        self.__index(uuid, texts, stat)
+        self.__changed.add(uuid)
+        self.__removed.discard(uuid)
+
+    def __index(self, uuid: str, texts: dict, stat: tuple):
+        previous = self.texts.get(uuid, {})
+        for name, text in previous.items():
+            if texts.get(name) != text:
+                self.__drop(uuid, name, text)
+        for name, text in texts.items():
+            if previous.get(name) != text:
+                self.__add(uuid, name, text)
+        self.texts[uuid] = dict(texts)
+        self.stats[uuid] = stat
+
+    def __add(self, uuid: str, name: str, text: str):
+        postings = self.postings
+        for token, positions in positionsOf(text).items():
+            documents = postings.get(token)
+            if documents is None:
+                documents = postings[token] = {}
+                self.__sorted = None
+            fields = documents.get(uuid)
+            if fields is None:
+                documents[uuid] = {name: positions}
+            else:
+                fields[name] = positions
+
+    def __drop(self, uuid: str, name: str, text: str):
+        for token in set(tokenize(text)):
+            documents = self.postings.get(token)
+            fields = documents.get(uuid) if documents != None else None
+            if fields != None and name in fields:
+                del fields[name]
+                if not fields:
+                    del documents[uuid]
+                if not documents:
+                    del self.postings[token]
+                    self.__sorted = None
+
+    def remove(self, uuid: str):
+        '''
+        Stop indexing an item.
+
+        Args:
+            uuid (str): Item uuid
+        '''
+        self.unfollow(uuid)
+        self.stale.discard(uuid)
+        if uuid not in self.stats:
+            return
+        del self.stats[uuid]
+        for name, text in self.texts.pop(uuid, {}).items():
+            self.__drop(uuid, name, text)
+        self.__changed.discard(uuid)
+        self.__removed.add(uuid)
+
+    def markStale(self, uuid: str):
+        '''
+        Flag an item whose file changed, so its texts are read again before the next search.
+
+        Args:
+            uuid (str): Item uuid
+        '''
+        self.stale.add(uuid)
+
+    def markSaved(self, uuid: str, stat: tuple):
+        '''
+        Record that the indexed texts of an item were written to a file.
+
+        Args:
+            uuid (str): Item uuid
+            stat (tuple): (mtime, size) of the file
+        '''
+        if uuid in self.stats and self.stats[uuid] != stat:
+            self.stats[uuid] = stat
+            self.__changed.add(uuid)
+
+    # Loaded items
+    def follow(self, item, stat: tuple = None):
+        '''
+        Index a loaded item and reindex it whenever its attributeChanged delegate emits.
+
+        Args:
+            item (WorkItem): Item
+            stat (tuple, optional): (mtime, size) of the file the item was read from, None for an
+                item with unsaved changes. Defaults to None.
+        '''
+        self.setTexts(item.uuid, textsOf(item), stat)
+        if item.uuid not in self.__connections:
+            self.__connections[item.uuid] = item.attributeChanged.connect(self.onItemChanged)
+
+    def unfollow(self, uuid: str):
+        '''
+        Stop following an item, keeping what is indexed for it.
+
+        Args:
+            uuid (str): Item uuid
+        '''
+        connection = self.__connections.pop(uuid, None)
+        if connection != None:
+            connection.disconnect()
+
+    def onItemChanged(self, args: tuple):
+        # Subscribed to attributeChanged of every followed item, args[0] is the item
+        item = args[0]
+        texts = textsOf(item)
+        if texts != self.texts.get(item.uuid):
+            self.setTexts(item.uuid, texts, None)
+
+    # Queries
+    def __matching(self, term: str, prefix: bool) -> list:
+        # Postings of the term, or of every token starting with it
+        if not prefix:
+            return [self.postings[term]] if term in self.postings else []
+        if self.__sorted is None:
+            self.__sorted = sorted(self.postings)
+        index = bisect_left(self.__sorted, term)
+        matched = []
+        while index < len(self.__sorted) and self.__sorted[index].startswith(term):
+            matched.append(self.postings[self.__sorted[index]])
+            index += 1
+        return matched
+
+    def __uuids(self, postings: list, fields: list) -> set:
+        if fields == None:
+            return set().union(*postings)
+        return {uuid for documents in postings for uuid, names in documents.items() if any(name in fields for name in names)}
+
+    def __storedQuery(self, terms: list, prefix: bool, fields: list) -> tuple:
+        # SQL selecting the ids of the stored items holding every term, and its parameters
+        conditions = []
+        for term in terms:
+            condition, parameters = ('token >= ? AND token < ?', [term, _upperBound(term)]) if prefix else ('token = ?', [term])
+            if fields != None:
+                condition += f' AND field IN ({", ".join("?" * len(fields))})'
+                parameters += fields
+            conditions.append((condition, parameters))
+        if len(conditions) > 1:
+            # Start from the rarest term, and only look up the others in the items holding it
+            conditions.sort(key=lambda condition: self.__select(f'SELECT count(*) FROM postings WHERE {condition[0]}', condition[1])[0][0])
+        query = f'SELECT DISTINCT item FROM postings WHERE {conditions[0][0]}'
+        parameters = list(conditions[0][1])
+        for condition, others in conditions[1:]:
+            query += f' AND EXISTS (SELECT 1 FROM postings AS other WHERE other.item = postings.item AND {condition})'
+            parameters += others
+        return query, parameters
+
+    def __hasStored(self) -> bool:
+        # Texts are a subset of stats, any other stat is of a stored item
+        return len(self.stats) > len(self.texts) and self.path != None
+
+    def refresh(self):
+        '''
+        Read the texts of stale items again through the reader.
+        '''
+        if not self.stale or self.reader == None:
+            return
+        for uuid, read in self.reader(list(self.stale)).items():
+            if read == None:
+                self.remove(uuid)
+            else:
+                self.setTexts(uuid, read[0], read[1])
+        self.save()
+
+    def search(self, query: str, prefix: bool = False, fields: list = None) -> list:
+        '''
+        Find the items holding every word of a query, in any of their text fields.
+
+        Args:
+            query (str): Words
+            prefix (bool, optional): Match words starting with each query word. Defaults to False.
+            fields (list[str], optional): Only look in fields with these names. Defaults to None.
+
+        Returns:
+            list: Uuids of the matching items, in no particular order. Empty for a query without words.
+        '''
+        self.refresh()
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        # Plain words are looked up in their postings, only prefixes and field filters build sets
+        lookups = []
+        for term in terms:
+            postings = self.__matching(term, prefix)
+            lookups.append(postings[0] if len(postings) == 1 and fields == None else self.__uuids(postings, fields))
+        lookups.sort(key=len)
+        found = [uuid for uuid in lookups[0] if all(uuid in other for other in lookups[1:])]
+        if self.__hasStored():
+            query, parameters = self.__storedQuery(terms, prefix, fields)
+            found += [uuid for uuid, in self.__select(f'SELECT uuid FROM items WHERE id IN ({query})', parameters) if self.__isStored(uuid)]
+        return found
+
+    def phrase(self, text: str, fields: list = None) -> list:
+        '''
+        Find the items with a text field holding the words of text next to each other, in order.
+
+        Args:
+            text (str): Words
+            fields (list[str], optional): Only look in fields with these names. Defaults to None.
+
+        Returns:
+            list: Uuids of the matching items, in no particular order. Empty for a text without words.
+        '''
+        self.refresh()
+        terms = tokenize(text)
+        if not terms:
+            return []
+        distinct = list(dict.fromkeys(terms))
+        postings = {term: self.postings.get(term, {}) for term in distinct}
+        ordered = sorted(postings.values(), key=len)
+        candidates = self.__uuids(ordered[:1], fields).intersection(*ordered[1:])
+        found = []
+        for uuid in candidates:
+            for name, starts in postings[terms[0]][uuid].items():
+                if (fields == None or name in fields) and _inSequence([starts] + [postings[term][uuid].get(name) for term in terms[1:]]):
+                    found.append(uuid)
+                    break
+        if self.__hasStored():
+            # Positions of the terms in the fields of the stored items holding all of them
+            query, parameters = self.__storedQuery(distinct, False, fields)
+            rows = self.__select(f'SELECT uuid, field, token, positions FROM postings JOIN items ON items.id = postings.item '
+                                 f'WHERE token IN ({", ".join("?" * len(distinct))}) AND item IN ({query})', distinct + parameters)
+            positions = {}
+            for uuid, name, token, stored in rows:
+                positions.setdefault((uuid, name), {})[token] = array('I', stored)
+            matched = {uuid for (uuid, name), tokens in positions.items()
+                       if (fields == None or name in fields) and self.__isStored(uuid) and _inSequence([tokens.get(term) for term in terms])}
+            found += matched
+        return found
@@ -0,0 +1,191 @@
+import csv
+import json
+import os
+
+from BBData.Fields import Checks, Enum, Field, Radio, ShortText
+from BBData.Plugins import PluginBase, PluginRole
+
+
+def splitList(value) -> list:
+    '''
+    Read a list from a record value. CSV cells hold the items separated by semicolons.
+
+    Args:
+        value (Union[str, list]): Record value
+
+    Returns:
+        list: Items
+    '''
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(';') if item.strip()]
+    return list(value)
+
+
+def fieldUpdate(field: Field, value) -> dict:
+    '''
+    Convert a record value into the dict Field.update takes.
+
+    Text fields take the value as text, Enum fields take the name of the current item and Checks
+    and Radio fields take the checked option labels, as a list, a semicolon separated string or a
+    label -> state dict.
+
+    Args:
+        field (Field): Field to set
+        value: Record value
+
+    Raises:
+        ValueError: The value names an option the field doesn't have
+
+    Returns:
+        dict: Serialized values
+    '''
+    if isinstance(field, Enum):
+        if value not in field.options:
+            raise ValueError(f'{value!r} is not an option of {field.name}')
+        return {'currentItem': value}
+    if isinstance(field, Checks):
+        checked = [label for label, state in value.items() if state] if isinstance(value, dict) else splitList(value)
+        labels = list(field.options)
+        for label in checked:
+            if label not in labels:
+                raise ValueError(f'{label!r} is not an option of {field.name}')
+        if isinstance(field, Radio) and len(checked) > field.maxAllowed:
+            raise ValueError(f'{field.name} allows {field.maxAllowed} checked options, got {len(checked)}')
+        return {'options': {label: label in checked for label in labels}}
+    if isinstance(field, ShortText):
+        return {'text': str(value)}
+    return {}
+
+
+def fieldValue(fielddict: dict):
+    '''
+    Get the record value of a serialized field, the reverse of fieldUpdate.
+
+    Args:
+        fielddict (dict): Field, in the format of toDict
+
+    Returns:
+        Union[str, list, None]: Text, current item or checked option labels
+    '''
+    if 'currentItem' in fielddict:
+        return fielddict['currentItem']
+    if 'options' in fielddict:
+        return [label for label, state in fielddict['options'].items() if state]
+    return fielddict.get('text')
+
+
+def toRecord(itemdict: dict) -> dict:
+    '''
+    Flatten a serialized work item into a record, with one key per field. Public fields win over
+    private fields of the same name.
+
+    Args:
+        itemdict (dict): Work item, in the format of toDict
+
+    Returns:
+        dict: Record, as importWorkItems takes it back
+    '''
+    record = {
+        'uuid': itemdict['uuid'],
+        'name': itemdict['name'],
+        'template': itemdict.get('template'),
+        'upstream': list(itemdict.get('upstream', [])),
+        'downstream': list(itemdict.get('downstream', []))
+    }
+    for fielddict in itemdict.get('private', []) + itemdict.get('public', []):
+        record[fielddict['name']] = fieldValue(fielddict)
+    return record
+
+
+def readRecords(path: str):
+    '''
+    Stream the records of a CSV file, with a header row, or of a JSON Lines file.
+
+    Args:
+        path (str): .csv file, anything else is read as JSON Lines
+
+    Yields:
+        dict: Record
+    '''
+    if os.path.splitext(path)[1].lower() == '.csv':
+        # utf-8-sig drops the byte order mark spreadsheets write
+        with open(path, newline='', encoding='utf-8-sig') as infile:
+            yield from csv.DictReader(infile)
+        return
+    with open(path, encoding='utf-8') as infile:
+        for line in infile:
+            if line.strip():
+                yield json.loads(line)
+
+
+def writeRecords(records, path: str) -> int:
+    '''
+    Stream records to a JSON Lines file.
+
+    Args:
+        records (Iterable[dict]): Records
+        path (str): File to write
+
+    Returns:
+        int: Records written
+    '''
+    count = 0
+    with open(path, 'w', encoding='utf-8') as outfile:
+        for record in records:
+            outfile.write(json.dumps(record, ensure_ascii=False))
+            outfile.write('\n')
+            count += 1
+    return count
+
+
+def importFile(workspace, path: str, template, parent=None, chunksize: int = None) -> list:
+    '''
+    Create work items from a CSV or JSON Lines file, see Workspace.importWorkItems.
+
+    Args:
+        workspace (Workspace): Workspace to import into
+        path (str): File to read
+        template (WorkItemDefinition): Definition of the items
+        parent (Union[Document, Project], optional): Container of the items. Defaults to None.
+        chunksize (int, optional): Records per write. Defaults to config.importChunkSize.
+
+    Returns:
+        list: Uuids of the items, in file order
+    '''
+    return workspace.importWorkItems(readRecords(path), template, parent, chunksize)
+
+
+def exportFile(workspace, path: str, template=None) -> int:
+    '''
+    Write the work items of a workspace to a JSON Lines file, one record per item, without
+    loading the items that aren't loaded.
+
+    Args:
+        workspace (Workspace): Workspace to export
+        path (str): File to write
+        template (Union[WorkItemDefinition, str], optional): Only items of this definition. Defaults to None.
+
+    Returns:
+        int: Items written
+    '''
+    return writeRecords((toRecord(d) for d in workspace.iterWorkItemDicts(template)), path)
+
+
+class RecordImport(PluginBase):
+    name = 'Record Import'
+    description = 'Creates work items from the rows of a CSV or JSON Lines file.'
+    version = '1.0'
+    role = PluginRole.IMPORT
+
+    def run(self, workspace, path: str, template, parent=None, chunksize: int = None) -> list:
+        return importFile(workspace, path, template, parent, chunksize)
+
+
+class RecordExport(PluginBase):
+    name = 'Record Export'
+    description = 'Writes work items to a JSON Lines file, one record per item.'
+    version = '1.0'
+    role = PluginRole.EXPORT
+
+    def run(self, workspace, path: str, template=None) -> int:
+        return exportFile(workspace, path, template)
@@ -0,0 +1,321 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+import warnings
+
+from BBData import config
+
+
+class Watcher():
+    '''
+    Collects the paths of files changed under a workspace and hands them to a callback once no
+    change has been seen for debounce seconds, so a burst such as a git pull is refreshed at once.
+
+    Changes are looked for on a thread after start(), or on the caller's thread through poll().
+    The default callback is Workspace.refreshFiles. The workspace isn't locked, so the watching
+    thread only collects paths for it, and they are refreshed by calling poll() on the thread that
+    uses the workspace. A callback that is given is called on the watching thread.
+    '''
+
+    def __init__(self, workspace, debounce: float = None, callback=None) -> None:
+        '''
+        Args:
+            workspace (Workspace): Workspace to watch
+            debounce (float, optional): Seconds without changes before calling back. Defaults to config.watchDebounce.
+            callback (Callable, optional): Called with the list of changed paths, on the watching thread
+                once started. Defaults to workspace.refreshFiles, called from poll() only.
+        '''
+        self.workspace = workspace
+        self.debounce = debounce if debounce != None else config.watchDebounce
+        # Only a callback that was given is called from the watching thread
+        self.background = callback != None
+        self.callback = callback if callback != None else workspace.refreshFiles
+        self.extensions = tuple(cls.fileextension for cls in type(workspace).elementtypes)
+        self.lock = threading.Lock()
+        # Held while looking for changes, poll() may run while the thread does
+        self.checking = threading.Lock()
+        # Changed paths not handed over yet, in the order they were first seen
+        self.pending = {}
+        self.lastchange = None
+        self.thread = None
+        self.running = False
+
+    def isElementFile(self, path: str) -> bool:
+        return path.endswith(self.extensions)
+
+    def changed(self, path: str):
+        '''
+        Record a changed path and restart the quiet period.
+        '''
+        with self.lock:
+            self.pending[path] = None
+            self.lastchange = time.monotonic()
+
+    def check(self):
+        '''
+        Look for changes once and record them with changed.
+        '''
+        pass
+
+    def wait(self, timeout: float):
+        '''
+        Wait up to timeout seconds for changes to look at.
+        '''
+        time.sleep(timeout)
+
+    def flush(self, force: bool = False):
+        '''
+        Hand the pending paths to the callback if they have been quiet for debounce seconds.
+
+        Args:
+            force (bool, optional): Don't wait for the quiet period. Defaults to False.
+
+        Returns:
+            The callback's result, or None when nothing was handed over
+        '''
+        with self.lock:
+            if not self.pending or (not force and time.monotonic() - self.lastchange < self.debounce):
+                return None
+            paths = list(self.pending)
+            self.pending = {}
+        return self.callback(paths)
+
+    def poll(self, force: bool = False):
+        '''
+        Look for changes and flush them, on the caller's thread.
+
+        Args:
+            force (bool, optional): Don't wait for the quiet period. Defaults to False.
+
+        Returns:
+            The callback's result, or None when nothing was handed over
+        '''
+        with self.checking:
+            self.check()
+        return self.flush(force)
+
+    def start(self):
+        '''
+        Look for changes on a daemon thread until stop is called.
+        '''
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.__run, name='BBData watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''
+        Stop the thread. Pending changes are not handed over.
+        '''
+        self.running = False
+        if self.thread != None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def __run(self):
+        while self.running:
+            self.wait(self.debounce / 2)
+            try:
+                if self.background:
+                    self.poll()
+                else:
+                    with self.checking:
+                        self.check()
+            except Exception as error:
+                self.onError(error)
+
+    def onError(self, error: Exception):
+        '''
+        Called when looking for changes or the callback raises on the watching thread.
+        '''
+        warnings.warn(f'Warning: Watcher raised {error!r}.')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class PollingWatcher(Watcher):
+    '''
+    Finds changes without help from the system: files whose stat differs from the one recorded in
+    the workspace registry are changed or deleted, and directories whose mtime changed are listed
+    again to find new files.
+    '''
+
+    def __init__(self, workspace, debounce: float = None, callback=None, interval: float = None) -> None:
+        '''
+        Args:
+            workspace (Workspace): Workspace to watch
+            debounce (float, optional): Seconds without changes before calling back. Defaults to config.watchDebounce.
+            callback (Callable, optional): Called with the list of changed paths. Defaults to workspace.refreshFiles.
+            interval (float, optional): Seconds between checks on the thread. Defaults to config.watchPollInterval.
+        '''
+        super().__init__(workspace, debounce, callback)
+        self.interval = interval if interval != None else config.watchPollInterval
+        # directory -> (mtime, element files in it)
+        self.directories = {}
+        for directory, subdirectories, filenames in os.walk(workspace.root):
+            self.directories[directory] = (os.stat(directory).st_mtime_ns, self.__files(directory, filenames))
+
+    def __files(self, directory: str, filenames: list) -> set:
+        return {os.path.join(directory, name) for name in filenames if self.isElementFile(name)}
+
+    def wait(self, timeout: float):
+        time.sleep(self.interval)
+
+    def check(self):
+        for uuid, entry in self.workspace.getElementEntries().items():
+            path = self.workspace.getFullPath(entry['path'])
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                self.changed(os.path.normpath(path))
+                continue
+            if (stat.st_mtime_ns, stat.st_size) != (entry['mtime'], entry['size']):
+                self.changed(os.path.normpath(path))
+        for directory, (mtime, files) in list(self.directories.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                del self.directories[directory]
+                for path in files:
+                    self.changed(path)
+                continue
+            if current == mtime:
+                continue
+            names = os.listdir(directory)
+            listed = self.__files(directory, names)
+            for path in listed.symmetric_difference(files):
+                self.changed(path)
+            self.directories[directory] = (current, listed)
+            for name in names:
+                path = os.path.join(directory, name)
+                if path not in self.directories and os.path.isdir(path):
+                    for subdirectory, subdirectories, filenames in os.walk(path):
+                        found = self.__files(subdirectory, filenames)
+                        self.directories[subdirectory] = (os.stat(subdirectory).st_mtime_ns, found)
+                        for file in found:
+                            self.changed(file)
+
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+_eventheader = struct.Struct('iIII')
+_libc = None
+
+def _loadLibc():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            _libc = libc if hasattr(libc, 'inotify_init1') else False
+        except OSError:
+            _libc = False
+    return _libc
+
+
+class InotifyWatcher(Watcher):
+    '''
+    Finds changes through Linux inotify, with a watch on every directory under the workspace root.
+    Only paths named by events are looked at. If the kernel drops events, every element file is
+    handed over and the stat check of refreshFiles sorts out what changed.
+    '''
+    mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def available() -> bool:
+        '''
+        Check whether inotify can be used here.
+        '''
+        return bool(_loadLibc())
+
+    def __init__(self, workspace, debounce: float = None, callback=None) -> None:
+        super().__init__(workspace, debounce, callback)
+        libc = _loadLibc()
+        if not libc:
+            raise OSError('inotify is not available')
+        self.libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        # watch descriptor -> directory
+        self.directories = {}
+        self.__watchTree(workspace.root, False)
+
+    def __watchTree(self, root: str, report: bool):
+        # Files can be created in a new directory before it is watched, so report what is there
+        for directory, subdirectories, filenames in os.walk(root):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.mask)
+            if wd >= 0:
+                self.directories[wd] = directory
+            if report:
+                for name in filenames:
+                    if self.isElementFile(name):
+                        self.changed(os.path.join(directory, name))
+
+    def wait(self, timeout: float):
+        if self.fd >= 0:
+            select.select([self.fd], [], [], timeout)
+
+    def check(self):
+        while self.fd >= 0:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = _eventheader.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _eventheader.size:offset + _eventheader.size + length].rstrip(b'\0'))
+                offset += _eventheader.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.__rescan()
+                    continue
+                if mask & IN_IGNORED:
+                    self.directories.pop(wd, None)
+                    continue
+                directory = self.directories.get(wd)
+                if directory == None:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self.__watchTree(path, True)
+                    elif mask & IN_MOVED_FROM:
+                        # Files moved away with their directory get no events of their own
+                        self.__reportBelow(path)
+                elif self.isElementFile(name):
+                    self.changed(path)
+
+    def __reportBelow(self, directory: str):
+        prefix = os.path.normpath(directory) + os.sep
+        for entry in self.workspace.getElementEntries().values():
+            path = os.path.normpath(self.workspace.getFullPath(entry['path']))
+            if path.startswith(prefix):
+                self.changed(path)
+
+    def __rescan(self):
+        for entry in self.workspace.getElementEntries().values():
+            self.changed(os.path.normpath(self.workspace.getFullPath(entry['path'])))
+        self.__watchTree(self.workspace.root, True)
+
+    def stop(self):
+        super().stop()
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -1 +1,37 @@
-fileprefix = '.bb'
\ No newline at end of file
+fileprefix = '.bb'
+
+# Workspace discovery
+discoveryWorkers = None # None lets the pool pick a size from the core count
+discoveryExecutor = 'auto' # 'thread', 'process', or 'auto' for processes on large workspaces with several cores
+discoveryProcessThreshold = 2000 # Files of one type before 'auto' parses them on processes
+
+# Persistent workspace index, kept at the workspace root
+useWorkspaceIndex = True
+indexfilename = f'{fileprefix}index'
+
+# Saving
+writerWorkers = 8 # Upper bound on concurrent file writes
+fsync = False # Flush every write to disk before it is moved into place
+codec = 'json' # 'json' or 'binary', files written by either are always readable
+shapesfilename = f'{fileprefix}shapes' # Shapes shared by the binary files of a workspace, kept at its root
+
+# Full-text search index, kept at the workspace root
+useSearchIndex = True # Build the index on discovery and store its postings
+searchfilename = f'{fileprefix}search'
+
+# Loaded work items, the least recently used clean items are unloaded past either limit
+hydrationCacheSize = None # Items, None for no limit
+hydrationCacheBytes = None # Total file size of the items, None for no limit
+
+# Packed storage, kept at the workspace root
+archivefilename = f'{fileprefix}pack'
+
+# Delegates with a dispatcher
+dispatchQueueSize = 1024 # Pending emits before emitting blocks, or runs inline on the dispatch thread
+
+# Watching workspaces for changes made by other programs
+watchDebounce = 0.2 # Seconds without changes before changed files are refreshed
+watchPollInterval = 1.0 # Seconds between checks when inotify is unavailable
+
+# Bulk import and export
+importChunkSize = 1000 # Items written, or read, at once
@@ -1,20 +1,31 @@
-from datetime import datetime
-import json
+import calendar
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import os
+import re
+import time
+
+from BBData import config
+from BBData.Codecs import BinaryCodec, detectCodec, getCodec
 
 def first(iterable, default=None):
   for item in iterable:
     return item
   return default
   
-def getDuration(then, now = datetime.now(), interval = "default"):
+def getDuration(then, now = None, interval = "default"):
 
     # Returns a duration as specified by variable interval
     # Functions, except totalDuration, returns [quotient, remainder]
+    # then and now are datetimes, or timestamps in any format parseTime reads. now defaults to the current time.
+
+    if now == None:
+      now = datetime.now() if isinstance(then, datetime) else currentTime()
+    if isinstance(then, datetime) and isinstance(now, datetime):
+      duration_in_s = (now - then).total_seconds() # For build-in functions
+    else:
+      duration_in_s = (parseTime(now) - parseTime(then)) / 1e9
 
-    duration = now - then # For build-in functions
-    duration_in_s = duration.total_seconds() 
-    
     def years():
       return divmod(duration_in_s, 31536000) # Seconds in a year=31536000.
 
@@ -50,14 +61,83 @@ def getDuration(then, now = datetime.now(), interval = "default"):
         'default': totalDuration()
     }
 
+# Wall clock at the monotonic origin. Timestamps taken in a process never go backwards when the
+# wall clock is set, and stay off by whatever adjustment was made since import.
+_clockoffset = time.time_ns() - time.monotonic_ns()
+
 def currentTime():
     '''
     Generate the current time
 
     Returns:
-        str: Current Time
+        int: Current Time, in nanoseconds since the epoch
     '''
-    return datetime.now().strftime("%m/%d/%y %H:%M:%S")
+    return time.monotonic_ns() + _clockoffset
+
+_isopattern = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,9}))?(Z|[+-]\d{2}:\d{2})?$')
+_legacyformat = "%m/%d/%y %H:%M:%S"
+# Whole seconds of recently read formatTime strings, elements saved together share them
+_utcseconds = {}
+
+def formatTime(timestamp):
+  '''
+  Format a timestamp as an ISO-8601 UTC string with nanoseconds, as elements are serialized.
+
+  Args:
+      timestamp (int): Nanoseconds since the epoch
+
+  Returns:
+      str: e.g. 2026-10-18T12:00:00.000000000Z
+  '''
+  seconds, nanoseconds = divmod(timestamp, 1000000000)
+  return f'{time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))}.{nanoseconds:09d}Z'
+
+def parseTime(value):
+  '''
+  Read a timestamp in any format elements have been serialized with.
+
+  Args:
+      value (Union[int, str, datetime]): Nanoseconds since the epoch, an ISO-8601 string, or a
+          %m/%d/%y %H:%M:%S string as older files hold, which is read as local time. ISO-8601
+          strings and datetimes without an offset are read as local time too.
+
+  Raises:
+      ValueError: The string is in neither format
+
+  Returns:
+      int: Nanoseconds since the epoch, None for None
+  '''
+  if value == None or isinstance(value, int):
+    return value
+  if isinstance(value, datetime):
+    return _datetimeTime(value, 0)
+  if len(value) == 30 and value[19] == '.' and value[29] == 'Z':
+    # Written by formatTime
+    seconds = _utcseconds.get(value[:19])
+    if seconds == None:
+      if len(_utcseconds) >= 4096:
+        _utcseconds.clear()
+      seconds = _utcseconds[value[:19]] = calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                                          int(value[11:13]), int(value[14:16]), int(value[17:19])))
+    return seconds * 1000000000 + int(value[20:29])
+  match = _isopattern.match(value)
+  if match == None:
+    return _datetimeTime(datetime.strptime(value, _legacyformat), 0)
+  year, month, day, hour, minute, second, fraction, offset = match.groups()
+  nanoseconds = int(fraction.ljust(9, '0')) if fraction else 0
+  moment = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second))
+  if offset == None:
+    return _datetimeTime(moment, nanoseconds)
+  if offset == 'Z':
+    zone = timezone.utc
+  else:
+    zone = timezone((-1 if offset[0] == '-' else 1) * timedelta(hours=int(offset[1:3]), minutes=int(offset[4:6])))
+  return _datetimeTime(moment.replace(tzinfo=zone), nanoseconds)
+
+def _datetimeTime(moment, nanoseconds):
+  # Whole seconds through datetime, so no precision is lost to floats
+  seconds = int(moment.replace(microsecond=0).timestamp())
+  return seconds * 1000000000 + moment.microsecond * 1000 + nanoseconds
 
 def getFilesWithExtension(paths : list, extension : str = '.json', recursive=False):
   def listdirs(rootdir):
@@ -77,10 +157,233 @@ def getFilesWithExtension(paths : list, extension : str = '.json', recursive=Fal
           files.append(os.path.join(path, file))
   return files
 
+def getFilesByExtension(root : str, extensions : list, stat=False):
+  '''
+  Walk a directory tree once and bucket files by extension.
+
+  Directories are visited in the same order as getFilesWithExtension with recursive=True, so
+  the buckets hold the same paths in the same order as one call per extension would.
+
+  Args:
+      root (str): Directory to walk
+      extensions (list): Extensions to collect
+      stat (bool, optional): Collect (path, os.stat_result) pairs instead of paths. Defaults to False.
+
+  Returns:
+      dict: extension -> list of file paths
+  '''
+  buckets = {extension : [] for extension in extensions}
+  def scan(directory):
+    subdirectories = []
+    with os.scandir(directory) as entries:
+      for entry in entries:
+        if entry.is_dir():
+          subdirectories.append(entry.path)
+          continue
+        for extension in extensions:
+          if entry.name.endswith(extension):
+            buckets[extension].append((entry.path, entry.stat()) if stat else entry.path)
+            break
+    # Descending once the directory is closed keeps one handle open and visits them in the same order
+    for subdirectory in subdirectories:
+      scan(subdirectory)
+  scan(root)
+  return buckets
+
+def loadJsonLikeMany(paths : list, workers : int = None, executor : str = None):
+  '''
+  Load many json-like files on a pool.
+
+  Args:
+      paths (list): Files to load
+      workers (int, optional): Pool size. Defaults to config.discoveryWorkers.
+      executor (str, optional): 'thread', 'process' or 'auto'. Defaults to config.discoveryExecutor.
+
+  Returns:
+      list: Loaded dicts, in the same order as paths
+  '''
+  return list(iterJsonLikeMany(paths, workers, executor))
+
+def iterJsonLikeMany(paths : list, workers : int = None, executor : str = None):
+  '''
+  Load many json-like files on a pool, yielding each one in order as soon as it is loaded, so the
+  caller builds elements from the first files while the pool parses the rest.
+
+  Parsing holds the GIL, so only processes parse on several cores at once. 'auto' uses processes
+  from config.discoveryProcessThreshold files up on machines with more than one core, where
+  starting them pays off, and threads otherwise, which still overlap the reads.
+
+  Args:
+      paths (list): Files to load
+      workers (int, optional): Pool size. Defaults to config.discoveryWorkers.
+      executor (str, optional): 'thread', 'process' or 'auto'. Defaults to config.discoveryExecutor.
+
+  Yields:
+      dict: Loaded dicts, in the same order as paths
+  '''
+  workers = workers if workers != None else config.discoveryWorkers
+  executor = executor if executor != None else config.discoveryExecutor
+  cores = os.cpu_count() or 1
+  if executor == 'auto':
+    executor = 'process' if len(paths) >= config.discoveryProcessThreshold and cores > 1 and workers != 1 else 'thread'
+  if len(paths) < 2 or workers == 1:
+    yield from map(loadJsonLike, paths)
+    return
+  if executor == 'process':
+    # Processes start without the shapes of binary files, so they are given the ones known here
+    p = ProcessPoolExecutor(max_workers=workers, initializer=_registerShapes, initargs=(getCodec(BinaryCodec.name).descriptions(),))
+  else:
+    p = ThreadPoolExecutor(max_workers=workers)
+  with p:
+    yield from p.map(loadJsonLike, paths, chunksize=max(1, len(paths) // ((workers or cores) * 4)))
+
+_uuidpattern = re.compile(rb'"uuid"\s*:\s*"([^"]+)"')
+
+def sniffUUID(path, headersize = 256):
+  '''
+  Read the uuid of a serialized element without parsing the whole file.
+
+  Elements serialize their uuid first, so it is found in the first few bytes.
+  Falls back to a full load when the header does not contain it.
+
+  Args:
+      path (str): File to read
+      headersize (int, optional): Bytes to read before falling back. Defaults to 256.
+
+  Returns:
+      str: uuid
+  '''
+  with open(path, 'rb') as infile:
+    header = infile.read(headersize)
+    codec = detectCodec(header)
+    if isinstance(codec, BinaryCodec):
+      uuid = codec.peekUUID(infile)
+      if uuid != None:
+        return uuid
+    else:
+      match = _uuidpattern.search(header)
+      if match:
+        return match.group(1).decode('utf-8')
+  return loadJsonLike(path)['uuid']
+
 def loadJsonLike(path):
-  with open(path) as json_file:
-    return json.load(json_file)
+  '''
+  Load a serialized file written by any codec.
+
+  Args:
+      path (str): File to read
+
+  Returns:
+      dict: Content
+  '''
+  with open(path, 'rb') as infile:
+    data = infile.read()
+  return detectCodec(data).decode(data)
+
+def saveJsonLike(dict, path, fsync : bool = None, codec : str = None):
+  '''
+  Atomically write a json-like file.
+
+  The file is written to a temporary file in the same directory and moved over path, so
+  readers see either the old or the new content, never a truncated file.
+
+  Args:
+      dict (dict): Content to write
+      path (str): Destination
+      fsync (bool, optional): Flush the file and its directory to disk. Defaults to config.fsync.
+      codec (str, optional): Codec name. Defaults to config.codec.
+  '''
+  saveJsonLikeMany([(dict, path)], fsync, codec=codec)
+
+def saveJsonLikeMany(items : list, fsync : bool = None, workers : int = None, codec : str = None, table = None):
+  '''
+  Atomically write many json-like files.
+
+  Files are grouped by directory. Each group is written to temporary files, moved into place,
+  and the directory is synced once for the whole group.
+
+  Args:
+      items (list): (dict, path) pairs. Content that is already encoded is given as bytes and written as it is.
+      fsync (bool, optional): Flush files and directories to disk. Defaults to config.fsync.
+      workers (int, optional): Writer pool size. Defaults to config.writerWorkers.
+      codec (str, optional): Codec name. Defaults to config.codec.
+      table (ShapeTable, optional): Table the binary codec shares shapes through, saved before the
+          files are moved into place. Defaults to None, which writes self-contained files.
+  '''
+  codec = getCodec(codec)
+  fsync = fsync if fsync != None else config.fsync
+  workers = workers if workers != None else config.writerWorkers
+  directories = {}
+  for content, path in items:
+    directories.setdefault(os.path.dirname(os.path.abspath(path)), []).append((content, path))
+
+  def writegroup(directory, group):
+    os.makedirs(directory, exist_ok=True)
+    staged = []
+    try:
+      for content, path in group:
+        data = content if isinstance(content, (bytes, memoryview)) else codec.encode(content, table)
+        staged.append((_writeTemporary(data, path, fsync), path))
+      # Files only carry the id of their shape, so the table holds it before they are in place
+      if table != None:
+        table.save(fsync)
+      for temporary, path in staged:
+        os.replace(temporary, path)
+    except BaseException:
+      for temporary, path in staged:
+        if os.path.exists(temporary):
+          os.remove(temporary)
+      raise
+    if fsync:
+      _syncDirectory(directory)
+
+  if len(directories) < 2 or workers == 1:
+    [writegroup(directory, group) for directory, group in directories.items()]
+    return
+  with ThreadPoolExecutor(max_workers=workers) as pool:
+    list(pool.map(lambda args: writegroup(*args), directories.items()))
+
+def _registerShapes(descriptions):
+  codec = getCodec(BinaryCodec.name)
+  for description in descriptions:
+    codec.register(description)
+
+def _createTemporary(path):
+  # Hidden and suffixed so discovery never picks it up. Created like open() creates files, so new
+  # files get 0666 less the umask, where mkstemp would make them 0600.
+  directory, name = os.path.split(os.path.abspath(path))
+  flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+  while True:
+    temporary = os.path.join(directory, f'.{name}.{os.urandom(6).hex()}.tmp')
+    try:
+      return os.open(temporary, flags, 0o666), temporary
+    except FileExistsError:
+      continue
+
+def _writeTemporary(data, path, fsync):
+  handle, temporary = _createTemporary(path)
+  try:
+    with os.fdopen(handle, "wb") as outfile:
+      try:
+        # The replaced file's mode is kept
+        os.chmod(temporary, os.stat(path).st_mode & 0o7777)
+      except FileNotFoundError:
+        pass
+      outfile.write(data)
+      if fsync:
+        outfile.flush()
+        os.fsync(outfile.fileno())
+  except BaseException:
+    os.remove(temporary)
+    raise
+  return temporary
 
-def saveJsonLike(dict, path):
-  with open(path, "w") as outfile:
-    json.dump(dict, outfile)
\ No newline at end of file
+def _syncDirectory(directory):
+  # Persists the renames. Directories can't be opened for syncing on Windows.
+  if os.name == 'nt':
+    return
+  handle = os.open(directory, os.O_RDONLY)
+  try:
+    os.fsync(handle)
+  finally:
+    os.close(handle)
\ No newline at end of file
@@ -0,0 +1,59 @@
+'''
+Traverses every work item of a lazily opened workspace, as a report would, with and without a
+limit on loaded items, and times repeated reads of a small hot set under the same limit.
+
+Usage: python Benchmarks/benchmark_cache.py [items] [limit]
+
+Files are written once into a temporary directory by benchmark_watch.build.
+'''
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData import config
+from BBData.BBData import Scope
+from benchmark_watch import build
+
+
+def traverse(root: str, limit: int):
+    config.hydrationCacheSize = limit
+    workspace = Scope.setCurrentWorkspaceFromDirectory(root, lazy=True)
+    uuids = [uuid for uuid, entry in workspace.getElementEntries().items() if entry['kind'] == '.bbitem']
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    characters = 0
+    for uuid in uuids:
+        characters += len(workspace.getWorkItemByUUID(uuid).getPublicField('Requirement').text())
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'traverse, limit {limit}: {elapsed:8.3f} s, peak {peak / 2 ** 20:7.1f} MiB, '
+          f'still allocated {current / 2 ** 20:7.1f} MiB, {workspace.cache.counters()}')
+
+    random.seed(1)
+    hot = random.sample(uuids, min(len(uuids), (limit or 1000) // 2))
+    workspace.cache.resetCounters()
+    start = time.perf_counter()
+    for i in range(20):
+        for uuid in hot:
+            workspace.getWorkItemByUUID(uuid)
+    elapsed = time.perf_counter() - start
+    counters = workspace.cache.counters()
+    print(f'hot set of {len(hot)}, 20 rounds: {elapsed / (20 * len(hot)) * 1e6:6.2f} us/get, hit ratio {counters["hitratio"]:.3f}')
+
+
+def run(items: int, limit: int):
+    with tempfile.TemporaryDirectory() as root:
+        build(root, items)
+        traverse(root, None)
+        traverse(root, limit)
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
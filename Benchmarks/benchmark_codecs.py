@@ -0,0 +1,79 @@
+'''
+Compares the json and binary codecs on synthetic work item dicts, with the binary codec writing
+self-contained files and files sharing their shapes through a ShapeTable, as workspaces do. The
+table is reported on its own, it is written once per workspace.
+
+Usage: python Benchmarks/benchmark_codecs.py [items]
+'''
+import gc
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.Codecs import ShapeTable, getCodec
+from BBData.Fields import Checks, Enum, LongText, ShortText
+
+
+def synthesize(items: int) -> list:
+    assignees = ['Electrical Engineer', 'Software Engineer', 'Mechanical Engineer']
+    fields = [
+        LongText('Requirement', 'The regulator output shall have an input capacitance no larger than 10 uF.'),
+        LongText('Rationale', 'Keeps inrush current within the limits of the upstream supply.'),
+        ShortText('Production Cost Estimate', '12.50'),
+        Enum(assignees, assignees[0], 'Assigned To'),
+        Checks({'Reviewed': True, 'Approved': False, 'Verified': False}, 'Status')
+    ]
+    template = str(uuid.uuid4())
+    contents = []
+    for i in range(items):
+        # Items of one definition differ in choices, check states and link counts
+        fields[3].setCurrent(assignees[i % len(assignees)])
+        fields[4].options['Approved'] = i % 2 == 0
+        contents.append({
+            'uuid': str(uuid.uuid4()),
+            'public': [field.toDict() for field in fields],
+            'private': [],
+            'createDate': '10/18/26 12:00:00',
+            'updateDate': '10/18/26 12:00:00',
+            'name': f'Requirement {i}',
+            'downstream': [str(uuid.uuid4()) for link in range(i % 4)],
+            'upstream': [str(uuid.uuid4())],
+            'template': template
+        })
+    return contents
+
+
+def timed(function, values: list) -> tuple:
+    # Best of three, with collections paused: both codecs allocate the same containers, so
+    # collections only add noise that depends on run order
+    best = None
+    for attempt in range(3):
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        results = [function(value) for value in values]
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        best = elapsed if best == None else min(best, elapsed)
+    return results, best
+
+
+def run(items: int):
+    contents = synthesize(items)
+    with tempfile.TemporaryDirectory() as root:
+        table = ShapeTable(os.path.join(root, 'shapes'))
+        for name, label, shapes in [('json', 'json', None), ('binary', 'binary', None), ('binary', 'table', table)]:
+            codec = getCodec(name)
+            encoded, encodetime = timed(lambda content: codec.encode(content, shapes), contents)
+            decoded, decodetime = timed(codec.decode, encoded)
+            assert decoded == contents
+            size = sum(len(data) for data in encoded)
+            print(f'{label:>6}: {size / items:7.1f} bytes/item, encode {encodetime / items * 1e6:6.1f} us/item, decode {decodetime / items * 1e6:6.1f} us/item')
+        table.save()
+        print(f'shape table: {os.path.getsize(table.path)} bytes')
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,45 @@
+'''
+Times Delegate.emit and checks that dropped items stop listening to their definition.
+
+Usage: python Benchmarks/benchmark_delegate.py [emits]
+'''
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem
+from BBData.Delegate import Delegate
+from benchmark_memory import definition
+
+
+class Listener():
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def receive(self, args):
+        self.count += 1
+
+
+def run(emits: int):
+    delegate = Delegate()
+    listeners = [Listener() for i in range(10)]
+    for listener in listeners:
+        delegate.connect(listener.receive)
+    start = time.perf_counter()
+    for i in range(emits):
+        delegate.emit(delegate, i)
+    elapsed = time.perf_counter() - start
+    print(f'{emits} emits to 10 methods: {elapsed / emits * 1e6:6.2f} us/emit')
+
+    template = definition()
+    items = [WorkItem(name=f'Requirement {i}', template=template) for i in range(10000)]
+    del items
+    gc.collect()
+    print(f'10000 dropped items: {len(template.templateChanged.subscribers)} subscribers left on the definition')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
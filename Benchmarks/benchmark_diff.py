@@ -0,0 +1,31 @@
+'''
+Times diffElements over pairs of work items, one in ten of them edited.
+
+Usage: python Benchmarks/benchmark_diff.py [pairs]
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem
+from BBData.Diff import diffElements
+from benchmark_memory import definition
+
+
+def run(pairs: int):
+    template = definition()
+    old = [WorkItem(name=f'Requirement {i}', template=template) for i in range(pairs)]
+    new = [WorkItem(name=f'Requirement {i}', template=template) for i in range(pairs)]
+    for a, b in zip(old, new):
+        b.uuid, b.createDate, b.updateDate = a.uuid, a.createDate, a.updateDate
+    for b in new[::10]:
+        b.public[0].setText('Edited')
+    start = time.perf_counter()
+    patches = [diffElements(a, b) for a, b in zip(old, new)]
+    elapsed = time.perf_counter() - start
+    print(f'{pairs} pairs: {elapsed / pairs * 1e6:6.1f} us/pair, {sum(map(len, patches))} changes')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
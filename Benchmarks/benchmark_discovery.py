@@ -0,0 +1,48 @@
+'''
+Times opening a workspace eagerly, parsing files serially, and on pools of threads and processes
+of two workers up to the core count, to show how discovery scales with cores.
+
+Usage: python Benchmarks/benchmark_discovery.py [items]
+
+Files are written once into a temporary directory by benchmark_watch.build.
+'''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData import config
+from BBData.BBData import Scope
+from benchmark_watch import build
+
+
+def timed(root: str, executor: str, workers: int) -> float:
+    config.discoveryExecutor, config.discoveryWorkers = executor, workers
+    best = None
+    for attempt in range(3):
+        start = time.perf_counter()
+        Scope.setCurrentWorkspaceFromDirectory(root)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+
+def run(items: int):
+    config.useWorkspaceIndex = False
+    config.useSearchIndex = False
+    cores = os.cpu_count() or 1
+    counts = sorted({2, 4, 8, 16, cores} & set(range(2, max(cores, 2) + 1)))
+    with tempfile.TemporaryDirectory() as root:
+        build(root, items)
+        serial = timed(root, 'thread', 1)
+        print(f'{items} items on {cores} cores, best of 3')
+        print(f'serial:        {serial:7.3f} s')
+        for executor in ['thread', 'process']:
+            for workers in counts:
+                elapsed = timed(root, executor, workers)
+                print(f'{executor:7} x {workers:2}:  {elapsed:7.3f} s  {serial / elapsed:5.2f}x')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
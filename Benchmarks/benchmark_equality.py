@@ -0,0 +1,40 @@
+'''
+Times equality of work items and set membership, cold and with cached hashes.
+
+Usage: python Benchmarks/benchmark_equality.py [pairs]
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem
+from benchmark_memory import definition
+
+
+def run(pairs: int):
+    template = definition()
+    old = [WorkItem(name=f'Requirement {i}', template=template) for i in range(pairs)]
+    new = [WorkItem(name=f'Requirement {i}', template=template) for i in range(pairs)]
+    for a, b in zip(old, new):
+        b.uuid, b.createDate, b.updateDate = a.uuid, a.createDate, a.updateDate
+    for b in new[::10]:
+        b.public[0].setText('Edited')
+    for label in ('cold', 'warm'):
+        start = time.perf_counter()
+        equal = sum(a == b for a, b in zip(old, new))
+        elapsed = time.perf_counter() - start
+        print(f'{pairs} pairs {label}: {elapsed / pairs * 1e6:6.2f} us/compare, {equal} equal')
+    try:
+        members = set(old)
+    except TypeError:
+        print('elements are unhashable')
+        return
+    start = time.perf_counter()
+    found = sum(b in members for b in new)
+    elapsed = time.perf_counter() - start
+    print(f'{pairs} set lookups: {elapsed / pairs * 1e6:6.2f} us/lookup, {found} found')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
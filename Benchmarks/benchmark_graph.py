@@ -0,0 +1,78 @@
+'''
+Times TraceGraph over a requirements tree: features, requirements under them and test cases
+under most requirements. Compares coverage against a breadth-first search per requirement over
+uuid lists, which is what callers had to write before.
+
+Usage: python Benchmarks/benchmark_graph.py [items]
+'''
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.Graph import TraceGraph
+
+
+def tree(items: int):
+    random.seed(0)
+    features = [f'feature {i}' for i in range(items // 100)]
+    requirements = [f'requirement {i}' for i in range(items * 3 // 10)]
+    tests = [f'test {i}' for i in range(items - len(features) - len(requirements))]
+    nodes = {uuid: 'feature' for uuid in features}
+    nodes.update({uuid: 'requirement' for uuid in requirements})
+    nodes.update({uuid: 'test' for uuid in tests})
+    links = [(random.choice(features), requirement) for requirement in requirements]
+    # Leave one requirement in ten without tests
+    tested = [requirement for requirement in requirements if random.random() > 0.1]
+    links += [(random.choice(tested), test) for test in tests]
+    return nodes, links
+
+
+def naiveCoverage(nodes: dict, links: list):
+    downstream = {}
+    for source, target in links:
+        downstream.setdefault(source, []).append(target)
+    covered = []
+    for uuid, template in nodes.items():
+        if template != 'requirement':
+            continue
+        seen, queue = set(), list(downstream.get(uuid, []))
+        while queue:
+            current = queue.pop(0)
+            if current in seen:
+                continue
+            seen.add(current)
+            if nodes[current] == 'test':
+                covered.append(uuid)
+                break
+            queue.extend(downstream.get(current, []))
+    return covered
+
+
+def run(items: int):
+    nodes, links = tree(items)
+    start = time.perf_counter()
+    graph = TraceGraph(nodes, links)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    coverage = graph.coverage('requirement', 'test')
+    elapsed = time.perf_counter() - start
+    print(f'{items} items, {graph.linkCount} links: build {built:.3f} s, coverage {elapsed:.3f} s, {coverage}')
+    start = time.perf_counter()
+    impact = graph.impact([uuid for uuid, template in nodes.items() if template == 'feature'])
+    elapsed = time.perf_counter() - start
+    print(f'impact of {len(impact)} features: {elapsed:.3f} s')
+    start = time.perf_counter()
+    cycles = graph.cycles()
+    orphans = graph.orphans('test')
+    elapsed = time.perf_counter() - start
+    print(f'cycles and orphans: {elapsed:.3f} s, {len(cycles)} cycles, {len(orphans)} orphan tests')
+    start = time.perf_counter()
+    covered = naiveCoverage(nodes, links)
+    elapsed = time.perf_counter() - start
+    print(f'search per requirement: {elapsed:.3f} s, {len(covered)} covered')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,76 @@
+'''
+Times creating work items from records through Workspace.importWorkItems against one
+createNewWorkItem call and field edits per record, and streaming them out again as JSON Lines.
+
+Usage: python Benchmarks/benchmark_import.py [records]
+
+The per-item path is only run on the first 2000 records, and writes each item twice, once when
+it is created and once after its fields are set, as code using it has to. Peak memory is traced
+in separate runs on a tenth and on all of the records: only the registry entries of the items
+should grow with the record count.
+'''
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import Scope
+from BBData.Fields import Enum, LongText
+from BBData.Transfer import exportFile
+
+
+def records(count: int):
+    for i in range(count):
+        yield {'name': f'Requirement {i}', 'Requirement': f'The system shall do thing {i}.',
+               'Assigned To': 'Software Engineer' if i % 3 else 'Electrical Engineer'}
+
+
+def setup(root: str):
+    workspace = Scope.setCurrentWorkspaceFromDirectory(root)
+    project = workspace.createNewProject('Project')
+    definitions = project.createNewDocument('Definitions', parent=project)
+    document = project.createNewDocument('Requirements', parent=project)
+    definition = project.createWorkItemDefinition(name='Requirement', parent=definitions)
+    definition.addPublicFields([LongText('Requirement'), Enum(['Electrical Engineer', 'Software Engineer'], 'Electrical Engineer', 'Assigned To')])
+    definition.serialize()
+    return workspace, definition, document
+
+
+def run(count: int):
+    with tempfile.TemporaryDirectory() as root:
+        workspace, definition, document = setup(root)
+        single = min(count, 2000)
+        start = time.perf_counter()
+        for record in records(single):
+            item = workspace.createNewWorkItem(record['name'], definition, document)
+            item.getPublicField('Requirement').setText(record['Requirement'])
+            item.getPublicField('Assigned To').setCurrent(record['Assigned To'])
+            item.serialize()
+        elapsed = time.perf_counter() - start
+        print(f'createNewWorkItem {single} records: {elapsed:8.3f} s ({elapsed / single * 1e6:7.1f} us/item)')
+
+    with tempfile.TemporaryDirectory() as root:
+        workspace, definition, document = setup(root)
+        start = time.perf_counter()
+        workspace.importWorkItems(records(count), definition, document)
+        elapsed = time.perf_counter() - start
+        print(f'importWorkItems {count} records: {elapsed:8.3f} s ({elapsed / count * 1e6:7.1f} us/item)')
+        start = time.perf_counter()
+        written = exportFile(workspace, os.path.join(root, 'export.jsonl'))
+        elapsed = time.perf_counter() - start
+        print(f'exportFile {written} items: {elapsed:8.3f} s ({elapsed / written * 1e6:7.1f} us/item)')
+
+    for size in (count // 10, count):
+        with tempfile.TemporaryDirectory() as root:
+            workspace, definition, document = setup(root)
+            tracemalloc.start()
+            workspace.importWorkItems(records(size), definition, document)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f'importWorkItems {size} records: peak {peak / 2 ** 20:6.1f} MiB traced')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
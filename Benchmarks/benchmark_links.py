@@ -0,0 +1,42 @@
+'''
+Times linking one shared requirement to many work items, one link at a time and in bulk.
+
+Usage: python Benchmarks/benchmark_links.py [links]
+'''
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import Scope, WorkItem, Workspace
+from benchmark_memory import definition
+
+
+def items(count: int):
+    template = definition()
+    template.addDownstreamRule(template)
+    return [WorkItem(name=f'Requirement {i}', template=template) for i in range(count + 1)]
+
+
+def run(links: int):
+    Scope.rulespolicy = Scope.RulesPolicy.STRICT
+    hub, *others = items(links)
+    gc.collect()
+    start = time.perf_counter()
+    for item in others:
+        hub.addDownstream(item)
+    elapsed = time.perf_counter() - start
+    print(f'addDownstream x {links}: {elapsed:.3f} s, {len(hub.downstream)} links')
+    if not hasattr(Workspace, 'linkMany'):
+        return
+    hub, *others = items(links)
+    gc.collect()
+    start = time.perf_counter()
+    Workspace.linkMany(Workspace.__new__(Workspace), [(hub, item) for item in others])
+    elapsed = time.perf_counter() - start
+    print(f'linkMany x {links}: {elapsed:.3f} s, {len(hub.downstream)} links')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,45 @@
+'''
+Measures the memory held per work item created from a ten field definition.
+
+Usage: python Benchmarks/benchmark_memory.py [items]
+'''
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem, WorkItemDefinition
+from BBData.Fields import Checks, Enum, LongText, Radio, ShortText
+
+
+def definition() -> WorkItemDefinition:
+    assignees = ['Electrical Engineer', 'Software Engineer', 'Mechanical Engineer']
+    d = WorkItemDefinition(name='Requirement')
+    d.addPublicFields([
+        LongText('Requirement'),
+        LongText('Rationale'),
+        LongText('Verification Method'),
+        ShortText('Production Cost Estimate'),
+        ShortText('Reference'),
+        Enum(assignees, assignees[0], 'Assigned To'),
+        Enum(['Low', 'Medium', 'High'], 'Medium', 'Priority'),
+        Checks({'Reviewed': False, 'Approved': False, 'Verified': False}, 'Status'),
+        Checks({'Safety': False, 'Regulatory': False}, 'Tags'),
+        Radio({'Draft': True, 'Released': False, 'Obsolete': False}, fieldname='State')
+    ])
+    return d
+
+
+def run(items: int):
+    template = definition()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    workitems = [WorkItem(name=f'Requirement {i}', template=template) for i in range(items)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'{items} items: {(after - before) / items:8.0f} bytes/item')
+    return workitems
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,58 @@
+'''
+Times finding work items by field value through QueryIndex against scanning every item, and
+looking up fields by name.
+
+Usage: python Benchmarks/benchmark_query.py [items]
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem
+from benchmark_memory import definition
+
+
+def run(items: int):
+    template = definition()
+    workitems = [WorkItem(name=f'Requirement {i}', template=template) for i in range(items)]
+    for item in workitems[::3]:
+        item.getPublicField('Assigned To').setCurrent('Software Engineer')
+
+    start = time.perf_counter()
+    for i in range(10):
+        found = [item for item in workitems if item.getPublicField('Assigned To').getCurrent() == 'Software Engineer']
+    elapsed = (time.perf_counter() - start) / 10
+    print(f'scan {items} items: {elapsed * 1e3:8.2f} ms, {len(found)} found')
+
+    start = time.perf_counter()
+    lookups = 0
+    for item in workitems:
+        for name in ('Requirement', 'State', 'Missing'):
+            item.getPublicField(name)
+            lookups += 1
+    elapsed = time.perf_counter() - start
+    print(f'getPublicField by name: {elapsed / lookups * 1e6:6.2f} us/lookup')
+
+    try:
+        from BBData.Query import QueryIndex
+    except ImportError:
+        return
+    start = time.perf_counter()
+    index = QueryIndex(workitems)
+    elapsed = time.perf_counter() - start
+    print(f'index {items} items: {elapsed * 1e3:8.2f} ms')
+    start = time.perf_counter()
+    for i in range(10):
+        found = index.where(template=template, enums={'Assigned To': 'Software Engineer'})
+    elapsed = (time.perf_counter() - start) / 10
+    print(f'query: {elapsed * 1e3:8.2f} ms, {len(found)} found')
+    start = time.perf_counter()
+    for item in workitems[:1000]:
+        item.getPublicField('Priority').setCurrent('High')
+    elapsed = time.perf_counter() - start
+    print(f'edit with the index following: {elapsed / 1000 * 1e6:6.2f} us/edit')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
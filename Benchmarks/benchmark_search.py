@@ -0,0 +1,77 @@
+'''
+Times keyword, prefix and phrase search through SearchIndex against scanning every text, storing
+the index, and searching the stored postings after reopening it.
+
+Usage: python Benchmarks/benchmark_search.py [items]
+
+Texts are generated in memory. The scan only lowercases and searches strings, so it is a lower
+bound on scanning the LongText fields of loaded items, and doesn't count loading them.
+'''
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.Search import SearchIndex
+
+words = ('system shall pump valve sensor stop start within seconds report fault power supply '
+         'operator display alarm pressure temperature limit controller log record maintain').split()
+
+
+def texts(items: int) -> dict:
+    random.seed(1)
+    return {f'item-{i}': {'Requirement': f'The system shall {" ".join(random.choices(words, k=12))} {i}.',
+                          'Notes': ' '.join(random.choices(words, k=4))} for i in range(items)}
+
+
+def timed(label: str, function, repeat: int = 20):
+    start = time.perf_counter()
+    for i in range(repeat):
+        result = function()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'{label:<28} {elapsed * 1e3:9.2f} ms, {len(result)} found')
+
+
+def run(items: int):
+    generated = texts(items)
+    def scan(words):
+        found = []
+        for uuid, fields in generated.items():
+            text = ' '.join(fields.values()).lower()
+            if all(word in text for word in words):
+                found.append(uuid)
+        return found
+    timed('scan for "valve alarm"', lambda: scan(['valve', 'alarm']), 3)
+
+    with tempfile.TemporaryDirectory() as root:
+        index = SearchIndex(os.path.join(root, 'search'))
+        start = time.perf_counter()
+        for uuid, fields in generated.items():
+            index.setTexts(uuid, fields, (0, 0))
+        print(f'index {items} items: {time.perf_counter() - start:8.3f} s, {len(index.postings)} tokens')
+        timed('search "valve alarm"', lambda: index.search('valve alarm'))
+        timed('search "system 4242"', lambda: index.search('system 4242'))
+        timed('search prefix "temp"', lambda: index.search('temp', prefix=True))
+        timed('phrase "shall stop"', lambda: index.phrase('shall stop'), 3)
+        start = time.perf_counter()
+        index.save()
+        print(f'store: {time.perf_counter() - start:8.3f} s')
+        index.close()
+        start = time.perf_counter()
+        loaded = SearchIndex(index.path)
+        loaded.load()
+        print(f'load stored stats: {time.perf_counter() - start:8.3f} s')
+        start = time.perf_counter()
+        found = loaded.search('valve alarm')
+        print(f'first search after reopening: {(time.perf_counter() - start) * 1e3:8.2f} ms, {len(found)} found')
+        timed('stored search "valve alarm"', lambda: loaded.search('valve alarm'))
+        timed('stored search "system 4242"', lambda: loaded.search('system 4242'))
+        timed('stored prefix "temp"', lambda: loaded.search('temp', prefix=True), 3)
+        timed('stored phrase "shall stop"', lambda: loaded.phrase('shall stop'), 3)
+        print(f'store size: {os.path.getsize(index.path) / 1e6:8.1f} MB')
+        loaded.close()
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,47 @@
+'''
+Times Workspace.updateStructureFromFileStructure on synthetic workspaces.
+
+Usage: python Benchmarks/benchmark_structure.py [nodes ...]
+
+Registries are filled in memory with one document per 100 nodes, so no files are written.
+The per-node time should stay flat as the node count grows.
+'''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData import config
+from BBData.BBData import Workspace
+from BBData.FileSystem import TreeNode
+
+
+def synthesize(workspace: Workspace, nodes: int, fanout: int = 100):
+    # Registries are private to the workspace, fill them the way discovery does
+    documents = workspace._Workspace__documents
+    workitems = workspace._Workspace__workitems
+    for d in range(max(1, nodes // fanout)):
+        document = TreeNode(f'doc-{d}')
+        document.name = f'Document {d}'
+        documents[document.uuid] = {'path': os.path.join(document.name, f'{document.name}.bbdoc'), 'item': document}
+        for i in range(fanout - 1):
+            item = TreeNode(f'item-{d}-{i}')
+            item.name = f'Item {i}'
+            workitems[item.uuid] = {'path': os.path.join(document.name, f'{item.name}.bbitem'), 'item': item}
+
+
+def run(nodes: int):
+    with tempfile.TemporaryDirectory() as root:
+        workspace = Workspace(root)
+        synthesize(workspace, nodes)
+        start = time.perf_counter()
+        workspace.updateStructureFromFileStructure()
+        elapsed = time.perf_counter() - start
+    print(f'{nodes:>9} nodes: {elapsed:8.3f} s ({elapsed / nodes * 1e6:6.2f} us/node)')
+
+
+if __name__ == '__main__':
+    config.useWorkspaceIndex = False
+    for nodes in [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]:
+        run(nodes)
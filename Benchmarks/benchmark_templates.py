@@ -0,0 +1,49 @@
+'''
+Times creating work items from one ten field definition.
+
+Usage: python Benchmarks/benchmark_templates.py [items]
+
+The time per item is compared with bare elements, which only pay for the uuid, timestamps and
+delegates, so the remainder is the cost of instantiating the template.
+Then times adding five fields to the definition and renaming one, with every item following it.
+'''
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem
+from BBData.Fields import ShortText
+from benchmark_memory import definition
+
+
+def timed(create, items: int) -> float:
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        created = [create(i) for i in range(items)]
+        return (time.perf_counter() - start) / items
+    finally:
+        gc.enable()
+
+
+def run(items: int):
+    template = definition()
+    bare = timed(lambda i: WorkItem(name=f'Requirement {i}'), items)
+    full = timed(lambda i: WorkItem(name=f'Requirement {i}', template=template), items)
+    print(f'{items} items: {bare * 1e6:6.1f} us/item bare, {full * 1e6:6.1f} us/item from template')
+
+    template = definition()
+    workitems = [WorkItem(name=f'Requirement {i}', template=template) for i in range(items)]
+    start = time.perf_counter()
+    template.addPublicFields([ShortText(f'Extra {i}') for i in range(5)])
+    added = time.perf_counter() - start
+    start = time.perf_counter()
+    template.renameField('Extra 0', 'Renamed')
+    renamed = time.perf_counter() - start
+    print(f'{len(workitems)} items: {added:6.3f} s to add 5 fields, {renamed:6.3f} s to rename one')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,55 @@
+'''
+Times taking timestamps, constructing work items, and filtering and sorting items by update time,
+against the %m/%d/%y %H:%M:%S strings elements used to hold.
+
+Usage: python Benchmarks/benchmark_timestamps.py [items]
+'''
+from datetime import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData.BBData import WorkItem
+from BBData.utilities import currentTime, formatTime, parseTime
+from benchmark_memory import definition
+
+legacyformat = '%m/%d/%y %H:%M:%S'
+
+
+def timed(label: str, count: int, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    print(f'{label}: {elapsed / count * 1e6:8.3f} us each')
+    return result
+
+
+def run(items: int):
+    timed('strftime now', items, lambda: [datetime.now().strftime(legacyformat) for _ in range(items)])
+    timed('currentTime', items, lambda: [currentTime() for _ in range(items)])
+    template = definition()
+    elements = timed('construct work item', items, lambda: [WorkItem(name=f'Requirement {i}', template=template) for i in range(items)])
+
+    # Update times spread over three years, as strings and as integers
+    now = currentTime()
+    stamps = [now - random.randrange(3 * 365 * 86400) * 10 ** 9 for _ in range(items)]
+    strings = [datetime.fromtimestamp(stamp // 10 ** 9).strftime(legacyformat) for stamp in stamps]
+    for element, stamp in zip(elements, stamps):
+        element.updateDate = stamp
+    since = now - 365 * 86400 * 10 ** 9
+    sincestring = datetime.fromtimestamp(since // 10 ** 9)
+    old = timed('changed since, parsing strings', items,
+                lambda: [s for s in strings if datetime.strptime(s, legacyformat) >= sincestring])
+    new = timed('changed since, integers', items, lambda: [e for e in elements if e.updateDate >= since])
+    print(f'  {len(old)} and {len(new)} found')
+    timed('sort, parsing strings', items, lambda: sorted(strings, key=lambda s: datetime.strptime(s, legacyformat)))
+    timed('sort, integers', items, lambda: sorted(elements, key=lambda e: e.updateDate))
+    iso = timed('formatTime', items, lambda: [formatTime(stamp) for stamp in stamps])
+    timed('parseTime, ISO-8601', items, lambda: [parseTime(s) for s in iso])
+    timed('parseTime, legacy', items, lambda: [parseTime(s) for s in strings])
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,83 @@
+'''
+Times refreshing a workspace after another program changed some of its files, through
+Workspace.refreshFiles and through discovering the workspace again.
+
+Usage: python Benchmarks/benchmark_watch.py [items] [changed]
+
+Files are written once into a temporary directory. Half of the changed files belong to loaded
+items, the other half to items that were never loaded.
+'''
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from BBData import BBData as module
+from BBData.BBData import Scope
+from BBData.Fields import Enum, LongText
+from BBData.utilities import loadJsonLike, saveJsonLike, saveJsonLikeMany
+
+
+def counting(function, counts: dict, key: str):
+    def wrapper(*args, **kwargs):
+        counts[key] += 1
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def build(root: str, items: int):
+    workspace = Scope.setCurrentWorkspaceFromDirectory(root)
+    project = workspace.createNewProject('Project')
+    definitions = project.createNewDocument('Definitions', parent=project)
+    requirements = project.createNewDocument('Requirements', parent=project)
+    definition = project.createWorkItemDefinition(name='Requirement', parent=definitions)
+    definition.addPublicFields([LongText('Requirement'), Enum(['Electrical Engineer', 'Software Engineer'], 'Electrical Engineer', 'Assigned To')])
+    definition.serialize()
+    item = project.createWorkItem('Item 0', definition, requirements)
+    item.serialize()
+    project.save()
+    base = loadJsonLike(item.getSerializationPath())
+    directory = os.path.dirname(item.getSerializationPath())
+    files = []
+    for i in range(1, items):
+        data = dict(base, uuid=str(uuid.uuid4()), name=f'Item {i}')
+        files.append((data, os.path.join(directory, f'Item {i}.bbitem')))
+    saveJsonLikeMany(files)
+
+
+def run(items: int, changed: int):
+    with tempfile.TemporaryDirectory() as root:
+        build(root, items)
+        counts = {'parses': 0}
+        module.loadJsonLike = counting(module.loadJsonLike, counts, 'parses')
+
+        start = time.perf_counter()
+        workspace = Scope.setCurrentWorkspaceFromDirectory(root)
+        elapsed = time.perf_counter() - start
+        print(f'discover {items} items: {elapsed:8.3f} s, {counts["parses"]} parses')
+
+        entries = [entry for entry in workspace.getElementEntries().values() if entry['kind'] == '.bbitem']
+        paths = [workspace.getFullPath(entry['path']) for entry in entries[:changed]]
+        for path in paths[:changed // 2]:
+            workspace.getWorkItemByUUID(loadJsonLike(path)['uuid'])
+        for i, path in enumerate(paths):
+            data = loadJsonLike(path)
+            data['public'][0]['text'] = f'Pulled change {i}'
+            saveJsonLike(data, path)
+
+        counts['parses'] = 0
+        start = time.perf_counter()
+        result = workspace.refreshFiles(paths)
+        elapsed = time.perf_counter() - start
+        print(f'refresh {len(result["changed"])} changed files: {elapsed * 1e3:8.2f} ms, {counts["parses"]} parses')
+        start = time.perf_counter()
+        workspace.refreshFiles(paths)
+        elapsed = time.perf_counter() - start
+        print(f'refresh them again unchanged: {elapsed * 1e3:8.2f} ms')
+        module.loadJsonLike = loadJsonLike
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000, int(sys.argv[2]) if len(sys.argv) > 2 else 30)
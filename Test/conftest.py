@@ -0,0 +1,27 @@
+import pytest
+from BBData.BBData import Scope
+from BBData.Fields import Enum, LongText
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    previous = Scope.currentWorkspace
+    ws = Scope.setCurrentWorkspaceFromDirectory(str(tmp_path / 'ws'))
+
+    project = ws.createNewProject('Project')
+    definitions = project.createNewDocument('Definitions', parent=project)
+    requirements = project.createNewDocument('Requirements', parent=project)
+    definition = project.createWorkItemDefinition(name='Requirement', parent=definitions)
+    definition.addPublicFields([
+        LongText('Requirement'),
+        Enum(['Electrical Engineer', 'Software Engineer'], 'Electrical Engineer', 'Assigned To')
+    ])
+    definition.serialize()
+    for i in range(5):
+        item = project.createWorkItem(f'Item {i}', definition, requirements)
+        item.getPublicField('Requirement').setText(f'The system shall do thing {i}.')
+        item.serialize()
+    project.save()
+
+    yield ws
+    Scope.currentWorkspace = previous
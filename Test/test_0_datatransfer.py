@@ -26,3 +26,101 @@ class TestDelegate:
         testitem.delegate.connect(lambda x: lambdaReceiver(x[0] == 12))
         testitem.triggerEmit()
 
+
+    def test_disconnecthandle(self):
+        received = []
+        delegate = Delegate()
+        connection = delegate.connect(lambda args: received.append(args[0]))
+        delegate.connect(received.append)
+        delegate.emit(1)
+        connection.disconnect()
+        assert not connection.connected
+        delegate.disconnect(received.append)
+        delegate.emit(2)
+
+        assert received == [1, (1,)]
+        assert delegate.subscribers == []
+
+    def test_weakmethods(self):
+        import gc
+
+        class Receiver():
+            def __init__(self) -> None:
+                self.received = []
+
+            def receive(self, args):
+                self.received.append(args)
+
+        delegate = Delegate()
+        receiver = Receiver()
+        delegate.connect(receiver.receive)
+        delegate.emit(1)
+        assert receiver.received == [(1,)]
+
+        del receiver
+        gc.collect()
+        delegate.emit(2)
+        assert delegate.subscribers == []
+
+    def test_blockedandbatch(self):
+        received = []
+        delegate = Delegate()
+        delegate.connect(received.append)
+        a, b = object(), object()
+        with delegate.blocked():
+            delegate.emit(a, 1)
+        with delegate.batch():
+            delegate.emit(a, 1)
+            delegate.emit(b, 2)
+            delegate.emit(a, 3)
+            assert received == []
+
+        assert received == [(a, 3), (b, 2)]
+
+    def test_queuedispatch(self):
+        import threading
+        from BBData.Dispatch import QueueDispatcher
+
+        release = threading.Event()
+        received = []
+        def slow(args):
+            release.wait()
+            received.append((threading.current_thread().name, args))
+
+        delegate = Delegate()
+        delegate.connect(slow)
+        dispatcher = QueueDispatcher(maxsize=2)
+        delegate.setDispatcher(dispatcher)
+        a, b = object(), object()
+        # The first emit is taken by the worker, the next ones coalesce while it is stuck
+        delegate.emit(a, 0)
+        with dispatcher.condition:
+            assert dispatcher.condition.wait_for(lambda: not dispatcher.pending, 5)
+        for i in range(1, 100):
+            delegate.emit(a, i)
+            delegate.emit(b, i)
+        assert threading.current_thread().name not in [name for name, args in received]
+        release.set()
+        assert dispatcher.join(5)
+        dispatcher.close()
+
+        assert [args for name, args in received] == [(a, 0), (a, 99), (b, 99)]
+        assert dispatcher.coalesced == 196
+
+    def test_asynciodispatch(self):
+        import asyncio
+        from BBData.Dispatch import AsyncioDispatcher
+
+        received = []
+        async def main():
+            delegate = Delegate()
+            delegate.connect(received.append)
+            delegate.setDispatcher(AsyncioDispatcher(maxsize=1, coalesce=False))
+            delegate.emit(1)
+            # The queue is full and this is the loop thread, so the emit is delivered inline
+            delegate.emit(2)
+            assert received == [(2,)]
+            assert await delegate.dispatcher.join(5)
+
+        asyncio.run(main())
+        assert received == [(2,), (1,)]
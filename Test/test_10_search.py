@@ -0,0 +1,129 @@
+import os
+import sqlite3
+from BBData import Search
+from BBData import BBData as module
+from BBData.BBData import Scope
+from BBData.Search import SearchIndex, tokenize
+from BBData.utilities import loadJsonLike, saveJsonLike
+
+
+class TestSearchIndex:
+
+    def test_queries(self):
+        index = SearchIndex()
+        index.setTexts('a', {'Requirement': 'The pump shall stop within 2 seconds.', 'Notes': 'Pumping station'})
+        index.setTexts('b', {'Requirement': 'The valve shall stop the pump.'})
+        assert tokenize('The Pump, shall') == ['the', 'pump', 'shall']
+        assert sorted(index.search('pump stop')) == ['a', 'b']
+        assert index.search('pump seconds') == ['a']
+        assert index.search('pump', fields=['Notes']) == []
+        assert sorted(index.search('pump', prefix=True, fields=['Notes'])) == ['a']
+        assert sorted(index.phrase('shall stop')) == ['a', 'b'] and index.phrase('stop within') == ['a']
+        assert index.phrase('stop the pump') == ['b']
+        assert index.search('') == [] and index.phrase('missing words') == []
+
+        index.setTexts('a', {'Requirement': 'The pump shall run.'})
+        assert index.search('seconds') == [] and index.search('pumping') == []
+        index.remove('b')
+        assert index.search('valve') == [] and len(index) == 1
+
+    def test_stored(self, tmp_path):
+        path = str(tmp_path / 'search')
+        connection = sqlite3.connect(path)
+        connection.execute('CREATE TABLE texts (uuid TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, texts TEXT NOT NULL)')
+        connection.execute("INSERT INTO texts VALUES ('old', 1, 1, '{}')")
+        connection.commit()
+        connection.close()
+        index = SearchIndex(path)
+        # Stores of the texts-only layout are dropped
+        assert index.load() == {}
+        index.setTexts('a', {'Requirement': 'The pump shall stop within 2 seconds.', 'Notes': 'Pumping station'}, (1, 1))
+        index.setTexts('b', {'Requirement': 'The valve shall stop the pump.'}, (2, 2))
+        index.setTexts('c', {'Requirement': 'Stop, then the pump shall start.'}, (3, 3))
+        index.save()
+        index.close()
+
+        stored = SearchIndex(path)
+        assert stored.load() == {'a': (1, 1), 'b': (2, 2), 'c': (3, 3)}
+        stored.setTexts('c', {'Requirement': 'The pump shall stop.'}, (3, 3))
+        assert not stored.texts and not stored.postings
+        assert sorted(stored.search('pump stop')) == ['a', 'b', 'c'] and stored.search('pump seconds') == ['a']
+        assert stored.search('pump', fields=['Notes']) == [] and stored.search('pump', prefix=True, fields=['Notes']) == ['a']
+        assert sorted(stored.phrase('shall stop')) == ['a', 'b'] and stored.phrase('stop the pump') == ['b']
+        assert stored.phrase('the pump shall', fields=['Notes']) == []
+
+        # Texts indexed since loading win over the stored postings
+        stored.setTexts('a', {'Requirement': 'The pump shall run.'}, (4, 4))
+        stored.remove('b')
+        assert stored.search('seconds') == [] and stored.search('valve') == []
+        assert sorted(stored.phrase('pump shall')) == ['a', 'c']
+        stored.save()
+        stored.close()
+        reopened = SearchIndex(path)
+        reopened.load()
+        assert reopened.search('run') == ['a'] and reopened.search('valve') == [] and len(reopened) == 2
+
+
+class TestWorkspaceSearch:
+
+    def test_follows(self, workspace):
+        search = workspace.searchIndex()
+        items = workspace.getWorkItems()
+        assert sorted(search.search('thing')) == sorted(item.uuid for item in items)
+        assert search.phrase('do thing 3') == [items[3].uuid]
+        items[3].getPublicField('Requirement').setText('Something else entirely')
+        assert search.search('thing 3') == [] and search.search('entire', prefix=True) == [items[3].uuid]
+
+        created = workspace.createNewWorkItem('New', items[0].template, items[0].parent)
+        created.getPublicField('Requirement').setText('A brand new requirement')
+        assert search.search('brand') == [created.uuid]
+
+    def test_persisted(self, workspace, monkeypatch):
+        items = workspace.getWorkItems()
+        workspace.searchIndex()
+        items[2].getPublicField('Requirement').setText('Unsaved wording')
+        items[1].getPublicField('Requirement').setText('Saved wording')
+        items[1].serialize()
+
+        def fail(*args, **kwargs):
+            raise AssertionError('read a file')
+        with monkeypatch.context() as patch:
+            patch.setattr(module, 'loadJsonLikeMany', fail)
+            reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+            # The unsaved text was stored without a stat, so only its file is read again
+            assert reopened._Workspace__search.stale == {items[2].uuid}
+        search = reopened.searchIndex()
+        assert search.search('wording') == [items[1].uuid]
+        assert sorted(search.search('thing')) == sorted(item.uuid for item in items if item is not items[1])
+        assert not any(reopened.isLoaded(item.uuid) for item in items)
+
+    def test_stored(self, workspace, monkeypatch):
+        items = workspace.getWorkItems()
+        workspace.searchIndex()
+
+        def fail(*args, **kwargs):
+            raise AssertionError('read or tokenized a text')
+        monkeypatch.setattr(module, 'loadJsonLikeMany', fail)
+        monkeypatch.setattr(Search, 'positionsOf', fail)
+        search = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True).searchIndex()
+        assert sorted(search.search('thing')) == sorted(item.uuid for item in items)
+        assert search.phrase('do thing 3') == [items[3].uuid] and search.search('thing 3') == [items[3].uuid]
+        assert not search.texts
+
+    def test_refresh(self, workspace):
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+        entries = [entry for entry in ws.getElementEntries().values() if entry['kind'] == '.bbitem']
+        path = ws.getFullPath(entries[0]['path'])
+        d = loadJsonLike(path)
+        d['public'][0]['text'] = 'Changed by someone else'
+        saveJsonLike(d, path)
+        os.remove(ws.getFullPath(entries[1]['path']))
+
+        ws.refreshFiles([path, ws.getFullPath(entries[1]['path'])])
+        search = ws.searchIndex()
+        assert search.search('someone') == [d['uuid']]
+        assert len(search.search('thing')) == 3
+
+        uuids = ws.importWorkItems([{'name': 'Imported', 'Requirement': 'Imported wording'}], ws.getDefinitions()[0])
+        assert search.search('imported wording') == uuids
+        assert not ws.isLoaded(uuids[0])
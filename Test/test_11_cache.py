@@ -0,0 +1,84 @@
+import gc
+import pytest
+from BBData import config
+from BBData.BBData import Scope
+from BBData.Fields import ShortText
+
+
+@pytest.fixture
+def limited(workspace, monkeypatch):
+    monkeypatch.setattr(config, 'hydrationCacheSize', 2)
+    ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+    return ws, [uuid for uuid, entry in ws.getElementEntries().items() if entry['kind'] == '.bbitem']
+
+
+class TestHydrationCache:
+
+    def test_lru(self, limited):
+        ws, uuids = limited
+        for uuid in uuids:
+            ws.getWorkItemByUUID(uuid)
+        assert [ws.isLoaded(uuid) for uuid in uuids] == [False, False, False, True, True]
+        # Items reference themselves through their fields, collect them so they can't be revived
+        gc.collect()
+        ws.getWorkItemByUUID(uuids[3])
+        ws.getWorkItemByUUID(uuids[0])
+        assert ws.isLoaded(uuids[3]) and not ws.isLoaded(uuids[4])
+        counters = ws.cache.counters()
+        assert (counters['hits'], counters['misses'], counters['evictions'], counters['loaded']) == (1, 6, 4, 2)
+        assert ws.getNode(uuids[4]) == None
+
+    def test_pinned(self, limited):
+        ws, uuids = limited
+        ws.getWorkItemByUUID(uuids[0]).getPublicField('Requirement').setText('Not saved')
+        for uuid in uuids[1:]:
+            ws.getWorkItemByUUID(uuid)
+        assert ws.isLoaded(uuids[0]) and ws.getWorkItemByUUID(uuids[0]).getPublicField('Requirement').text() == 'Not saved'
+        ws.getWorkItemByUUID(uuids[0]).serialize()
+        ws.getWorkItemByUUID(uuids[1])
+        ws.getWorkItemByUUID(uuids[2])
+        assert not ws.isLoaded(uuids[0])
+
+    def test_revival(self, limited):
+        ws, uuids = limited
+        held = ws.getWorkItemByUUID(uuids[0])
+        for uuid in uuids[1:3]:
+            ws.getWorkItemByUUID(uuid)
+        assert not ws.isLoaded(uuids[0])
+        assert ws.getWorkItemByUUID(uuids[0]) is held and ws.getNode(uuids[0]) is held
+        assert ws.cache.revivals == 1 and ws.cache.misses == 3 and not held.dirty
+
+        for uuid in uuids[1:3]:
+            ws.getWorkItemByUUID(uuid)
+        held.template.addPublicField(ShortText('Added'))
+        # The template changed while the item was evicted, so it is read again
+        assert ws.getWorkItemByUUID(uuids[0]) is not held
+        del held
+        ws.getWorkItemByUUID(uuids[3])
+        ws.getWorkItemByUUID(uuids[4])
+        gc.collect()
+        revivals = ws.cache.revivals
+        ws.getWorkItemByUUID(uuids[0])
+        assert ws.cache.revivals == revivals
+
+    def test_bytes(self, workspace, monkeypatch):
+        monkeypatch.setattr(config, 'hydrationCacheBytes', 1200)
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        entries = [entry for entry in ws.getElementEntries().values() if entry['kind'] == '.bbitem']
+        assert ws.cache.bytes <= 1200 and len(ws.cache) == 1200 // entries[0]['size']
+        assert ws.cache.evictions == 5 - len(ws.cache)
+
+    def test_query(self, limited):
+        ws, uuids = limited
+        query = ws.query()
+        assert sum(ws.isLoaded(uuid) for uuid in uuids) == 2 and len(query) == 5
+        assert ws.cache.evictions == 3
+        assigned = query.withEnum('Assigned To', 'Electrical Engineer')
+        assert sorted(item.uuid for item in assigned) == sorted(uuids)
+        assert sum(ws.isLoaded(uuid) for uuid in uuids) == 2
+
+        # Read back items are followed again
+        edited = query.named(assigned[0].name)[0]
+        edited.getPublicField('Assigned To').setCurrent('Software Engineer')
+        assert query.withEnum('Assigned To', 'Software Engineer') == [edited]
+        assert len(query.where(since=0)) == 5
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+import time
+from BBData.BBData import Scope, WorkItem, WorkItemDefinition
+from BBData.Diff import diffDicts
+from BBData.Fields import *
+from BBData.Query import QueryIndex
+from BBData.utilities import currentTime, formatTime, getDuration, loadJsonLike, parseTime, saveJsonLike
+
+
+def definition():
+    d = WorkItemDefinition(name='Requirement')
+    d.addPublicFields([ShortText('Requirement', 'The system shall')])
+    return d
+
+
+class TestTimestamps:
+
+    def test_formatandparse(self):
+        now = currentTime()
+        assert isinstance(now, int) and abs(now - time.time_ns()) < 10 ** 9
+        assert parseTime(formatTime(now)) == now
+        assert formatTime(0) == '1970-01-01T00:00:00.000000000Z'
+        assert parseTime('2026-10-18T12:00:00+02:00') == parseTime('2026-10-18T10:00:00Z')
+        assert parseTime('2026-10-18T10:00:00.5Z') == parseTime('2026-10-18T10:00:00Z') + 500000000
+        # Older files hold local times with whole seconds
+        legacy = datetime(2026, 10, 18, 12, 30, 15)
+        assert parseTime('10/18/26 12:30:15') == parseTime(legacy) == int(legacy.timestamp()) * 10 ** 9
+        assert parseTime(now) == now and parseTime(None) == None
+
+    def test_ordered(self):
+        item = WorkItem(template=definition())
+        assert item.updateDate == item.createDate
+        before = item.updateDate
+        item.updateUpdateTime()
+        assert item.updateDate > before and item.dirty
+        # Sort across years, where the old format didn't
+        assert parseTime('01/01/26 00:00:00') > parseTime('12/31/25 23:59:59')
+
+    def test_duration(self):
+        then = currentTime() - 90 * 10 ** 9
+        assert getDuration(then)['minutes'] == 1
+        assert getDuration(datetime.now() - timedelta(hours=2))['hours'] == 2
+        assert getDuration('10/18/25 12:00:00', '10/18/26 12:00:00')['days'] == 365
+
+    def test_legacyfile(self, workspace):
+        item = workspace.getWorkItems()[0]
+        path = item.getSerializationPath()
+        d = loadJsonLike(path)
+        d['createDate'], d['updateDate'] = '10/18/25 08:00:00', '10/18/26 09:30:00'
+        saveJsonLike(d, path)
+
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        loaded = ws.getWorkItemByUUID(item.uuid)
+        assert loaded.createDate == parseTime('10/18/25 08:00:00')
+        assert loaded.updateDate == parseTime('10/18/26 09:30:00')
+        assert not diffDicts(d, loaded.toDict())
+        loaded.updateUpdateTime()
+        ws.saveElements([loaded])
+        saved = loadJsonLike(path)
+        assert saved['createDate'] == formatTime(loaded.createDate)
+        assert parseTime(saved['updateDate']) == loaded.updateDate
+
+    def test_updatedsince(self):
+        template = definition()
+        items = [WorkItem(name=f'Item {i}', template=template) for i in range(3)]
+        index = QueryIndex(items)
+        since = currentTime()
+        items[1].updateUpdateTime()
+        assert index.updatedSince(since) == [items[1]]
+        assert index.updatedSince(formatTime(since)) == [items[1]]
+        assert index.where(template=template, since=since) == [items[1]]
+        assert index.where(since=0) == items
@@ -1,3 +1,4 @@
+import pytest
 import random
 import string
 from BBData.Fields import Checks, Radio, Enum, ShortText, LongText, parseField
@@ -166,4 +167,90 @@ class TestLongText:
         testitem2 = LongText(defaultText=common)
 
         assert testitem == testitem2
-        assert testitem == LongText.fromDict(testitem2.toDict())
\ No newline at end of file
+        assert testitem == LongText.fromDict(testitem2.toDict())
+
+
+class TestCompactFields:
+
+    def test_sharedoptions(self):
+        testitem = Enum(list(commonEnumFields), commonEnumFields[0])
+        testitem2 = Enum(list(commonEnumFields), commonEnumFields[0])
+        check = Checks(dict(commonCheckFields))
+        check2 = Checks(dict(commonCheckFields))
+
+        assert testitem.options is testitem2.options
+        assert check._labels is check2._labels
+        assert not hasattr(testitem, '__dict__')
+
+    def test_enumemits(self):
+        from BBData.BBData import WorkItem, WorkItemDefinition
+        definition = WorkItemDefinition()
+        definition.addPublicField(Enum(['A', 'B'], 'A', 'Choice'))
+        item = WorkItem(template=definition)
+        item.markSaved()
+        field = item.getPublicField('Choice')
+        states, changes = [], []
+        field.stateChanged.connect(states.append)
+        field.fieldChanged.connect(changes.append)
+
+        field.setCurrent('B')
+        field.setCurrent(0)
+        assert states == [(field, 'B'), (field, 'A')] and changes == [(field,), (field,)]
+        assert item.dirty
+
+    def test_getoption(self):
+        check = Checks({'A': True, 'B': False})
+        assert check.getOption(-1) == False and check.getOption('A') == True
+        with pytest.raises(KeyError):
+            check.getOption('Missing')
+        with pytest.raises(IndexError):
+            check.getOption(2)
+
+    def test_copy(self):
+        import copy
+        check = Checks(commonCheckFields)
+        check.fieldChanged.connect(lambda args: None)
+        copied = copy.deepcopy(check)
+
+        assert copied == check
+        assert copied._fieldChanged is None
+        copied.setOption(0, not check.getOption(0))
+        assert copied.getOption(0) != check.getOption(0)
+
+    def test_notifiesowner(self):
+        class Owner:
+            def __init__(self):
+                self.changes = []
+            def onFieldChanged(self, args):
+                self.changes.append(args)
+            def invalidateHash(self):
+                pass
+
+        owner = Owner()
+        testitem = Enum(commonEnumFields, commonEnumFields[0])
+        states = []
+        testitem.stateChanged.connect(states.append)
+        testitem.attach(owner)
+        testitem.setCurrent(1)
+        testitem.detach(owner)
+        testitem.setCurrent(0)
+
+        assert owner.changes == [(testitem,)]
+        assert states == [(testitem, commonEnumFields[1]), (testitem, commonEnumFields[0])]
+        assert str(Checks({'A': True, 'B': False}, 'Status')) == 'Status\n\t[x] A\t[ ] B'
+
+    def test_contenthash(self):
+        check = Checks(commonCheckFields)
+        copied = check.clone()
+        digest = check.contentHash()
+
+        assert copied == check and copied.contentHash() == check.contentHash()
+        with pytest.raises(TypeError):
+            hash(check)
+        check.options['Added'] = True
+        assert check.contentHash() != digest and copied != check
+        del check.options['Added']
+        assert check.contentHash() == digest
+        check.name = 'Renamed'
+        assert check != copied
+        assert Enum(['A'], 'A', 'Same') != ShortText('Same', 'A')
@@ -1,4 +1,5 @@
 import os
+import pytest
 from random import randint
 import random
 import string
@@ -50,8 +51,9 @@ class TestItemDefinition:
 
         ic3 = WorkItemDefinition(tree=Scope.currentWorkspace)
         ic3.addPublicFields(generateRandomFieldItems())
-        # Force same uuid
+        # Force same uuid and timestamps
         ic2.uuid = ic.uuid
+        ic2.createDate, ic2.updateDate = ic.createDate, ic.updateDate
         assert ic == ic2
         assert ic3 != ic2
         
@@ -72,6 +74,29 @@ class TestItemDefinition:
         assert ic2 in ic.getDownstream()
         assert ic in ic2.getUpstream()
 
+    def test_removerule(self):
+        ic = WorkItemDefinition()
+        ic2 = WorkItemDefinition()
+        ic.addDownstreamRule(ic2)
+        ic.addDownstreamRule(ic2)
+        assert ic.downstream == [ic2.uuid] and ic2.upstream == [ic.uuid]
+
+        ic.addDownstreamRule(ic2, allow=False)
+        ic.addDownstreamRule(ic2, allow=False)
+        assert not ic.downstream and not ic2.upstream
+        assert ic.toDict()['downstream'] == []
+
+    def test_linkset(self):
+        from BBData.Links import LinkSet
+        ic = WorkItemDefinition.fromDict(dict(WorkItemDefinition().toDict(), downstream=['b', 'a', 'b']))
+        assert isinstance(ic.downstream, LinkSet)
+        assert ic.downstream == ['b', 'a'] and ic.downstream != ['a', 'b']
+        ic.downstream.append('c')
+        ic.downstream.remove('b')
+        assert list(ic.downstream) == ['a', 'c'] and 'c' in ic.downstream
+        assert ic.toDict()['downstream'] == ['a', 'c']
+
+
 class TestGenericItems:
     def test_creation(self):
         # Create Template
@@ -82,3 +107,107 @@ class TestGenericItems:
         def2 = generateDefinition()
         requirement.populateFromTemplate(def2)
         assert requirement.public[0].name == def2.public[0].name
+
+    def test_schema(self):
+        definition = generateDefinition()
+        schema = definition.schema
+        assert definition.schema is schema
+
+        requirement = WorkItem(template=definition)
+        requirement2 = WorkItem(template=definition)
+        assert requirement.public == requirement2.public
+        assert requirement.public[0] is not requirement2.public[0]
+        assert requirement.public[0] is not definition.public[0]
+
+        added = ShortText('Added', randomString())
+        definition.addPublicField(added)
+        assert definition.schema is not schema
+        assert requirement.public[-1] == added and requirement.public[-1] is not added
+
+        definition.removePublicField('Added')
+        assert [field.name for field in requirement.public] == [field.name for field in definition.public]
+
+    def test_copy(self):
+        definition = generateDefinition()
+        copied = WorkItemDefinition.copy(definition)
+        assert type(copied) is WorkItemDefinition
+        assert copied.uuid != definition.uuid
+        assert copied.public == definition.public
+        assert copied.public[0] is not definition.public[0]
+
+    def test_contenthash(self):
+        definition = WorkItemDefinition()
+        definition.addPublicFields([ShortText('Text', 'default'), Enum(['A', 'B'], 'A', 'Choice')])
+        item = WorkItem(template=definition)
+        loaded = WorkItem(template=definition)
+        loaded.uuid = item.uuid
+        loaded.createDate, loaded.updateDate = item.createDate, item.updateDate
+        digest = item.contentHash()
+
+        assert loaded == item and loaded.contentHash() == item.contentHash()
+        item.getPublicField('Choice').setCurrent('B')
+        assert item != loaded and item.contentHash() != digest
+        with item.attributeChanged.blocked():
+            item.getPublicField('Choice').setCurrent('A')
+        assert item == loaded and item.contentHash() == digest
+
+        item.markSaved()
+        item.getPublicField('Text').setText('edited')
+        assert item.dirty and item.hasChanges()
+        item.getPublicField('Text').setText('default')
+        assert item.dirty and not item.hasChanges()
+
+    def test_directwrites(self):
+        a = generateDefinition()
+        b = WorkItemDefinition.copy(a)
+        b.uuid, b.createDate, b.updateDate = a.uuid, a.createDate, a.updateDate
+        assert a == b
+        digest = b.contentHash()
+        b.createDate = 0
+        assert a != b and b.contentHash() != digest
+        b.createDate = a.createDate
+        b.downstream.add('zzz')
+        assert a != b and b.contentHash() != digest
+        b.downstream.discard('zzz')
+        assert a == b and b.contentHash() == digest
+        with pytest.raises(TypeError):
+            {a}
+
+    def test_templatedeltas(self):
+        from BBData.Schema import SchemaChange
+        definition = WorkItemDefinition()
+        definition.addPublicFields([ShortText('Text', 'default'), Enum(['A', 'B', 'C'], 'A', 'Choice')])
+        requirement = WorkItem(template=definition)
+        requirement.getPublicField('Text').setText('kept')
+        requirement.getPublicField('Choice').setCurrent('C')
+
+        received = []
+        definition.templateChanged.connect(received.append)
+        with definition.batchChanges():
+            definition.addPublicField(ShortText('Temporary'))
+            definition.addPublicField(ShortText('Added'))
+            definition.removePublicField('Temporary')
+            definition.renameField('Text', 'Renamed')
+            definition.setFieldOptions('Choice', ['A', 'B'])
+        assert len(received) == 1
+        assert [delta.change for delta in received[0][1]] == [SchemaChange.ADDED, SchemaChange.RENAMED, SchemaChange.OPTIONSCHANGED]
+
+        assert [field.name for field in requirement.public] == ['Renamed', 'Choice', 'Added']
+        assert requirement.getPublicField('Renamed').text() == 'kept'
+        assert requirement.getPublicField('Choice').options == ('A', 'B')
+        assert requirement.getPublicField('Choice').getCurrent() == 'A'
+
+    def test_checksoptions(self):
+        definition = WorkItemDefinition()
+        definition.addPublicField(Checks({'A': False, 'B': False}, 'Status'))
+        requirement = WorkItem(template=definition)
+        requirement.getPublicField('Status').setOption('B', True)
+
+        # Replacing the options drops the ones that are gone, and keeps the state of the rest
+        definition.setFieldOptions('Status', {'B': False, 'C': False})
+        assert dict(requirement.getPublicField('Status').options) == {'B': True, 'C': False}
+
+        # Reconciling against the template keeps options only the item has
+        requirement.getPublicField('Status').options['Local'] = True
+        requirement.populateFromTemplate(definition)
+        assert dict(requirement.getPublicField('Status').options) == {'B': True, 'C': False, 'Local': True}
@@ -0,0 +1,189 @@
+import os
+import pytest
+from BBData import config
+from BBData.BBData import Scope
+from BBData.FileSystem import Tree, TreeNode
+from BBData.utilities import getFilesByExtension, getFilesWithExtension, saveJsonLike
+
+
+def snapshot(ws):
+    return {uuid: (ws.getFullPath(item.getPath()), item.toDict()) for uuid, item in
+            [(item.uuid, item) for item in ws.getDefinitions() + ws.getWorkItems() + ws.getDocuments() + ws.getProjects()]}
+
+
+class TestDiscovery:
+
+    def test_bucketsmatchperextensionwalk(self, workspace, monkeypatch):
+        extensions = ['.bbdoc', '.bbproj', '.bbdef', '.bbitem']
+        scanned = []
+        scandir = os.scandir
+        monkeypatch.setattr(os, 'scandir', lambda path: scanned.append(os.fspath(path)) or scandir(path))
+        buckets = getFilesByExtension(workspace.root, extensions)
+        monkeypatch.undo()
+        # Every directory is read once
+        assert sorted(scanned) == sorted(directory for directory, subdirectories, files in os.walk(workspace.root))
+        for extension in extensions:
+            # getFilesWithExtension revisits nested directories, so compare against first occurrences
+            expected = list(dict.fromkeys(getFilesWithExtension([workspace.root], extension, recursive=True)))
+            assert buckets[extension] == expected
+
+    def test_rediscover(self, workspace):
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        assert len(reopened.getWorkItems()) == 5
+        assert len(reopened.getDefinitions()) == 1
+        item = reopened.getWorkItems()[0]
+        assert item.parent.name == 'Requirements'
+        assert item.getPublicField('Requirement').text().startswith('The system shall')
+
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_pooleddiscovery(self, workspace, monkeypatch, executor):
+        expected = snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root))
+        monkeypatch.setattr(config, 'discoveryExecutor', executor)
+        monkeypatch.setattr(config, 'discoveryWorkers', 2)
+        assert snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root)) == expected
+
+    def test_lazyopen(self, workspace):
+        expected = snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root))
+        itemid = next(uuid for uuid, (path, d) in expected.items() if 'template' in d)
+
+        lazy = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+        assert not any(lazy.isLoaded(uuid) for uuid in expected)
+
+        item = lazy.getWorkItemByUUID(itemid)
+        assert lazy.isLoaded(itemid)
+        assert item.parent.name == 'Requirements'
+        assert item.toDict() == expected[itemid][1]
+        assert snapshot(lazy) == expected
+
+
+class TestWorkspaceIndex:
+
+    def test_reopenreadsonlychangedfiles(self, workspace, monkeypatch):
+        import BBData.BBData
+        # Eager discoveries read every file, so they leave the index alone
+        Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        assert not os.path.exists(workspace.index.path)
+        Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+        assert os.path.exists(workspace.index.path)
+
+        sniffed = []
+        sniff = BBData.BBData.sniffUUID
+        monkeypatch.setattr(BBData.BBData, 'sniffUUID', lambda path: sniffed.append(path) or sniff(path))
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+        assert sniffed == []
+
+        item = reopened.getWorkItems()[0]
+        item.getPublicField('Requirement').setText('Changed in another session, with more text.')
+        item.serialize()
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+        assert len(sniffed) == 1
+        assert reopened.getWorkItemByUUID(item.uuid).getPublicField('Requirement').text() == 'Changed in another session, with more text.'
+
+
+class TestTree:
+
+    def makeNode(self, tree, name, parent=None):
+        node = TreeNode(name, tree, parent)
+        node.name = name
+        return node
+
+    def test_structure(self):
+        tree = Tree()
+        root = self.makeNode(tree, 'root')
+        a = self.makeNode(tree, 'a', root)
+        b = self.makeNode(tree, 'b', root)
+        leaf = self.makeNode(tree, 'leaf', a)
+
+        assert tree.getNode('leaf') is leaf
+        assert tree.getNodes() == [root, a, b, leaf] and 'leaf' in tree.nodeids
+        assert tree.getChildren(root) == [a, b]
+        assert list(tree.walk(root)) == [root, a, leaf, b]
+
+        leaf.parent = b
+        assert tree.getChildren(a) == []
+        assert tree.getChildren(b) == [leaf]
+
+        leaf.uuid = 'renamed'
+        assert tree.getNode('leaf') is None
+        assert tree.getNode('renamed') is leaf
+
+        assert tree.removeNode(b) == [b, leaf]
+        assert tree.getNode('renamed') is None
+        assert tree.getChildren(root) == [a]
+
+    def test_cachedpaths(self):
+        tree = Tree()
+        root = self.makeNode(tree, 'root')
+        a = self.makeNode(tree, 'a', root)
+        leaf = self.makeNode(tree, 'leaf', a)
+        other = self.makeNode(tree, 'other', root)
+
+        assert leaf.getPath() == os.sep.join(['', 'root', 'a', 'leaf'])
+        a.name = 'renamed'
+        assert leaf.getPath() == os.sep.join(['', 'root', 'renamed', 'leaf'])
+        a.parent = other
+        assert leaf.getPath() == os.sep.join(['', 'root', 'other', 'renamed', 'leaf'])
+        root.name = 'top'
+        assert leaf.getPath() == os.sep.join(['', 'top', 'other', 'renamed', 'leaf'])
+
+
+class TestSave:
+
+    def test_saveonlywritesdirty(self, workspace, monkeypatch):
+        project = workspace.getProjects()[0]
+        assert not any(element.dirty for element in workspace.getWorkItems())
+
+        written = []
+        save = workspace.saveElements
+        monkeypatch.setattr(workspace, 'saveElements', lambda elements: written.extend(elements) or save(elements))
+
+        project.save()
+        assert written == []
+
+        item = workspace.getWorkItems()[2]
+        item.getPublicField('Requirement').setText('Edited')
+        assert item.dirty
+        project.save()
+        assert written == [item]
+        assert not item.dirty
+
+    def test_atomicwrite(self, workspace, monkeypatch):
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        item = reopened.getWorkItems()[0]
+        path = item.getSerializationPath()
+        before = open(path).read()
+        files = sorted(os.listdir(os.path.dirname(path)))
+
+        def crash(source, destination):
+            # Interrupted after the new content is on disk, before it replaces the old file
+            raise KeyboardInterrupt
+        monkeypatch.setattr(os, 'replace', crash)
+        item.getPublicField('Requirement').setText('Never written')
+        with pytest.raises(KeyboardInterrupt):
+            item.serialize()
+        monkeypatch.undo()
+
+        assert open(path).read() == before
+        assert sorted(os.listdir(os.path.dirname(path))) == files
+
+        # Loaded elements write back to the file they came from
+        item.serialize()
+        assert sorted(os.listdir(os.path.dirname(path))) == files
+        assert 'Never written' in open(path).read()
+
+    def test_filemode(self, workspace, tmp_path):
+        previous = os.umask(0o027)
+        try:
+            path = str(tmp_path / 'new.json')
+            saveJsonLike({'uuid': 'a'}, path)
+        finally:
+            os.umask(previous)
+        # New files are created as open() creates them
+        assert os.stat(path).st_mode & 0o777 == 0o640
+
+        # Existing files keep their mode, as on a shared drive
+        item = workspace.getWorkItems()[0]
+        os.chmod(item.getSerializationPath(), 0o664)
+        item.getPublicField('Requirement').setText('Shared')
+        item.serialize()
+        assert os.stat(item.getSerializationPath()).st_mode & 0o777 == 0o664
@@ -0,0 +1,183 @@
+import os
+import pytest
+from BBData import config
+from BBData.Archive import PackedArchive
+from BBData.BBData import Scope, Workspace
+from BBData.Codecs import BinaryCodec, ShapeTable, detectCodec, getCodec
+from BBData.Fields import *
+from BBData.utilities import loadJsonLike, saveJsonLike, sniffUUID
+from Test.test_3_workspace import snapshot
+
+
+class TestCodecs:
+
+    content = {
+        'uuid': 'f1d29a84-ef95-4946-88b3-39b7271d93a0',
+        'public': [Enum(['Electrical Engineer', 'Software Engineer'], 'Electrical Engineer', 'Assigned To').toDict(),
+                   Checks({'Reviewed': True, 'Approved': False}, 'Status').toDict()],
+        'numbers': [0, 1, -1, 300, -2 ** 70, 1.5],
+        'flags': [True, False, None],
+        'text': 'Ünïcode and a not-a-uuid F1D29A84-EF95-4946-88B3-39B7271D93A0'
+    }
+
+    def test_roundtrip(self):
+        for name in ['json', 'binary']:
+            codec = getCodec(name)
+            data = codec.encode(TestCodecs.content)
+            assert detectCodec(data) is codec
+            assert codec.decode(data) == TestCodecs.content
+
+    def test_binaryshapes(self):
+        codec = BinaryCodec()
+        big = {f'key {i}': [i, f'value {i}', i / 2] for i in range(2000)}
+        for content in [TestCodecs.content, big, [], {}, '', [None, True]]:
+            assert codec.decode(codec.encode(content)) == content
+        # A NUL can't be in the strings, so the content is written as json
+        assert detectCodec(codec.encode({'text': 'a\x00b'})) is getCodec('json')
+
+    def test_binarycorrupt(self):
+        codec = BinaryCodec()
+        data = codec.encode({'uuid': 'a', 'n': 1})
+        with pytest.raises(ValueError):
+            codec.decode(data[:-2] + b'\x00x\x00y')
+        with pytest.raises(ValueError):
+            codec.decode(data[:BinaryCodec.header.size + 3])
+        # Shapes are plain data, never run
+        shape = b'["d",["__import__(\'os\')"],["s"]]'
+        with pytest.raises(ValueError):
+            codec.decode(BinaryCodec.header.pack(BinaryCodec.magic, bytes(8), 0, len(shape), 0) + shape + b'x')
+        shape = b'["x"]'
+        with pytest.raises(ValueError):
+            codec.decode(BinaryCodec.header.pack(BinaryCodec.magic, codec.register(shape), 0, len(shape), 0) + shape)
+        # Shapes of a table that isn't loaded, and the earlier layouts
+        with pytest.raises(ValueError):
+            codec.decode(BinaryCodec.header.pack(BinaryCodec.magic, bytes(8), 0, 0, 0))
+        for data in [b'BBB\x01\x00', b'BBB\x02' + bytes(20), b'BBB']:
+            with pytest.raises(ValueError):
+                codec.decode(data)
+
+    def test_shapetable(self, tmp_path):
+        def item(choice, checked, links):
+            enum = Enum(['Electrical Engineer', 'Software Engineer'], 'Electrical Engineer', 'Assigned To')
+            enum.setCurrent(choice)
+            return {'uuid': f'{choice}-{checked}', 'public': [enum.toDict(),
+                Checks({'Reviewed': checked, 'Approved': not checked}, 'Status').toDict(),
+                LongText('Requirement', f'Text {choice}').toDict()], 'links': links}
+        items = [item('Electrical Engineer', True, []), item('Software Engineer', False, ['a', 'b', 'c'])]
+        table = ShapeTable(str(tmp_path / config.shapesfilename))
+        writer = BinaryCodec()
+        shared = [writer.encode(content, table) for content in items]
+        table.save()
+        # One shape for every choice, check state and number of links, carried by the table alone
+        assert shared[0][:BinaryCodec.header.size][4:12] == shared[1][:BinaryCodec.header.size][4:12]
+        assert all(len(data) < len(writer.encode(content)) for data, content in zip(shared, items))
+        assert len(open(table.path, 'rb').read().splitlines()) == 1
+
+        reader = BinaryCodec()
+        with pytest.raises(ValueError):
+            reader.decode(shared[0])
+        # Files without a table carry their shape
+        assert [reader.decode(writer.encode(content)) for content in items] == items
+        reader = BinaryCodec()
+        for description in writer.descriptions():
+            reader.register(description)
+        assert [reader.decode(data) for data in shared] == items
+
+        # Saves append, a line cut short is skipped and the next save starts after it
+        with open(table.path, 'ab') as outfile:
+            outfile.write(b'["d",["cut')
+        writer.encode({'other': 1}, table)
+        table.save()
+        lines = open(table.path, 'rb').read().split(b'\n')
+        assert lines[1] == b'["d",["cut' and lines[2] == b'["d",["other"],["i"]]' and lines[3] == b''
+        ShapeTable(table.path).load()
+        assert getCodec('binary').decode(shared[1]) == items[1]
+
+    def test_files(self, tmp_path):
+        for name in ['json', 'binary']:
+            path = str(tmp_path / f'element.{name}')
+            saveJsonLike(TestCodecs.content, path, codec=name)
+            assert loadJsonLike(path) == TestCodecs.content
+            assert sniffUUID(path) == TestCodecs.content['uuid']
+
+    def test_binaryworkspace(self, workspace, monkeypatch):
+        expected = snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root))
+        monkeypatch.setattr(config, 'codec', 'binary')
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        reopened.saveElements(reopened.getDefinitions() + reopened.getWorkItems() + reopened.getDocuments() + reopened.getProjects())
+        monkeypatch.undo()
+        assert os.path.getsize(os.path.join(workspace.root, config.shapesfilename)) > 0
+
+        assert snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root)) == expected
+        assert snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)) == expected
+
+
+class TestPackedArchive:
+
+    def test_packandunpack(self, workspace, tmp_path):
+        expected = snapshot(Scope.setCurrentWorkspaceFromDirectory(workspace.root))
+        Workspace.packDirectory(workspace.root)
+
+        packed = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True, packed=True)
+        assert not any(packed.isLoaded(uuid) for uuid in expected)
+        assert snapshot(packed) == expected
+
+        item = packed.getWorkItems()[0]
+        item.getPublicField('Requirement').setText('Stored in the archive')
+        item.serialize()
+        assert Scope.setCurrentWorkspaceFromDirectory(workspace.root, packed=True).getWorkItemByUUID(
+            item.uuid).getPublicField('Requirement').text() == 'Stored in the archive'
+
+        archive = Scope.currentWorkspace.archive
+        archive.compact()
+        archive.close()
+        target = tmp_path / 'unpacked'
+        target.mkdir()
+        os.replace(archive.path, target / os.path.basename(archive.path))
+        Workspace.unpackDirectory(str(target))
+        unpacked = Scope.setCurrentWorkspaceFromDirectory(str(target))
+        assert unpacked.getWorkItemByUUID(item.uuid).getPublicField('Requirement').text() == 'Stored in the archive'
+        assert len(unpacked.getWorkItems()) == len(packed.getWorkItems())
+        # Unpacked through the atomic writes, which leave no temporary files behind
+        assert not [name for directory, subdirectories, names in os.walk(target) for name in names if name.endswith('.tmp')]
+
+    def test_deltas(self, tmp_path):
+        path = str(tmp_path / 'elements.bbpack')
+        archive = PackedArchive(path)
+        archive.write([(f'item {i}', '.bbitem', f'item {i}.bbitem', b'{"n": %d}' % i) for i in range(200)])
+        # The first delta outgrows the empty checkpoint, so this one writes the whole index
+        archive.write([('item 6', '.bbitem', 'item 6.bbitem', b'{"n": "six"}')])
+        size = os.path.getsize(path)
+        archive.write([('item 7', '.bbitem', 'item 7.bbitem', b'{"n": "seven"}')])
+        # One record and one entry, not the whole index again
+        assert os.path.getsize(path) - size < 200
+        for i in range(100):
+            archive.write([('item 8', '.bbitem', 'item 8.bbitem', b'{"n": %d}' % i)])
+        archive.remove(['item 9'])
+        expected = archive.entries()
+        archive.close()
+
+        reopened = PackedArchive(path)
+        assert reopened.entries() == expected and 'item 9' not in reopened
+        assert reopened.read('item 7') == {'n': 'seven'} and reopened.read('item 8') == {'n': 99}
+        reopened.close()
+
+    def test_interruptedwrite(self, tmp_path):
+        path = str(tmp_path / 'elements.bbpack')
+        archive = PackedArchive(path)
+        archive.write([('a', '.bbitem', 'a.bbitem', b'{"n": 1}')])
+        archive.write([('a', '.bbitem', 'a.bbitem', b'{"n": 2}'), ('b', '.bbitem', 'b.bbitem', b'{"n": 3}')])
+        archive.close()
+        with open(path, 'r+b') as outfile:
+            # Cut into the last footer, as a crash during the second write would
+            outfile.truncate(os.path.getsize(path) - 5)
+            outfile.seek(0, os.SEEK_END)
+            outfile.write(b'partial')
+
+        reopened = PackedArchive(path)
+        assert reopened.read('a') == {'n': 1} and 'b' not in reopened
+        reopened.write([('b', '.bbitem', 'b.bbitem', b'{"n": 4}')])
+        reopened.close()
+        again = PackedArchive(path)
+        assert again.read('a') == {'n': 1} and again.read('b') == {'n': 4}
+        again.close()
@@ -0,0 +1,72 @@
+import shutil
+from BBData.BBData import CollectionElement, Scope, WorkItem, WorkItemDefinition
+from BBData.Diff import ChangeKind, diffDicts, diffElements, diffWorkspaces
+from BBData.Fields import *
+
+
+def definition():
+    d = WorkItemDefinition(name='Requirement')
+    d.addPublicFields([
+        LongText('Requirement', 'The system shall'),
+        Enum(['Low', 'High'], 'Low', 'Priority'),
+        Checks({'Reviewed': False, 'Approved': False}, 'Status')
+    ])
+    return d
+
+
+class TestElementDiff:
+
+    def test_matchesbyname(self):
+        a = definition()
+        b = WorkItemDefinition.copy(a)
+        b.uuid = a.uuid
+        b.public.reverse()
+        b.getPublicField('Priority').setCurrent('High')
+
+        patch = CollectionElement.diff(a, b)
+        assert [(change.kind, change.path) for change in patch] == [
+            (ChangeKind.CHANGED, ('public', 'Priority', 'currentItem')),
+            (ChangeKind.REORDERED, ('public',))]
+        assert diffDicts(a.toDict(), b.toDict()) == patch
+        assert not diffElements(a, WorkItemDefinition.fromDict(a.toDict()))
+
+    def test_apply(self):
+        template = definition()
+        a = WorkItem(name='Item', template=template)
+        b = WorkItem(name='Item', template=template)
+        b.uuid = a.uuid
+        b.createDate, b.updateDate = a.createDate, a.updateDate
+        b.name = 'Renamed'
+        b.getPublicField('Requirement').setText('The system shall not')
+        b.getPublicField('Status').setOption('Approved', True)
+        CollectionElement.removePublicField(b, 'Priority')
+        CollectionElement.addPrivateField(b, ShortText('Notes', 'Private'))
+
+        field = a.getPublicField('Requirement')
+        patch = diffElements(a, b)
+        patch.apply(a)
+        assert a.toDict() == b.toDict()
+        assert a.getPublicField('Requirement') is field
+        assert not diffElements(a, b)
+
+        patch.reversed().apply(a)
+        assert a.getPublicField('Requirement').text() == 'The system shall'
+        assert a.getPublicField('Priority') != None and a.name == 'Item'
+
+
+class TestWorkspaceDiff:
+
+    def test_diffworkspaces(self, workspace, tmp_path):
+        copy = str(tmp_path / 'copy')
+        shutil.copytree(workspace.root, copy, copy_function=shutil.copy2)
+        original = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        copied = Scope.setCurrentWorkspaceFromDirectory(copy)
+        item = copied.getWorkItems()[0]
+        item.getPublicField('Requirement').setText('Changed in the copy')
+        item.serialize()
+
+        result = diffWorkspaces(original, copied)
+        assert list(result.changed) == [item.uuid]
+        assert [change.path for change in result.changed[item.uuid]] == [('public', 'Requirement', 'text')]
+        assert not result.added and not result.removed and not result.moved
+        assert result.skipped == len(original.getElementEntries()) - 1
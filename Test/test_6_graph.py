@@ -0,0 +1,73 @@
+import warnings
+from BBData.BBData import Scope
+from BBData.Graph import TraceGraph
+
+
+def graph():
+    # feature -> requirements -> tests, with r3 untested and a cycle between c1 and c2
+    nodes = {'f1': 'feature', 'r1': 'req', 'r2': 'req', 'r3': 'req', 't1': 'test', 't2': 'test',
+             'c1': 'req', 'c2': 'req'}
+    links = [('f1', 'r1'), ('f1', 'r2'), ('f1', 'r3'), ('r1', 't1'), ('r2', 't2'), ('r2', 't2'),
+             ('c1', 'c2'), ('c2', 'c1'), ('f1', 'missing')]
+    return TraceGraph(nodes, links)
+
+
+class TestTraceGraph:
+
+    def test_reachability(self):
+        g = graph()
+        assert len(g) == 8 and g.linkCount == 7 and g.dangling == 1
+        assert g.downstreamOf('f1') == {'r1', 'r2', 'r3', 't1', 't2'}
+        assert g.downstreamOf('f1', depth=1) == {'r1', 'r2', 'r3'}
+        assert g.upstreamOf(['t1', 't2']) == {'r1', 'r2', 'f1'}
+        assert g.reaches('f1', 't2') and not g.reaches('t2', 'f1')
+        assert g.impact(['r1', 'r3']) == {'r1': {'t1'}, 'r3': set()}
+
+    def test_reports(self):
+        g = graph()
+        coverage = g.coverage('req', 'test')
+        assert coverage.covered == ['r1', 'r2']
+        assert coverage.uncovered == ['r3', 'c1', 'c2']
+        assert g.coverage('feature', 'test').ratio == 1.0
+        assert g.orphans() == ['f1']
+        assert g.orphans('test') == [] and g.ofTemplate('test') == ['t1', 't2']
+        assert g.cycles() == [['c1', 'c2']]
+
+
+class TestWorkspaceGraph:
+
+    def test_tracegraph(self, workspace):
+        Scope.rulespolicy = Scope.RulesPolicy.NONE
+        try:
+            items = workspace.getWorkItems()
+            first = workspace.traceGraph()
+            assert workspace.traceGraph() is first and first.linkCount == 0
+            items[0].addDownstream(items[1])
+            items[1].addDownstream(items[2])
+            g = workspace.traceGraph()
+            assert g is not first
+            assert g.downstreamOf(items[0].uuid) == {items[1].uuid, items[2].uuid}
+            assert len(g.orphans(items[0].template.uuid)) == 3
+        finally:
+            Scope.rulespolicy = Scope.RulesPolicy.STRICT
+
+    def test_linkmany(self, workspace):
+        items = workspace.getWorkItems()
+        template = items[0].template
+        pairs = [(items[0], item) for item in items[1:]] + [(items[0].uuid, items[1].uuid)]
+        assert workspace.linkMany(pairs) == 0
+
+        Scope.rulespolicy = Scope.RulesPolicy.WARN
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                assert workspace.linkMany(pairs) == 4
+            assert len(caught) == 1
+        finally:
+            Scope.rulespolicy = Scope.RulesPolicy.STRICT
+        assert list(items[0].downstream) == [item.uuid for item in items[1:]]
+        assert all(item.upstream == [items[0].uuid] for item in items[1:])
+        assert workspace.traceGraph().downstreamOf(items[0].uuid) == {item.uuid for item in items[1:]}
+
+        template.addDownstreamRule(template)
+        assert workspace.linkMany([(items[1], items[2])]) == 1
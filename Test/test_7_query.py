@@ -0,0 +1,61 @@
+from BBData.BBData import WorkItem, WorkItemDefinition
+from BBData.Fields import *
+from BBData.Query import QueryIndex
+
+
+def definition():
+    d = WorkItemDefinition(name='Requirement')
+    d.addPublicFields([
+        ShortText('Requirement', 'The system shall'),
+        Enum(['Low', 'High'], 'Low', 'Priority'),
+        Checks({'Reviewed': False, 'Approved': False}, 'Status')
+    ])
+    return d
+
+
+class TestFieldLookup:
+
+    def test_namecache(self):
+        item = WorkItem(template=definition())
+        field = item.getPublicField('Priority')
+        assert item.getPublicField('Priority') is field
+        field.name = 'Urgency'
+        assert item.getPublicField('Priority') == None
+        assert item.getPublicField('Urgency') is field
+        item.removePublicField('Urgency')
+        assert item.getPublicField('Urgency') == None
+        item.public.append(ShortText('Appended'))
+        assert item.getPublicField('Appended').name == 'Appended'
+
+
+class TestQueryIndex:
+
+    def test_followschanges(self):
+        template = definition()
+        items = [WorkItem(name=f'Item {i}', template=template) for i in range(4)]
+        index = QueryIndex(items)
+        assert index.withTemplate(template) == items
+        assert index.withEnum('Priority', 'Low') == items
+
+        items[1].getPublicField('Priority').setCurrent('High')
+        items[2].getPublicField('Status').setOption('Approved', True)
+        items[3].name = 'Renamed'
+        assert index.withEnum('Priority', 'High') == [items[1]]
+        assert index.withCheck('Status', 'Approved') == [items[2]]
+        assert index.named('Renamed') == [items[3]] and index.named('Item 3') == []
+        assert index.where(template=template.uuid, enums={'Priority': 'Low'},
+                           checks={('Status', 'Approved'): False}) == [items[0], items[3]]
+
+        template.renameField('Priority', 'Urgency')
+        assert index.withEnum('Priority', 'Low') == [] and len(index.withEnum('Urgency', 'Low')) == 3
+        index.remove(items[0])
+        assert index.where(enums={'Urgency': 'Low'}) == [items[2], items[3]]
+
+    def test_workspace(self, workspace):
+        query = workspace.query()
+        assert workspace.query() is query
+        assert len(query.withEnum('Assigned To', 'Electrical Engineer')) == 5
+        definition = workspace.getDefinitions()[0]
+        item = workspace.createNewWorkItem('Added', definition)
+        item.getPublicField('Assigned To').setCurrent('Software Engineer')
+        assert query.withEnum('Assigned To', 'Software Engineer') == [item]
@@ -0,0 +1,98 @@
+import os
+import pytest
+import time
+import uuid
+from BBData.BBData import Scope, Workspace
+from BBData.utilities import loadJsonLike, saveJsonLike
+from BBData.Watcher import InotifyWatcher, PollingWatcher
+
+
+def edit(workspace):
+    # Change one item, add a copy of it and delete another, as another program would
+    items = workspace.getWorkItems()
+    changed, deleted = items[0], items[1]
+    changedpath, deletedpath = changed.getSerializationPath(), deleted.getSerializationPath()
+    d = loadJsonLike(changedpath)
+    d['public'][0]['text'] = 'Changed on disk'
+    d['name'] = 'Renamed on disk'
+    saveJsonLike(d, changedpath)
+    d['uuid'] = str(uuid.uuid4())
+    addedpath = os.path.join(os.path.dirname(changedpath), f'Added.bbitem')
+    saveJsonLike(d, addedpath)
+    os.remove(deletedpath)
+    return changed, deleted, d['uuid'], [changedpath, addedpath, deletedpath]
+
+
+class TestRefresh:
+
+    def test_refreshfiles(self, workspace):
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        query = ws.query()
+        untouched = ws.getWorkItems()[2].getSerializationPath()
+        changed, deleted, added, paths = edit(ws)
+
+        result = ws.refreshFiles(paths + [untouched, os.path.join(ws.root, 'notes.txt')])
+        assert result == {'added': [added], 'changed': [changed.uuid], 'removed': [deleted.uuid]}
+        assert ws.getWorkItemByUUID(changed.uuid) is changed
+        assert changed.getPublicField('Requirement').text() == 'Changed on disk'
+        assert changed.name == 'Renamed on disk' and not changed.dirty
+        assert deleted.uuid not in ws.getElementEntries() and deleted not in ws.getChildren(deleted.parent)
+        assert ws.getWorkItemByUUID(added).parent is changed.parent
+        assert {item.uuid for item in query.named('Renamed on disk')} == {changed.uuid, added}
+        assert ws.refreshFiles(paths) == {'added': [], 'changed': [], 'removed': []}
+
+    def test_packed(self, workspace):
+        Workspace.packDirectory(workspace.root)
+        packed = Scope.setCurrentWorkspaceFromDirectory(workspace.root, packed=True)
+        with pytest.raises(ValueError):
+            packed.refreshFiles([])
+        with pytest.raises(ValueError):
+            packed.watch()
+
+    def test_keepsunsaved(self, workspace):
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        changed, deleted, added, paths = edit(ws)
+        changed.getPublicField('Requirement').setText('Changed in memory')
+        with pytest.warns(UserWarning):
+            result = ws.refreshFiles(paths[:1])
+        assert result['changed'] == []
+        assert changed.getPublicField('Requirement').text() == 'Changed in memory'
+
+
+class TestWatchers:
+
+    def test_polling(self, workspace):
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        watcher = PollingWatcher(ws, debounce=0)
+        assert watcher.poll(force=True) == None
+        changed, deleted, added, paths = edit(ws)
+        result = watcher.poll(force=True)
+        assert result == {'added': [added], 'changed': [changed.uuid], 'removed': [deleted.uuid]}
+
+    @pytest.mark.skipif(not InotifyWatcher.available(), reason='inotify is not available')
+    def test_inotify(self, workspace):
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        with InotifyWatcher(ws, debounce=0) as watcher:
+            ws.getWorkItems()[3].getPublicField('Requirement').setText('Saved here')
+            ws.getWorkItems()[3].serialize()
+            os.makedirs(os.path.join(ws.root, 'Later'))
+            changed, deleted, added, paths = edit(ws)
+            watcher.wait(1)
+            result = watcher.poll(force=True)
+        assert result == {'added': [added], 'changed': [changed.uuid], 'removed': [deleted.uuid]}
+
+    def test_threaded(self, workspace):
+        ws = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        with ws.watch(debounce=0, polling=True) as watcher:
+            watcher.interval = 0.01
+            changed, deleted, added, paths = edit(ws)
+            deadline = time.monotonic() + 5
+            while len(watcher.pending) < 3:
+                assert time.monotonic() < deadline, 'the watching thread missed the changes'
+                time.sleep(0.01)
+            # Paths are only collected on the thread, the workspace is refreshed here
+            assert changed.getPublicField('Requirement').text() != 'Changed on disk'
+            assert deleted.uuid in ws.getElementEntries()
+            result = watcher.poll(force=True)
+        assert result == {'added': [added], 'changed': [changed.uuid], 'removed': [deleted.uuid]}
+        assert changed.getPublicField('Requirement').text() == 'Changed on disk'
@@ -0,0 +1,134 @@
+import json
+import os
+import pytest
+from BBData.BBData import Scope
+from BBData.Fields import Checks
+from BBData.Plugins import PluginRole
+from BBData.Transfer import RecordExport, RecordImport, exportFile, importFile, readRecords
+
+
+def requirements(workspace):
+    project = workspace.getProjects()[0]
+    return next(document for document in project.getDocuments() if document.name == 'Requirements')
+
+
+class TestImport:
+
+    def test_csv(self, workspace, tmp_path):
+        template = workspace.getDefinitions()[0]
+        parent = requirements(workspace)
+        path = tmp_path / 'rows.csv'
+        path.write_text('name,Requirement,Assigned To,Unknown\n' +
+                        ''.join(f'Row {i},Imported {i},Software Engineer,x\n' for i in range(7)) +
+                        'Row 7,,,\n', encoding='utf-8')
+
+        uuids = importFile(workspace, str(path), template, parent, chunksize=3)
+        assert len(uuids) == 8
+        assert not any(workspace.isLoaded(uuid) for uuid in uuids)
+        assert all(os.path.isfile(workspace.getFullPath(workspace.getElementEntries()[uuid]['path'])) for uuid in uuids)
+
+        item = workspace.getWorkItemByUUID(uuids[2])
+        assert item.name == 'Row 2' and item.template is template and item.parent is parent and not item.dirty
+        assert item.getPublicField('Requirement').text() == 'Imported 2'
+        assert item.getPublicField('Assigned To').getCurrent() == 'Software Engineer'
+        last = workspace.getWorkItemByUUID(uuids[-1])
+        assert last.getPublicField('Assigned To').getCurrent() == 'Electrical Engineer'
+
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        assert len(reopened.getWorkItems()) == 13
+
+    def test_checks(self, workspace):
+        template = workspace.getDefinitions()[0]
+        template.addPublicField(Checks({'Reviewed': False, 'Tested': False}, 'Status'))
+        records = [{'name': 'A', 'Status': 'Tested'}, {'name': 'B', 'Status': ['Reviewed', 'Tested']},
+                   {'name': 'C', 'Status': {'Reviewed': True}}]
+        uuids = workspace.importWorkItems(records, template)
+        states = [workspace.getWorkItemByUUID(uuid).getPublicField('Status').options for uuid in uuids]
+        assert [dict(state) for state in states] == [{'Reviewed': False, 'Tested': True}, {'Reviewed': True, 'Tested': True},
+                                                     {'Reviewed': True, 'Tested': False}]
+
+    def test_samename(self, workspace):
+        template = workspace.getDefinitions()[0]
+        existing = workspace.getWorkItems()[0]
+        uuids = workspace.importWorkItems([{'name': 'Same', 'Requirement': 'First'}, {'name': 'Same', 'Requirement': 'Second'},
+                                           {'name': existing.name}], template, existing.parent, chunksize=1)
+        paths = {workspace.getElementEntries()[uuid]['path'] for uuid in uuids + [existing.uuid]}
+        assert len(paths) == 4
+
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        texts = [reopened.getWorkItemByUUID(uuid).getPublicField('Requirement').text() for uuid in uuids[:2]]
+        assert texts == ['First', 'Second']
+        assert reopened.getWorkItemByUUID(uuids[1]).name == 'Same'
+        assert reopened.getWorkItemByUUID(existing.uuid).name == existing.name
+
+    def test_links(self, workspace):
+        template = workspace.getDefinitions()[0]
+        existing = workspace.getWorkItems()[0]
+        records = [{'uuid': 'a', 'name': 'A', 'downstream': ['b']}, {'uuid': 'b', 'name': 'B', 'upstream': [existing.uuid]},
+                   {'uuid': 'c', 'name': 'C', 'upstream': ['a', 'missing']}]
+        workspace.importWorkItems(records, template, chunksize=1)
+        assert existing.downstream == ['b'] and existing.dirty
+        existing.serialize()
+
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root)
+        a, b, c = (reopened.getWorkItemByUUID(uuid) for uuid in 'abc')
+        assert a.downstream == ['b', 'c'] and b.upstream == [existing.uuid, 'a'] and c.upstream == ['a', 'missing']
+        assert reopened.getWorkItemByUUID(existing.uuid).downstream == ['b']
+
+    def test_invalid(self, workspace):
+        template = workspace.getDefinitions()[0]
+        with pytest.raises(ValueError):
+            workspace.importWorkItems([{'name': 'Bad', 'Assigned To': 'Nobody'}], template)
+
+
+class TestExport:
+
+    def test_roundtrip(self, workspace, tmp_path):
+        template = workspace.getDefinitions()[0]
+        loaded = workspace.getWorkItems()[0]
+        reopened = Scope.setCurrentWorkspaceFromDirectory(workspace.root, lazy=True)
+        path = str(tmp_path / 'items.jsonl')
+
+        assert exportFile(reopened, path, template.uuid) == 5
+        assert not any(reopened.isLoaded(uuid) for uuid in reopened.getElementEntries())
+        records = list(readRecords(path))
+        assert sorted(record['Requirement'] for record in records) == [f'The system shall do thing {i}.' for i in range(5)]
+        record = next(record for record in records if record['uuid'] == loaded.uuid)
+        assert record['name'] == loaded.name and record['Assigned To'] == 'Electrical Engineer'
+
+        for record in records:
+            del record['uuid']
+            record['name'] = f'Copy of {record["name"]}'
+        definition = reopened.getDefinitionByUUID(template.uuid)
+        uuids = reopened.importWorkItems(iter(records), definition)
+        copies = {copy.name: copy for copy in map(reopened.getWorkItemByUUID, uuids)}
+        assert copies['Copy of Item 4'].getPublicField('Requirement').text() == 'The system shall do thing 4.'
+
+    def test_plugins(self, workspace, tmp_path):
+        assert RecordImport.role == PluginRole.IMPORT and RecordExport.role == PluginRole.EXPORT
+        path = str(tmp_path / 'items.jsonl')
+        assert RecordExport().run(workspace, path) == 5
+        with open(path) as infile:
+            assert json.loads(infile.readline())['template'] == workspace.getDefinitions()[0].uuid
+        assert len(RecordImport().run(workspace, path, workspace.getDefinitions()[0])) == 5
+        # Same uuids, so the items were written over
+        assert len(workspace.getWorkItems()) == 5
+        files = [name for directory, subdirectories, names in os.walk(workspace.root) for name in names if name.endswith('.bbitem')]
+        assert len(files) == 5
+
+
+class TestUnload:
+
+    def test_unload(self, workspace):
+        item = workspace.getWorkItems()[0]
+        template = item.template
+        assert workspace.unloadElement(item.uuid)
+        assert not workspace.isLoaded(item.uuid) and workspace.getNode(item.uuid) == None
+        template.addPublicField(Checks({'Reviewed': False}, 'Status'))
+        assert item.getPublicField('Status') == None
+
+        again = workspace.getWorkItemByUUID(item.uuid)
+        assert again is not item and workspace.getNode(item.uuid) is again
+        again.getPublicField('Requirement').setText('Edited')
+        assert not workspace.unloadElement(again.uuid)
+        assert not workspace.unloadElement(template.uuid)